@@ -0,0 +1,11 @@
+# This package contains the custom Scrapy commands of the project, see the
+# COMMANDS_MODULE setting.
+
+
+def add_option(parser, *args, **kwargs):
+    """
+    Adds an option to the parser of a command, which is an optparse parser
+    up to Scrapy 2.5 and an argparse one since.
+    """
+    add = getattr(parser, 'add_argument', None) or parser.add_option
+    add(*args, **kwargs)
@@ -0,0 +1,42 @@
+"""
+The `scrapy diff` command, which prints the principals added, changed and
+removed between two exported crawls as json lines, e.g
+
+    scrapy diff last_week.json principals.json
+"""
+
+import json
+import sys
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+from fara_principals.commands import add_option
+from fara_principals.core.diff import diff_snapshots
+
+
+class Command(ScrapyCommand):
+
+    requires_project = False
+    default_settings = {'LOG_ENABLED': False}
+
+    def syntax(self):
+        return "[options] <old feed> <new feed>"
+
+    def short_desc(self):
+        return "Compare the principals of two exported crawls"
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        add_option(parser, "--change", action="append", default=[],
+            choices=["added", "changed", "removed"],
+            help="only print changes of this kind (may be repeated)")
+
+    def run(self, args, opts):
+        if len(args) != 2:
+            raise UsageError()
+
+        for change in diff_snapshots(args[0], args[1]):
+            if opts.change and change["change"] not in opts.change:
+                continue
+            sys.stdout.write(json.dumps(change, sort_keys=True) + "\n")
@@ -0,0 +1,85 @@
+"""
+The `scrapy query` command, which prints the principals of an exported feed
+matching the given filters as json lines, e.g
+
+    scrapy query principals.json --country AZERBAIJAN \
+        --reg-date-from 01/01/2010
+"""
+
+import json
+import sys
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+from fara_principals.commands import add_option
+from fara_principals.core.query import PrincipalIndex
+from fara_principals.exceptions import QueryError
+
+
+class Command(ScrapyCommand):
+
+    requires_project = False
+    default_settings = {'LOG_ENABLED': False}
+
+    def syntax(self):
+        return "[options] <feed>"
+
+    def short_desc(self):
+        return "Query the principals of an exported json or json lines feed"
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        add_option(parser, "--country", help="country of the principals")
+        add_option(parser, "--reg-number", dest="reg_number",
+            help="reg number of the principals")
+        add_option(parser, "--registrant", help="registrant of the principals")
+        add_option(parser, "--reg-date-from", dest="reg_date_from",
+            metavar="MM/DD/YYYY", help="earliest registration date")
+        add_option(parser, "--reg-date-to", dest="reg_date_to",
+            metavar="MM/DD/YYYY", help="latest registration date")
+        add_option(parser, "--principal-reg-date-from",
+            dest="principal_reg_date_from", metavar="MM/DD/YYYY",
+            help="earliest principal registration date")
+        add_option(parser, "--principal-reg-date-to",
+            dest="principal_reg_date_to", metavar="MM/DD/YYYY",
+            help="latest principal registration date")
+        add_option(parser, "--stamped-from", dest="stamped_from",
+            metavar="MM/DD/YYYY", help="earliest date any exhibit was stamped")
+        add_option(parser, "--stamped-to", dest="stamped_to",
+            metavar="MM/DD/YYYY", help="latest date any exhibit was stamped")
+        add_option(parser, "--limit", type=int,
+            help="most principals to print")
+        add_option(parser, "--cache", metavar="FILE",
+            help="index cache file, FEED.idx by default")
+        add_option(parser, "--no-cache", dest="no_cache", action="store_true",
+            help="don't read nor write an index cache file")
+
+    def run(self, args, opts):
+        if len(args) != 1:
+            raise UsageError()
+
+        cache_path = False if opts.no_cache else opts.cache
+        index = PrincipalIndex.load(args[0], cache_path=cache_path)
+        try:
+            principals = index.query(country=opts.country,
+                reg_number=opts.reg_number, registrant=opts.registrant,
+                reg_date=self._date_range(opts.reg_date_from,
+                    opts.reg_date_to),
+                principal_reg_date=self._date_range(
+                    opts.principal_reg_date_from, opts.principal_reg_date_to),
+                date_stamped=self._date_range(opts.stamped_from,
+                    opts.stamped_to),
+                limit=opts.limit)
+        except QueryError as e:
+            raise UsageError(str(e), print_help=False)
+        finally:
+            index.close()
+
+        for principal_dict in principals:
+            sys.stdout.write(json.dumps(principal_dict, sort_keys=True) + "\n")
+
+    def _date_range(self, start, end):
+        if start is None and end is None:
+            return None
+        return (start, end)
@@ -0,0 +1,199 @@
+"""
+This module contains the checkpoint of a crawl's frontier, which lets an
+interrupted crawl resume where it stopped.
+
+A checkpoint records the page size and report total the list pages were
+requested with, the list pages whose principals have all been handed out,
+the principals still waiting on an exhibit page, the exhibits of the
+parsed exhibit pages they are waiting on and the principals already emitted
+from the list pages which are not done. The session's page context is not
+kept since the server expires it, a resumed crawl bootstraps it's sessions
+again and only requests the work which was not completed.
+
+Only the pending work is kept, so the checkpoint stays as large as the
+frontier however far the crawl gets: the principals of a done list page are
+not recorded as emitted since the page is not requested again.
+"""
+
+import json
+import os
+import time
+
+from fara_principals.core.state import principal_key, write_json_atomically
+
+#version of the layout of the checkpoint file
+__checkpoint_version__ = 2
+
+class CrawlCheckpoint:
+    """
+    Args:
+        path(str): path of the json file the checkpoint is kept in. The
+            checkpoint is resumed from it if it exists.
+
+    Keyword Args:
+        interval(int): (optional) least number of seconds between two saves
+            of the checkpoint, unless forced.
+    """
+
+    def __init__(self, path, interval=30, *args, **kwargs):
+        self._path = path
+        self._interval = interval
+        self._last_save = time.time()
+        self._resumed = False
+
+        self._page_size = None
+        self._total_rows = None
+        self._done_pages = set()
+        self._exhibit_waiters = {}
+        self._exhibits = {}
+        self._emitted_keys = set()
+        #keys of the principals of done pages which have not been emitted
+        #yet
+        self._done_page_keys = set()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self._path):
+            return
+
+        state = self._read()
+        if state is None or state.get("version") != __checkpoint_version__:
+            return
+
+        self._resumed = True
+        self._page_size = state["page_size"]
+        self._total_rows = state["total_rows"]
+        self._done_pages = set(state["done_pages"])
+        self._exhibit_waiters = state["exhibit_waiters"]
+        self._exhibits = state["exhibits"]
+        self._emitted_keys = set(state["emitted_keys"])
+        self._done_page_keys = set(state["done_page_keys"])
+
+    def _read(self):
+        try:
+            with open(self._path, 'r') as f:
+                return json.load(f)
+        except ValueError:
+            #a checkpoint which can't be read is as good as none
+            return None
+
+    def path(self):
+        return self._path
+
+    def is_resumed(self):
+        """
+        Returns:
+            bool: True if the checkpoint was loaded from a previous crawl
+            which got as far as requesting the list pages.
+        """
+        return self._resumed and self._page_size is not None
+
+    def page_size(self):
+        return self._page_size
+
+    def total_rows(self):
+        return self._total_rows
+
+    def set_pagination(self, page_size, total_rows):
+        """
+        Records the page size and report total the list pages are requested
+        with.
+        """
+        self._page_size = page_size
+        self._total_rows = total_rows
+
+    def page_done(self, page_number, principal_keys=()):
+        """
+        Records that the principals of a list page have all been emitted or
+        are waiting on their exhibit page. They are no longer recorded as
+        emitted, the page is not requested again.
+
+        Args:
+            page_number(int): number of the list page.
+
+        Keyword Args:
+            principal_keys(iterable): (optional) keys of the principals on
+                the page.
+        """
+        self._done_pages.add(page_number)
+        for key in principal_keys:
+            if key in self._emitted_keys:
+                self._emitted_keys.discard(key)
+            else:
+                self._done_page_keys.add(key)
+
+    def is_page_done(self, page_number):
+        return page_number in self._done_pages
+
+    def done_pages(self):
+        return sorted(self._done_pages)
+
+    def last_done_page(self):
+        return max(self._done_pages) if self._done_pages else 0
+
+    def exhibit_waiters(self):
+        """
+        Returns:
+            dict: the partial principal dicts which were waiting on an
+            exhibit page, by exhibit url key.
+        """
+        return self._exhibit_waiters
+
+    def exhibits(self):
+        """
+        Returns:
+            dict: the exhibit dicts of the exhibit pages already parsed which
+            principals were waiting on, by exhibit url key.
+        """
+        return self._exhibits
+
+    def principal_emitted(self, principal_dict):
+        key = principal_key(principal_dict)
+        if key in self._done_page_keys:
+            self._done_page_keys.discard(key)
+        else:
+            self._emitted_keys.add(key)
+
+    def was_emitted(self, principal_dict):
+        return principal_key(principal_dict) in self._emitted_keys
+
+    def save(self, exhibit_waiters, exhibits, force=False):
+        """
+        Saves the checkpoint, unless it was saved less than the checkpoint's
+        interval ago.
+
+        Args:
+            exhibit_waiters(dict): the partial principal dicts waiting on an
+                exhibit page, by exhibit url key.
+            exhibits(dict): the exhibit dicts of the parsed exhibit pages
+                principals are still waiting on, by exhibit url key.
+
+        Keyword Args:
+            force(bool): (optional) save whatever the interval.
+
+        Returns:
+            bool: True if the checkpoint was saved.
+        """
+        if not force and time.time() - self._last_save < self._interval:
+            return False
+
+        write_json_atomically(self._path, {
+            "version": __checkpoint_version__,
+            "page_size": self._page_size,
+            "total_rows": self._total_rows,
+            "done_pages": sorted(self._done_pages),
+            "exhibit_waiters": exhibit_waiters,
+            "exhibits": exhibits,
+            "emitted_keys": sorted(self._emitted_keys),
+            "done_page_keys": sorted(self._done_page_keys),
+        })
+        self._last_save = time.time()
+        return True
+
+    def remove(self):
+        """
+        Removes the checkpoint file, once the crawl it was kept for has
+        completed.
+        """
+        if os.path.exists(self._path):
+            os.remove(self._path)
@@ -0,0 +1,200 @@
+"""
+This module contains the normalization of the dates of principals and
+exhibits.
+
+The site gives `reg_date`, `principal_reg_date` and exhibit `date_stamped`
+as `mm/dd/yyyy` strings, which can't be compared as they are. A column of
+those strings is normalized in a single pass into an array of their
+proleptic ordinals (see `datetime.date.toordinal`), 0 standing for a string
+which isn't a valid date, so sorting and filtering on dates compares
+integers. The strings are kept along with the ordinals.
+
+Few distinct dates are shared by many principals, so each distinct string
+of a column is only parsed once.
+"""
+
+import bisect
+import datetime
+from array import array
+
+#ordinal of strings which aren't valid dates, no date has it
+__invalid_ordinal__ = 0
+
+#array typecode of ordinals, which fit in 32 bits
+__ordinal_typecode__ = 'i'
+
+def date_ordinal(date):
+    """
+    Args:
+        date(str): a `mm/dd/yyyy` date, the month and day may have a single
+            digit.
+
+    Returns:
+        int: the proleptic ordinal of the date, or None if it isn't a valid
+        date.
+    """
+    try:
+        month, day, year = date.split("/")
+        if len(year) != 4:
+            return None
+        return datetime.date(int(year), int(month), int(day)).toordinal()
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def ordinal_date(ordinal):
+    """
+    Returns:
+        str: the `mm/dd/yyyy` date of a proleptic ordinal.
+    """
+    return datetime.date.fromordinal(ordinal).strftime("%m/%d/%Y")
+
+def to_ordinal(date):
+    """
+    Args:
+        date: a `mm/dd/yyyy` string, a date or an ordinal.
+
+    Returns:
+        int: the proleptic ordinal of `date`.
+
+    Raises:
+        ValueError: when `date` is not a valid date.
+    """
+    if isinstance(date, datetime.date):
+        return date.toordinal()
+    if isinstance(date, int):
+        return date
+
+    ordinal = date_ordinal(date)
+    if ordinal is None:
+        raise ValueError("`{}` is not a mm/dd/yyyy date".format(date))
+    return ordinal
+
+class DateColumn:
+    """
+    A column of date strings along with their ordinals.
+
+    Args:
+        dates(list): `mm/dd/yyyy` strings, or None for missing dates.
+
+    Keyword Args:
+        owners(list): (optional) position of the record each date belongs
+            to, e.g the principal of each exhibit's `date_stamped`. Each date
+            belongs to the record at it's own position by default.
+    """
+
+    def __init__(self, dates, owners=None, *args, **kwargs):
+        self._dates = list(dates)
+        self._ordinals = array(__ordinal_typecode__)
+        parsed = {}
+        for date in self._dates:
+            ordinal = parsed.get(date)
+            if ordinal is None:
+                ordinal = date_ordinal(date) or __invalid_ordinal__
+                parsed[date] = ordinal
+            self._ordinals.append(ordinal)
+
+        self._owners = None
+        if owners is not None:
+            self._owners = array(__ordinal_typecode__, owners)
+            if len(self._owners) != len(self._ordinals):
+                raise ValueError("a date column needs an owner per date")
+        #positions of the valid dates sorted on their ordinals, and their
+        #ordinals, built the first time they are needed
+        self._order = None
+        self._sorted_ordinals = None
+
+    def __len__(self):
+        return len(self._dates)
+
+    def dates(self):
+        return list(self._dates)
+
+    def ordinals(self):
+        """
+        Returns:
+            array: the ordinals of the dates, 0 for the invalid ones.
+        """
+        return self._ordinals
+
+    def owner(self, position):
+        if self._owners is None:
+            return position
+        return self._owners[position]
+
+    def invalid(self):
+        """
+        Returns:
+            list: the positions of the strings which are not valid dates,
+            missing dates left out.
+        """
+        return [position for position, ordinal in enumerate(self._ordinals)
+            if ordinal == __invalid_ordinal__ and self._dates[position]]
+
+    def argsort(self):
+        """
+        Returns:
+            list: the positions of the valid dates, from the earliest date
+            to the latest.
+        """
+        if self._order is None:
+            self._order = sorted((position for position, ordinal in
+                enumerate(self._ordinals) if ordinal != __invalid_ordinal__),
+                key=self._ordinals.__getitem__)
+            self._sorted_ordinals = array(__ordinal_typecode__,
+                [self._ordinals[position] for position in self._order])
+        return self._order
+
+    def sorted_ordinals(self):
+        """
+        Returns:
+            array: the ordinals of the valid dates, sorted.
+        """
+        self.argsort()
+        return self._sorted_ordinals
+
+    def between(self, start=None, end=None):
+        """
+        Args:
+            start: (optional) earliest date, inclusive, as accepted by
+                `to_ordinal`.
+            end: (optional) latest date, inclusive.
+
+        Returns:
+            list: the positions of the dates between `start` and `end`, from
+            the earliest date to the latest.
+        """
+        order = self.argsort()
+        low = 0
+        high = len(order)
+        if start is not None:
+            low = bisect.bisect_left(self._sorted_ordinals, to_ordinal(start))
+        if end is not None:
+            high = bisect.bisect_right(self._sorted_ordinals, to_ordinal(end))
+        return order[low:high]
+
+def principal_date_columns(principals):
+    """
+    Normalizes the dates of a batch of principals.
+
+    Args:
+        principals(list): principal dicts, or records.
+
+    Returns:
+        dict: the `DateColumn`s of the principals' `reg_date` and
+        `principal_reg_date`, and of their exhibits' `date_stamped`, whose
+        owners are the positions of the exhibits' principals.
+    """
+    stamped_dates = []
+    owners = []
+    for position, principal_dict in enumerate(principals):
+        for exhibit in principal_dict.get("exhibit") or []:
+            stamped_dates.append(exhibit.get("date_stamped"))
+            owners.append(position)
+
+    return {
+        "reg_date": DateColumn(principal_dict.get("reg_date")
+            for principal_dict in principals),
+        "principal_reg_date": DateColumn(principal_dict.get(
+            "principal_reg_date") for principal_dict in principals),
+        "date_stamped": DateColumn(stamped_dates, owners=owners),
+    }
@@ -0,0 +1,110 @@
+"""
+This module contains the utilities used to deduplicate the principals a
+crawl emits.
+
+The active principals list has more rows than unique principals, so the
+same principal is emitted more than once. Telling whether a principal was
+already emitted has to be constant time per principal and cheap in memory,
+so a `KeyIndex` keeps a 64 bit digest of each key in a flat array, rather
+than the keys themselves in a python set.
+"""
+
+import hashlib
+import struct
+from array import array
+
+#the widest unsigned array typecode available, python 2 has no 'Q'
+try:
+    array('Q')
+    __digest_typecode__ = 'Q'
+except ValueError:
+    __digest_typecode__ = 'L'
+
+def merge_exhibits(exhibits, other_exhibits):
+    """
+    Args:
+        exhibits(list): exhibit dicts of a principal.
+        other_exhibits(list): exhibit dicts of a duplicate of the principal.
+
+    Returns:
+        list: `exhibits` followed by the exhibits of `other_exhibits` whose
+        `document_link` is not yet among them.
+    """
+    merged = list(exhibits or [])
+    document_links = set(exhibit.get("document_link") for exhibit in merged)
+    for exhibit in other_exhibits or []:
+        if exhibit.get("document_link") not in document_links:
+            document_links.add(exhibit.get("document_link"))
+            merged.append(exhibit)
+    return merged
+
+class KeyIndex:
+    """
+    Set of keys backed by an open addressing hash table of key digests.
+    Each slot of the table takes 8 bytes, so millions of keys fit in a few
+    tens of megabytes. Two different keys sharing a 64 bit digest are taken
+    as the same key, which is vanishingly unlikely for the number of keys a
+    crawl deals with.
+
+    Keyword Args:
+        capacity(int): (optional) number of keys the index is sized for
+            before it has to grow.
+    """
+
+    #the table grows once it's more than this full
+    _max_load = 0.66
+
+    def __init__(self, capacity=1024, *args, **kwargs):
+        size = 8
+        while size * self._max_load < capacity:
+            size *= 2
+        self._slots = array(__digest_typecode__, [0]) * size
+        self._digest_mask = (1 << (8 * self._slots.itemsize)) - 1
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, key):
+        digest = self._digest(key)
+        return self._slots[self._slot(digest)] == digest
+
+    def add(self, key):
+        """
+        Returns:
+            bool: True if `key` was not in the index yet.
+        """
+        digest = self._digest(key)
+        slot = self._slot(digest)
+        if self._slots[slot] == digest:
+            return False
+
+        self._slots[slot] = digest
+        self._count += 1
+        if self._count > len(self._slots) * self._max_load:
+            self._grow()
+        return True
+
+    def _digest(self, key):
+        if not isinstance(key, bytes):
+            key = key.encode('utf-8')
+        digest = struct.unpack('<Q', hashlib.md5(key).digest()[:8])[0]
+        #0 marks an empty slot
+        return (digest & self._digest_mask) or 1
+
+    def _slot(self, digest):
+        """
+        returns the slot holding `digest`, or the empty slot it would be
+        stored in.
+        """
+        mask = len(self._slots) - 1
+        slot = digest & mask
+        while self._slots[slot] and self._slots[slot] != digest:
+            slot = (slot + 1) & mask
+        return slot
+
+    def _grow(self):
+        digests = [digest for digest in self._slots if digest]
+        self._slots = array(__digest_typecode__, [0]) * (len(self._slots) * 2)
+        for digest in digests:
+            self._slots[self._slot(digest)] = digest
@@ -0,0 +1,183 @@
+"""
+This module contains the comparison of two exported crawls of the active
+principals.
+
+Each snapshot is first read one principal at a time into 64 bit digests of
+it's key (see `principal_key`), of it's fields and of each of it's exhibits,
+so comparing them takes memory for the digests rather than the records.
+Only the principals found to be added, removed or changed are then read
+again in full, to report what changed about them. Duplicate principals of a
+snapshot are merged, their exhibits put together.
+
+Changes are dicts, one per principal:
+    {"change": "added", "key": {...}, "principal": {...}}
+    {"change": "removed", "key": {...}, "principal": {...}}
+    {"change": "changed", "key": {...},
+        "fields": {field: {"old": ..., "new": ...}},
+        "added_exhibits": [...], "removed_exhibits": [...],
+        "changed_exhibits": [{"old": {...}, "new": {...}}]}
+"""
+
+import hashlib
+import json
+import struct
+from collections import OrderedDict
+
+from fara_principals.core.dedup import merge_exhibits
+from fara_principals.core.feeds import iter_principals
+from fara_principals.core.pages import exhibit_url_key
+from fara_principals.core.state import principal_key
+
+__key_fields__ = ("reg_number", "principal_name", "principal_reg_date")
+#fields holding a principal's exhibits rather than a value of it's own
+__exhibit_fields__ = ("exhibit", "exhibits")
+
+def _digest(value):
+    """
+    returns a 64 bit digest of a json serializable value.
+    """
+    encoded = json.dumps(value, sort_keys=True).encode('utf-8')
+    return struct.unpack('<Q', hashlib.md5(encoded).digest()[:8])[0]
+
+def _fields(principal_dict):
+    """
+    returns the fields of a principal which are compared, without the
+    session specific part of it's url.
+    """
+    fields = dict((key, value) for key, value in principal_dict.items()
+        if key not in __exhibit_fields__)
+    if fields.get("url"):
+        fields["url"] = exhibit_url_key(fields["url"])
+    return fields
+
+def _exhibits(principal_dict):
+    return principal_dict.get("exhibit") or []
+
+class _SnapshotDigests:
+    """
+    The digests of the principals of an exported crawl, keyed on the digest
+    of their key.
+    """
+
+    def __init__(self, path, *args, **kwargs):
+        #key digest -> [fields digest, {document link digest: exhibit digest}]
+        self._principals = {}
+        for principal_dict in iter_principals(path):
+            key = _digest(principal_key(principal_dict))
+            digests = self._principals.get(key)
+            if digests is None:
+                digests = [_digest(_fields(principal_dict)), {}]
+                self._principals[key] = digests
+
+            for exhibit in _exhibits(principal_dict):
+                digests[1].setdefault(_digest(exhibit.get("document_link")),
+                    _digest(exhibit))
+
+    def keys(self):
+        return set(self._principals)
+
+    def __getitem__(self, key):
+        return self._principals[key]
+
+def _read_principals(path, keys):
+    """
+    reads a snapshot again for the principals of `keys`, returns them keyed
+    on their key digest in the order of the snapshot, with the exhibits of
+    their duplicates merged in.
+    """
+    principals = OrderedDict()
+    for principal_dict in iter_principals(path):
+        key = _digest(principal_key(principal_dict))
+        if key not in keys:
+            continue
+        if key in principals:
+            principals[key]["exhibit"] = merge_exhibits(
+                _exhibits(principals[key]), _exhibits(principal_dict))
+        else:
+            principals[key] = dict(principal_dict)
+    return principals
+
+def diff_snapshots(old_path, new_path):
+    """
+    Compares two exported crawls of the active principals, each a json or
+    json lines file.
+
+    Args:
+        old_path(str): path of the earlier crawl.
+        new_path(str): path of the later crawl.
+
+    Returns:
+        generator: the change dicts of the principals added, changed and
+        removed between the crawls, in that order. Added and changed
+        principals are in the order of the later crawl, removed ones in the
+        order of the earlier crawl.
+    """
+    old = _SnapshotDigests(old_path)
+    new = _SnapshotDigests(new_path)
+    old_keys = old.keys()
+    new_keys = new.keys()
+    changed = set()
+    for key in old_keys & new_keys:
+        if old[key] != new[key]:
+            changed.add(key)
+    added = new_keys - old_keys
+    removed = old_keys - new_keys
+    #the digests are no longer needed once the changed keys are known
+    del old, new
+
+    return _changes(_read_principals(old_path, changed | removed),
+        _read_principals(new_path, changed | added), added, removed)
+
+def _changes(old_principals, new_principals, added, removed):
+    for key, principal_dict in new_principals.items():
+        if key in added:
+            yield {"change": "added", "key": _key(principal_dict),
+                "principal": principal_dict}
+        else:
+            yield principal_changes(old_principals[key], principal_dict)
+
+    for key, principal_dict in old_principals.items():
+        if key in removed:
+            yield {"change": "removed", "key": _key(principal_dict),
+                "principal": principal_dict}
+
+def _exhibits_by_link(principal_dict):
+    exhibits = OrderedDict()
+    for exhibit in _exhibits(principal_dict):
+        exhibits.setdefault(exhibit.get("document_link"), exhibit)
+    return exhibits
+
+def _key(principal_dict):
+    return dict((field, principal_dict.get(field)) for field in __key_fields__)
+
+def principal_changes(old_dict, new_dict):
+    """
+    Args:
+        old_dict(dict): full dict of a principal in the earlier crawl.
+        new_dict(dict): full dict of the same principal in the later crawl.
+
+    Returns:
+        dict: the `changed` change dict of the principal, listing the fields
+        whose values differ and the exhibits added, removed or changed,
+        keyed on their `document_link`.
+    """
+    old_fields = _fields(old_dict)
+    new_fields = _fields(new_dict)
+    fields = {}
+    for field in sorted(set(old_fields) | set(new_fields)):
+        if old_fields.get(field) != new_fields.get(field):
+            fields[field] = {"old": old_dict.get(field),
+                "new": new_dict.get(field)}
+
+    old_exhibits = _exhibits_by_link(old_dict)
+    new_exhibits = _exhibits_by_link(new_dict)
+    return {
+        "change": "changed", "key": _key(new_dict), "fields": fields,
+        "added_exhibits": [exhibit for link, exhibit in new_exhibits.items()
+            if link not in old_exhibits],
+        "removed_exhibits": [exhibit for link, exhibit in old_exhibits.items()
+            if link not in new_exhibits],
+        "changed_exhibits": [{"old": old_exhibits[link], "new": exhibit}
+            for link, exhibit in new_exhibits.items()
+            if link in old_exhibits and old_exhibits[link] != exhibit]
+    }
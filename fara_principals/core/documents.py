@@ -0,0 +1,468 @@
+"""
+This module contains the downloader of the documents exhibits link to.
+
+Documents are stored by the sha256 of their content, so a document linked
+from several exhibits, or served under several links, is stored once:
+
+    <root>/objects/<first 2 hex digits>/<sha256><extension>
+
+A download is written to `<root>/partial/` first, and an interrupted
+download is resumed from where it stopped with a Range request, the next
+time it's document is downloaded. A manifest, `<root>/manifest.jl`, holds a
+json line per exhibit whose document was stored, linking the principal and
+the exhibit to the stored document. Documents already in the manifest are
+not downloaded again.
+
+Downloads run on a pool of threads, each with it's own `requests.Session`
+since sessions can't be shared between threads, with at most `per_host` of
+them downloading from the same host at a time. A thread doesn't wait for a
+busy host, the download is put aside until one of the host's downloads is
+done and the thread moves on to the next document.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+from collections import deque
+
+try:
+    from queue import Queue
+    from urllib.parse import urlparse
+except ImportError:
+    from Queue import Queue
+    from urlparse import urlparse
+
+import requests
+
+from fara_principals.core.state import principal_key
+from fara_principals.exceptions import DocumentError
+
+logger = logging.getLogger(__name__)
+
+__chunk_size__ = 64 * 1024
+__content_range_re__ = re.compile(r"^bytes (?:\d+-\d+|\*)/(\d+|\*)$")
+
+#exhibit fields copied to the manifest
+__exhibit_fields__ = ("document_link", "document_type", "date_stamped")
+#principal fields copied to the manifest
+__principal_fields__ = ("reg_number", "principal_name", "principal_reg_date",
+    "registrant")
+#fields of the stored document in the manifest
+__document_fields__ = ("document_link", "sha256", "path", "size",
+    "content_type")
+
+def _url_digest(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+def _extension(url):
+    """
+    returns the extension of the last segment of `url`'s path, e.g `.pdf`,
+    or an empty string.
+    """
+    extension = os.path.splitext(urlparse(url).path)[1].lower()
+    return extension if re.match(r"^\.[a-z0-9]{1,8}$", extension) else ""
+
+def _content_range_total(response):
+    """
+    returns the total size given by the Content-Range of a response, or
+    None.
+    """
+    match = __content_range_re__.match(
+        response.headers.get("Content-Range", ""))
+    if match and match.group(1) != "*":
+        return int(match.group(1))
+    return None
+
+class DocumentStore:
+    """
+    Content addressed storage of documents, with it's manifest.
+
+    Args:
+        root(str): directory the documents and the manifest are kept in,
+            created if it doesn't exist.
+    """
+
+    def __init__(self, root, *args, **kwargs):
+        self._root = root
+        for directory in ("objects", "partial"):
+            path = os.path.join(root, directory)
+            if not os.path.isdir(path):
+                os.makedirs(path)
+
+        self._lock = threading.Lock()
+        #document link -> document fields of the stored document
+        self._documents = {}
+        #(principal key, document link) of the manifest entries
+        self._references = set()
+        self._manifest_path = os.path.join(root, "manifest.jl")
+        self._read_manifest()
+        self._manifest = io.open(self._manifest_path, 'ab')
+
+    def _read_manifest(self):
+        if not os.path.exists(self._manifest_path):
+            return
+
+        with io.open(self._manifest_path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    #a line cut short by an interrupted write
+                    continue
+                if os.path.exists(os.path.join(self._root, entry["path"])):
+                    self._documents[entry["document_link"]] = dict(
+                        (field, entry.get(field))
+                        for field in __document_fields__)
+                    self._references.add(
+                        (principal_key(entry), entry["document_link"]))
+
+    def root(self):
+        return self._root
+
+    def document(self, document_link):
+        """
+        Returns:
+            dict: the document fields of the stored document of a link, or
+            None if it is not stored.
+        """
+        with self._lock:
+            return self._documents.get(document_link)
+
+    def partial_path(self, document_link):
+        return os.path.join(self._root, "partial",
+            _url_digest(document_link) + ".part")
+
+    def store(self, document_link, partial_path, sha256, content_type=None):
+        """
+        Moves a downloaded document to it's content address, unless a
+        document with the same content is already stored.
+
+        Returns:
+            dict: the document fields of the manifest entries.
+        """
+        path = os.path.join("objects", sha256[:2],
+            sha256 + _extension(document_link))
+        full_path = os.path.join(self._root, path)
+        with self._lock:
+            if not os.path.isdir(os.path.dirname(full_path)):
+                os.makedirs(os.path.dirname(full_path))
+            if os.path.exists(full_path):
+                os.remove(partial_path)
+            else:
+                os.rename(partial_path, full_path)
+
+            document = {"document_link": document_link, "sha256": sha256,
+                "path": path, "size": os.path.getsize(full_path),
+                "content_type": content_type}
+            self._documents[document_link] = document
+        return document
+
+    def add_reference(self, document, principal_dict, exhibit):
+        """
+        Writes the manifest entry linking a principal's exhibit to a stored
+        document, if it isn't in the manifest yet.
+        """
+        entry = dict((field, principal_dict.get(field))
+            for field in __principal_fields__)
+        entry.update((field, exhibit.get(field))
+            for field in __exhibit_fields__)
+        entry.update(document)
+        reference = (principal_key(entry), entry["document_link"])
+
+        with self._lock:
+            if reference in self._references:
+                return
+            self._references.add(reference)
+            self._manifest.write(json.dumps(entry, sort_keys=True)\
+                .encode('utf-8') + b"\n")
+            self._manifest.flush()
+
+    def close(self):
+        with self._lock:
+            self._manifest.close()
+
+class DocumentDownloader:
+    """
+    Downloads the documents of exhibits on a pool of threads.
+
+    Args:
+        store(DocumentStore): store the documents are saved to.
+
+    Keyword Args:
+        concurrency(int): (optional) number of download threads.
+        per_host(int): (optional) most downloads from the same host at a
+            time.
+        timeout(float): (optional) timeout of the requests, in seconds.
+        max_retries(int): (optional) number of times a failed download is
+            retried, resuming from the bytes already downloaded.
+        headers(dict): (optional) headers sent with every request.
+        session_factory(callable): (optional) returns a new
+            `requests.Session`, each thread sends it's requests with a
+            session of it's own.
+    """
+
+    def __init__(self, store, concurrency=8, per_host=2, timeout=60.0,
+        max_retries=2, headers=None, session_factory=requests.Session,
+        *args, **kwargs):
+        self.store = store
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._headers = headers
+        self._session_factory = session_factory
+        self._local = threading.local()
+
+        self._queue = Queue()
+        self._lock = threading.Lock()
+        #host -> number of documents being downloaded from it
+        self._host_downloads = {}
+        #host -> document links put aside until the host is not busy
+        self._host_waiting = {}
+        #document link -> [(principal dict, exhibit)] waiting for it
+        self._pending = {}
+        self._threads = []
+        self.stats = {"downloaded": 0, "resumed": 0, "skipped": 0,
+            "failed": 0}
+
+    def start(self):
+        for _ in range(self.concurrency):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self):
+        """
+        Waits for the queued downloads to finish, then stops the threads.
+        """
+        #a download put aside is queued again before the download holding
+        #it's host is done, so the queue is only done once they all are
+        self._queue.join()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def add_principal(self, principal_dict):
+        """
+        Queues the documents of a full principal's exhibits. Documents which
+        are stored already are only added to the manifest.
+        """
+        for exhibit in principal_dict.get("exhibit") or []:
+            document_link = exhibit.get("document_link")
+            if not document_link:
+                continue
+
+            #a document is stored before it stops being pending, so it is
+            #either pending or stored once it has been queued
+            with self._lock:
+                waiting = self._pending.get(document_link)
+                if waiting is not None:
+                    waiting.append((principal_dict, exhibit))
+                    continue
+                document = self.store.document(document_link)
+                if document is None:
+                    self._pending[document_link] = [(principal_dict, exhibit)]
+                    self._queue.put(document_link)
+                    continue
+
+            self.store.add_reference(document, principal_dict, exhibit)
+            self._inc_stats("skipped")
+
+    def _work(self):
+        while True:
+            document_link = self._queue.get()
+            if document_link is None:
+                self._queue.task_done()
+                return
+
+            try:
+                if self._acquire_host(document_link):
+                    try:
+                        self._download_document(document_link)
+                    finally:
+                        self._release_host(document_link)
+            finally:
+                self._queue.task_done()
+
+    def _download_document(self, document_link):
+        document = None
+        try:
+            document = self._download_with_retries(document_link)
+        except Exception as e:
+            self._inc_stats("failed")
+            logger.error("could not download {}: {}".format(
+                document_link, e))
+
+        with self._lock:
+            waiting = self._pending.pop(document_link, [])
+        if document is not None:
+            for principal_dict, exhibit in waiting:
+                self.store.add_reference(document, principal_dict, exhibit)
+
+    def _download_with_retries(self, document_link):
+        retries = 0
+        while True:
+            try:
+                return self.download(document_link)
+            except (requests.RequestException, DocumentError) as e:
+                if retries >= self.max_retries:
+                    raise
+                retries += 1
+                logger.info("retrying download of {}: {}".format(
+                    document_link, e))
+
+    def _acquire_host(self, document_link):
+        """
+        returns True if a document can be downloaded from it's host right
+        away, otherwise puts it aside until one of the host's downloads is
+        done.
+        """
+        host = urlparse(document_link).netloc
+        with self._lock:
+            downloads = self._host_downloads.get(host, 0)
+            if downloads >= self.per_host:
+                self._host_waiting.setdefault(host, deque()).append(
+                    document_link)
+                return False
+            self._host_downloads[host] = downloads + 1
+            return True
+
+    def _release_host(self, document_link):
+        """
+        records that a download from a host is done, and queues the next
+        document put aside for the host.
+        """
+        host = urlparse(document_link).netloc
+        with self._lock:
+            self._host_downloads[host] -= 1
+            if not self._host_downloads[host]:
+                del self._host_downloads[host]
+            waiting = self._host_waiting.get(host)
+            if waiting:
+                self._queue.put(waiting.popleft())
+                if not waiting:
+                    del self._host_waiting[host]
+
+    def _session(self):
+        """
+        returns the session of the current thread.
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._session_factory()
+            if self._headers:
+                session.headers.update(self._headers)
+            self._local.session = session
+        return session
+
+    def download(self, document_link):
+        """
+        Downloads a document to the store, resuming a partial download of it
+        if there is one.
+
+        Returns:
+            dict: the document fields of the manifest entries.
+
+        Raises:
+            DocumentError: when the server's response isn't a document or
+            the download is cut short.
+            requests.RequestException: when the request fails.
+        """
+        partial_path = self.store.partial_path(document_link)
+        offset = 0
+        if os.path.exists(partial_path):
+            offset = os.path.getsize(partial_path)
+
+        #the sizes of the Content-Length and Content-Range headers, and the
+        #offsets of ranges, count the bytes sent, which are only the bytes
+        #of the document when it isn't compressed
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = "bytes={}-".format(offset)
+
+        response = self._session().get(document_link, headers=headers,
+            stream=True, timeout=self.timeout)
+        try:
+            return self._save_response(document_link, response, partial_path,
+                offset)
+        finally:
+            response.close()
+
+    def _save_response(self, document_link, response, partial_path, offset):
+        if response.status_code == 416 and offset:
+            #the partial download may have every byte already
+            if _content_range_total(response) == offset:
+                return self._store(document_link, partial_path,
+                    self._partial_digest(partial_path),
+                    response.headers.get("Content-Type"), offset)
+            os.remove(partial_path)
+            raise DocumentError("range of {} not satisfiable, restarting "
+                "it".format(document_link))
+        if response.status_code not in (200, 206):
+            raise DocumentError("{} returned status {}".format(document_link,
+                response.status_code))
+
+        encoded = response.headers.get("Content-Encoding",
+            "identity").lower() != "identity"
+        if encoded and response.status_code == 206 and offset:
+            #the server compressed the document anyway, the range it sent
+            #can't be appended to the decoded bytes already downloaded
+            os.remove(partial_path)
+            raise DocumentError("{} resumed compressed, restarting "
+                "it".format(document_link))
+
+        if response.status_code == 206 and offset:
+            digest = self._partial_digest(partial_path)
+            expected = _content_range_total(response)
+            mode = 'ab'
+            self._inc_stats("resumed")
+        else:
+            #the server ignored the range, the download starts over
+            digest = hashlib.sha256()
+            expected = response.headers.get("Content-Length")
+            if expected is None or encoded:
+                expected = None
+            else:
+                expected = int(expected)
+            offset = 0
+            mode = 'wb'
+
+        size = offset
+        with open(partial_path, mode) as f:
+            for chunk in response.iter_content(__chunk_size__):
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+
+        if expected is not None and size != expected:
+            raise DocumentError("download of {} stopped at {} of {} "
+                "bytes".format(document_link, size, expected))
+        return self._store(document_link, partial_path, digest,
+            response.headers.get("Content-Type"), size)
+
+    def _partial_digest(self, partial_path):
+        digest = hashlib.sha256()
+        with open(partial_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(__chunk_size__), b""):
+                digest.update(chunk)
+        return digest
+
+    def _store(self, document_link, partial_path, digest, content_type, size):
+        sha256 = digest.hexdigest()
+        document = self.store.store(document_link, partial_path, sha256,
+            content_type=content_type)
+        self._inc_stats("downloaded")
+        logger.debug("stored {} ({} bytes) as {}".format(document_link, size,
+            document["path"]))
+        return document
+
+    def _inc_stats(self, key):
+        with self._lock:
+            self.stats[key] += 1
@@ -0,0 +1,94 @@
+"""
+This module contains the json encoders principals are exported with.
+
+The fastest json library installed is used, in this order: orjson, ujson,
+simplejson and the standard library's json. Every backend encodes to the
+same compact, utf-8 json, without escaping non ascii characters, so the
+output doesn't depend on which one is installed. Records of
+`fara_principals.core.principals` and scrapy items are encoded from their
+fields, without copying their values.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+def _encodable(value):
+    """
+    returns `value` with a record or item replaced by a dict of it's fields,
+    which shares their values.
+    """
+    if not isinstance(value, dict) and hasattr(value, "items"):
+        return dict(value.items())
+    return value
+
+def _utf8(text):
+    if isinstance(text, bytes):
+        return text
+    return text.encode('utf-8')
+
+def _orjson_dumps(value):
+    return orjson.dumps(_encodable(value))
+
+def _ujson_dumps(value):
+    return _utf8(ujson.dumps(_encodable(value), ensure_ascii=False,
+        escape_forward_slashes=False))
+
+def _simplejson_dumps(value):
+    return _utf8(simplejson.dumps(_encodable(value), ensure_ascii=False,
+        separators=(",", ":")))
+
+def _json_dumps(value):
+    return _utf8(json.dumps(_encodable(value), ensure_ascii=False,
+        separators=(",", ":")))
+
+#name -> (module, dumps) of each backend, fastest first
+__backends__ = [
+    ("orjson", orjson, _orjson_dumps),
+    ("ujson", ujson, _ujson_dumps),
+    ("simplejson", simplejson, _simplejson_dumps),
+    ("json", json, _json_dumps),
+]
+
+def available_backends():
+    """
+    Returns:
+        list: the names of the installed json backends, fastest first.
+    """
+    return [name for name, module, _ in __backends__ if module is not None]
+
+def get_encoder(backend=None):
+    """
+    Args:
+        backend(str): (optional) name of the json backend, the fastest one
+            installed when not given.
+
+    Returns:
+        function: encodes a json serializable value, or a record, to utf-8
+        json bytes.
+
+    Raises:
+        ValueError: when the backend is unknown or not installed.
+    """
+    for name, module, dumps in __backends__:
+        if module is None or backend not in (None, name):
+            continue
+        return dumps
+    raise ValueError("json backend `{}` is not available, installed "
+        "backends are {}".format(backend, ", ".join(available_backends())))
+
+#encodes with the fastest json backend installed
+dumps = get_encoder()
@@ -0,0 +1,102 @@
+"""
+This module contains the readers of the files a crawl's principals are
+exported to.
+
+Scrapy exports principals either as a single json array (`-o file.json`,
+like `principals.json`) or as json lines (`-o file.jl`). Both are read one
+principal at a time, so a file never has to be loaded whole.
+"""
+
+import io
+import json
+
+#number of characters read from a feed at a time
+__read_size__ = 64 * 1024
+
+def iter_principals(path):
+    """
+    Yields the principal dicts of an exported feed, whether it is a json
+    array or json lines.
+
+    Args:
+        path(str): path of the feed.
+
+    Raises:
+        ValueError: when the feed isn't valid json.
+    """
+    with io.open(path, 'r', encoding='utf-8') as f:
+        for principal_dict in iter_feed(f):
+            yield principal_dict
+
+def iter_feed(f):
+    """
+    Yields the json values of a file object holding either a json array or
+    json lines.
+    """
+    decoder = json.JSONDecoder()
+    buffer = _skip_whitespace(f, u"")
+    if buffer.startswith(u"["):
+        values = _iter_array(f, decoder, buffer[1:])
+    else:
+        values = _iter_lines(f, decoder, buffer)
+
+    for value in values:
+        yield value
+
+def _skip_whitespace(f, buffer):
+    """
+    returns `buffer` without it's leading whitespace, reading more of `f`
+    until a value starts or the file ends.
+    """
+    buffer = buffer.lstrip()
+    while not buffer:
+        chunk = f.read(__read_size__)
+        if not chunk:
+            return buffer
+        buffer = chunk.lstrip()
+    return buffer
+
+def _decode(f, decoder, buffer):
+    """
+    returns the value at the start of `buffer` and what follows it, reading
+    more of `f` while the value is incomplete.
+    """
+    while True:
+        try:
+            value, end = decoder.raw_decode(buffer)
+        except ValueError:
+            chunk = f.read(__read_size__)
+            if not chunk:
+                raise
+            buffer += chunk
+            continue
+
+        #a number may be cut short by the end of the buffer
+        if end == len(buffer):
+            chunk = f.read(__read_size__)
+            if chunk:
+                buffer += chunk
+                continue
+        return value, buffer[end:]
+
+def _iter_array(f, decoder, buffer):
+    buffer = _skip_whitespace(f, buffer)
+    if buffer.startswith(u"]"):
+        return
+
+    while True:
+        value, buffer = _decode(f, decoder, buffer)
+        yield value
+
+        buffer = _skip_whitespace(f, buffer)
+        if buffer.startswith(u"]"):
+            return
+        if not buffer.startswith(u","):
+            raise ValueError("expected `,` or `]` in json array")
+        buffer = _skip_whitespace(f, buffer[1:])
+
+def _iter_lines(f, decoder, buffer):
+    while buffer:
+        value, buffer = _decode(f, decoder, buffer)
+        yield value
+        buffer = _skip_whitespace(f, buffer)
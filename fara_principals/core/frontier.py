@@ -0,0 +1,88 @@
+"""
+This module contains the policy which keeps the discovery of list pages from
+running ahead of the exhibit pages their principals are waiting on.
+
+Every list page hands out up to a page's worth of exhibit requests, so
+requesting every page as soon as the report's total is known queues the
+exhibit work of the whole report at once. A `PageFrontier` holds the pages
+still to be requested and only releases them while the exhibit work
+pending, along with the exhibit work the pages in flight may still hand
+out, stays under a limit.
+
+List pages are requested with a higher priority than exhibit pages, so the
+next pages are discovered while the exhibits of the previous ones are being
+fetched, and the bootstraps of sessions go before both.
+"""
+
+from collections import deque
+
+#scrapy request priorities, higher priorities are downloaded first
+__bootstrap_priority__ = 2
+__page_priority__ = 1
+__exhibit_priority__ = 0
+
+class PageFrontier:
+    """
+    Keyword Args:
+        max_pending_exhibits(int): (optional) most exhibit pages which can
+            be waited on, or handed out by the list pages in flight, before
+            no more list pages are released.
+    """
+
+    def __init__(self, max_pending_exhibits=200, *args, **kwargs):
+        self._max_pending_exhibits = max_pending_exhibits
+        #(page_size, page_number, follow_next_page, total_rows) of each
+        #page still to be requested
+        self._pages = deque()
+        #page size of each page in flight
+        self._pages_in_flight = []
+
+    def add_page(self, page_size, page_number, follow_next_page=False,
+        total_rows=None):
+        self._pages.append((page_size, page_number, follow_next_page,
+            total_rows))
+
+    def max_pending_exhibits(self):
+        return self._max_pending_exhibits
+
+    def drop_pages_after(self, last_row):
+        """
+        Drops the pages still to be requested which start past `last_row`,
+        the position of the report's last principal.
+        """
+        self._pages = deque(page for page in self._pages
+            if (page[1] - 1) * page[0] < last_row)
+
+    def pending_pages(self):
+        return len(self._pages)
+
+    def pages_in_flight(self):
+        return len(self._pages_in_flight)
+
+    def page_finished(self, page_size):
+        """
+        Records that a list page released by the frontier has been parsed,
+        or will not be retried.
+        """
+        if page_size in self._pages_in_flight:
+            self._pages_in_flight.remove(page_size)
+
+    def release(self, pending_exhibits):
+        """
+        Yields the pages which can be requested, as
+        `(page_size, page_number, follow_next_page, total_rows)` tuples. A
+        page is always released when no other work is pending, so the crawl
+        moves on whatever the page size.
+
+        Args:
+            pending_exhibits(int): number of exhibit pages being waited on.
+        """
+        while self._pages:
+            page_size = self._pages[0][0]
+            reserved = pending_exhibits + sum(self._pages_in_flight)
+            idle = pending_exhibits == 0 and not self._pages_in_flight
+            if not idle and reserved + page_size > self._max_pending_exhibits:
+                return
+
+            self._pages_in_flight.append(page_size)
+            yield self._pages.popleft()
@@ -26,8 +26,9 @@ to as the `Page Context` in this core module.
 """
 
 import copy
+import re
 
-import requests
+from lxml import etree
 from scrapy import Selector
 
 from fara_principals.core.principals import ForeignPrincipal, Exhibit
@@ -41,6 +42,16 @@ from fara_principals.exceptions import (
 __main_url__ = \
     'https://efile.fara.gov/pls/apex/f?p=171:130:0::NO:RP,130:P130_DATERANGE:N'
 
+#url the paginated list pages are requested from
+__next_page_url__ = "https://efile.fara.gov/pls/apex/wwv_flow.show"
+
+#number of principals the server lists on a page unless told otherwise
+__default_page_size__ = 15
+
+#rows per page values offered by the worksheet's `Rows Per Page` menu, used
+#when the menu can't be found on the main page
+__offered_page_sizes__ = (1, 5, 10, 15, 20, 25, 50, 100, 1000, 100000)
+
 #default template for a page's contextual information
 __default_page_context__ = {
     "instance_id": None, "flow_id": None, "flow_step_id": None,
@@ -53,15 +64,30 @@ __default_next_page_form_data__ = {
     "p_instance": None,
     "p_flow_id": None,
     "p_flow_step_id": None,
-    "p_widget_num_return": "15",
+    "p_widget_num_return": None,
     "p_widget_name": "worksheet",
     "p_widget_mod": "ACTION",
     "p_widget_action": "PAGE",
-    "p_widget_action_mod": "pgR_min_row=1max_rows=15rows_fetched=15",
+    "p_widget_action_mod": None,
     "x01": None,
     "x02":None,
 }
 
+#maps the column id a principal cell's `headers` attribute starts with to
+#the partial principal field held in that cell
+__principal_columns__ = {
+    "FP_NAME": "principal_name",
+    "FP_REG_DATE": "principal_reg_date",
+    "ADDRESS_1": "address",
+    "STATE": "state",
+    "REGISTRANT_NAME": "registrant",
+    "REG_NUMBER": "reg_number",
+    "REG_DATE": "reg_date",
+}
+
+#number of bytes of page content fed at a time to the streaming row parser
+__stream_chunk_size__ = 16 * 1024
+
 #initial safe headers that wont flag users as a scraper
 __init_headers__ = {
    "Accept": "*/*",
@@ -76,6 +102,261 @@ __init_headers__ = {
     "User-Agent" : "Mozilla/5.0 (Windows NT 6.3; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/55.0.2883.87 Safari/537.36"
     }
 
+#xpath expressions are compiled once at import time and evaluated against the
+#single parsed document each page holds, rather than re-parsing the page's
+#html for every lookup.
+_INSTANCE_ID_XPATH = etree.XPath('//input[@name="p_instance"]/@value',
+    smart_strings=False)
+_FLOW_ID_XPATH = etree.XPath('//input[@name="p_flow_id"]/@value',
+    smart_strings=False)
+_FLOW_STEP_ID_XPATH = etree.XPath('//input[@name="p_flow_step_id"]/@value',
+    smart_strings=False)
+_WORKSHEET_ID_XPATH = etree.XPath('//input[@id="apexir_WORKSHEET_ID"]/@value',
+    smart_strings=False)
+_REPORT_ID_XPATH = etree.XPath('//input[@id="apexir_REPORT_ID"]/@value',
+    smart_strings=False)
+
+_COUNTRY_TH_XPATH = etree.XPath(
+    '//th[starts-with(@id, "BREAK_COUNTRY_NAME")]')
+_COUNTRY_NAME_XPATH = etree.XPath(
+    './/span[@class="apex_break_headers"]/text()', smart_strings=False)
+_PRINCIPAL_ROW_XPATH = etree.XPath(
+    '//tr[td[starts-with(@headers, "LINK BREAK_COUNTRY_NAME")]]')
+_LINK_HREF_XPATH = etree.XPath('.//a/@href', smart_strings=False)
+_PAGINATION_XPATH = etree.XPath(
+    '//td[@class="pagination"]//span[@class="fielddata"]/text()',
+    smart_strings=False)
+_ROWS_PER_PAGE_XPATH = etree.XPath(
+    '//ul[@id="apexir_ROWS_PER_PAGE_MENU"]//a/@href', smart_strings=False)
+
+#matches the `1 - 15 of 515` pagination text of a worksheet page
+_PAGINATION_RE = re.compile(r'(\d+)\s*-\s*(\d+)\s+of\s+(\d+)')
+#matches a `Rows Per Page` menu link e.g `javascript:gReport.search('SEARCH',50)`
+_ROWS_PER_PAGE_RE = re.compile(r"gReport\.search\('SEARCH',\s*(\d+)\)")
+
+_EXHIBIT_ROWS_XPATH = etree.XPath(
+    '//table[@class="apexir_WORKSHEET_DATA"]/tr[@class="even"] | ' + \
+    '//table[@class="apexir_WORKSHEET_DATA"]/tr[@class="odd"]')
+_EXHIBIT_DATE_STAMPED_XPATH = etree.XPath(
+    './/td[@headers="DATE_STAMPED"]/text()', smart_strings=False)
+_EXHIBIT_DOCLINK_XPATH = etree.XPath(
+    './/td[@headers="DOCLINK"]/a/@href', smart_strings=False)
+_EXHIBIT_REG_NUMBER_XPATH = etree.XPath(
+    './/td[@headers="REGISTRATION_NUMBER"]/text()', smart_strings=False)
+_EXHIBIT_REGISTRANT_XPATH = etree.XPath(
+    './/td[@headers="REGISTRANT_NAME"]/text()', smart_strings=False)
+_EXHIBIT_DOCUMENT_TYPE_XPATH = etree.XPath(
+    './/td[@headers="DOCUMENT_TYPE"]/text()', smart_strings=False)
+
+def _cell_text(cell):
+    """
+    returns the text directly held by a table cell, i.e what `td/text()`
+    would select, without evaluating an xpath.
+    """
+    return (cell.text or '') + ''.join(child.tail or '' for child in cell)
+
+def page_form_data(page_context, page_size=__default_page_size__):
+    """
+    Contructs the form data which requests the `page_size` principals of
+    the page numbered `page_context["page"]`.
+
+    Args:
+        page_context(dict): the page context of the session the page is
+            requested for.
+
+    Keyword Args:
+        page_size(int): (optional) number of principals to request per page.
+
+    Returns:
+        dict: page form data
+    """
+    form_data = copy.deepcopy(__default_next_page_form_data__)
+
+    min_rows = ((page_context["page"] - 1) * page_size) + 1
+    max_rows = min_rows + page_size -1
+    calculated_action = "pgR_min_row={}max_rows={}rows_fetched={}".format(
+        min_rows, max_rows, page_size)
+
+    form_data["p_instance"] = page_context["instance_id"]
+    form_data["p_flow_id"] = page_context["flow_id"]
+    form_data["p_flow_step_id"] = page_context["flow_step_id"]
+    form_data["p_widget_num_return"] = str(page_size)
+    form_data["p_widget_action_mod"] = calculated_action
+    form_data["x01"] = page_context["worksheet_id"]
+    form_data["x02"] = page_context["report_id"]
+
+    return form_data
+
+def session_form_data(form_data, page_context):
+    """
+    Args:
+        form_data(dict): form data of a list page request.
+        page_context(dict): the page context of another session.
+
+    Returns:
+        dict: a copy of `form_data` which requests the same rows with the
+        session `page_context` belongs to.
+    """
+    form_data = dict(form_data)
+    form_data["p_instance"] = page_context["instance_id"]
+    form_data["p_flow_id"] = page_context["flow_id"]
+    form_data["p_flow_step_id"] = page_context["flow_step_id"]
+    form_data["x01"] = page_context["worksheet_id"]
+    form_data["x02"] = page_context["report_id"]
+    return form_data
+
+def session_exhibit_url(url, page_context):
+    """
+    Args:
+        url(str): url of an exhibit page, as linked from a list page.
+        page_context(dict): the page context of another session.
+
+    Returns:
+        str: `url` with the page instance id of the session `page_context`
+        belongs to, e.g `f?p=171:200:<instance_id>::NO:...`.
+    """
+    return _with_instance_id(url, page_context["instance_id"])
+
+def exhibit_url_key(url):
+    """
+    Args:
+        url(str): url of an exhibit page.
+
+    Returns:
+        str: `url` without it's page instance id, which is the same for
+        every session and every principal linking to the same exhibit page.
+    """
+    return _with_instance_id(url, "")
+
+def _with_instance_id(url, instance_id):
+    base_url, separator, params = url.partition('?p=')
+    params = params.split(':', 3)
+    if not separator or len(params) < 4:
+        return url
+
+    params[2] = instance_id
+    return base_url + separator + ':'.join(params)
+
+def trap_reason(status, content, main_page=False, first_row=None,
+    total_rows=None):
+    """
+    Checks a response from the server for the signs of the pages it serves
+    when it thinks it is being scraped.
+
+    Args:
+        status(int): http status of the response.
+        content(str): body of the response.
+
+    Keyword Args:
+        main_page(bool): (optional) True if the response is for the main 
+            page, which must hold the page context.
+        first_row(int): (optional) position of the first principal that was
+            requested, for list page responses.
+        total_rows(int): (optional) total number of principals in the
+            report, for list page responses.
+
+    Returns:
+        str: a description of the trap the response looks like, or None 
+        if the response looks healthy.
+    """
+    if status == 404:
+        return "decoy 404"
+
+    if main_page:
+        try:
+            PrincipalListPage(__main_url__, content=content)
+        except PageInstanceInfoNotFoundError:
+            return "missing page context"
+
+    if first_row is not None and total_rows is not None and \
+    first_row <= total_rows and not _has_principal_rows(content):
+        #the report total may have been overstated, an empty page showing
+        #a lower total is past the real end of the report
+        page_total = _pagination_total(content)
+        if page_total is None or first_row <= page_total:
+            return "empty page with rows remaining"
+
+    return None
+
+def response_text(response):
+    """
+    Returns:
+        str: the decoded body of a scrapy response, which the pages of this
+        module are built from. Responses which aren't text, e.g some decoy
+        404s, are decoded as utf-8.
+    """
+    text = getattr(response, 'text', None)
+    if text is None:
+        text = response.body.decode('utf-8', 'replace')
+    return text
+
+def response_trap_reason(request, response):
+    """
+    Checks the response to one of the spider's requests with `trap_reason`,
+    reading what was requested off the request's meta. The main page
+    redirects, so a session's bootstrap is told by the `bootstrap` flag of
+    it's request rather than by it's url.
+
+    Args:
+        request(Request): the request the response is for.
+        response(Response): the response to check.
+
+    Returns:
+        str: a description of the trap the response looks like, or None
+        if the response looks healthy.
+    """
+    return trap_reason(response.status, response_text(response),
+        main_page=request.meta.get("bootstrap", False),
+        first_row=request.meta.get("first_row"),
+        total_rows=request.meta.get("total_rows"))
+
+def _pagination_total(content):
+    """
+    returns the report total shown by the pagination text of a page's
+    `content`, or None if it doesn't show it.
+    """
+    match = _PAGINATION_RE.search(
+        ''.join(_PAGINATION_XPATH(_parse_document(content))))
+    if not match:
+        return None
+    return int(match.group(3))
+
+def _has_principal_rows(content):
+    """
+    returns True if `content` holds a principal row, without parsing it
+    """
+    marker = "LINK BREAK_COUNTRY_NAME"
+    if isinstance(content, bytes):
+        marker = marker.encode('ascii')
+    return marker in content
+
+def _is_principal_row(row):
+    """
+    returns True if the <tr> `row` holds a principal, i.e it has a link cell
+    under a country break.
+    """
+    for cell in row:
+        if cell.tag == 'td' and cell.get('headers', '').startswith(
+        "LINK BREAK_COUNTRY_NAME"):
+            return True
+    return False
+
+def _content_chunks(content, chunk_size):
+    """
+    yields `content` as utf-8 encoded chunks of at most `chunk_size` bytes
+    """
+    if not isinstance(content, bytes):
+        content = content.encode('utf-8')
+    for start in range(0, len(content), chunk_size):
+        yield content[start:start + chunk_size]
+
+def _parse_document(content):
+    """
+    returns the root element of `content` parsed exactly once, the same way
+    scrapy's Selector would parse it.
+    """
+    return Selector(text=content).root
+
 class PrincipalListPage:
     """
     Page class with useful helpers responsible for navigating a paginated
@@ -94,21 +375,37 @@ class PrincipalListPage:
             scraped which makes it return 404 not found pages thereby
             confusing it's scrappers.
 
+        page_size(int): (optional) number of principals requested per page
+            when building the form data for the next page.
+
+        cookies(dict): (optional) session cookies set by the server when the
+            main page's content was fetched.
+
     Notes: the main (first) page contains the contextual infos in hidden
     html inputs so, it's not necessary for users to pass this info for 
     the main page. However, this info is needed for subsequent pages. The 
     context info can be provided to subsequent pages by calling 
     `self.get_page_context()`, and then passing it to the constructor of 
     subsequent pages.
+
+    The main page is not fetched by this class, callers fetch it with the
+    session (and cookie jar) the following pages are requested with, and
+    pass it's content.
     """
 
-    def __init__(self, url, content=None, page_context={}, *args, **kwargs):
+    def __init__(self, url, content=None, page_context={}, 
+        page_size=__default_page_size__, cookies=None, *args, **kwargs):
         self._url = url
+        self._page_size = page_size
         self._content = content
         if self._content:
             self._content = self._content.replace('&nbsp;', ' ')
 
-        self._cookies = None
+        self._cookies = cookies
+        self._document = None
+        self._principal_rows = None
+        self._partial_principals = None
+        self._row_count = None
         if self.is_main_page():
             self._build_main_page()
         else:
@@ -151,8 +448,7 @@ class PrincipalListPage:
 
     def _page_instance_id(self):
         try:
-            instance_id = Selector(text=self._content).\
-                xpath('//input[@name="p_instance"]/@value').extract()[0]
+            instance_id = _INSTANCE_ID_XPATH(self._page_document())[0]
             return str(instance_id)
         except Exception:
             raise PageInstanceInfoNotFoundError("page data {} not found".\
@@ -160,8 +456,7 @@ class PrincipalListPage:
 
     def _page_flow_id(self):
         try:
-            flow_id = Selector(text=self._content).\
-                xpath('//input[@name="p_flow_id"]/@value').extract()[0]
+            flow_id = _FLOW_ID_XPATH(self._page_document())[0]
             return str(flow_id)
         except Exception:
             raise PageInstanceInfoNotFoundError("page data {} not found".\
@@ -169,8 +464,7 @@ class PrincipalListPage:
 
     def _page_flow_step_id(self):
         try:
-            flow_step_id = Selector(text=self._content).\
-                xpath('//input[@name="p_flow_step_id"]/@value').extract()[0]
+            flow_step_id = _FLOW_STEP_ID_XPATH(self._page_document())[0]
             return str(flow_step_id)
         except Exception:
             raise PageInstanceInfoNotFoundError("page data {} not found".\
@@ -178,31 +472,38 @@ class PrincipalListPage:
 
     def _page_worksheet_id(self):
         try:
-            page_selector = Selector(text=self._content)
-            return str(page_selector.xpath(
-                '//input[@id="apexir_WORKSHEET_ID"]/@value').extract()[0])
+            return str(_WORKSHEET_ID_XPATH(self._page_document())[0])
         except Exception:
             raise PageInstanceInfoNotFoundError("page data {} not found".\
                 format("worksheet_id"))
 
     def _page_report_id(self):
         try:
-            page_selector = Selector(text=self._content)
-            return str(page_selector.xpath(
-                '//input[@id="apexir_REPORT_ID"]/@value').extract()[0])
+            return str(_REPORT_ID_XPATH(self._page_document())[0])
         except Exception:
             raise PageInstanceInfoNotFoundError("page data {} not found".\
                 format("report_id"))
 
+    def _page_document(self):
+        """
+        returns the parsed document of this page, parsing the page content
+        the first time it is needed.
+        """
+        if self._document is None:
+            self._document = _parse_document(self._content)
+        return self._document
+
     def _build_main_page(self):
         """
         Builds the necessary internal structures for the first page since
-        the first page has some extra requirements
+        the first page has some extra requirements.
+
+        Raises:
+            PageError: raised when the main page's content was not provided.
         """
-        init_headers = copy.deepcopy(__init_headers__)
-        init_r = requests.get(__main_url__, headers=init_headers)
-        self._content = init_r.text.replace('&nbsp;', ' ')
-        self._cookies = init_r.history[0].cookies.get_dict()
+        if self._content is None:
+            raise PageError("the main page's content has to be fetched with "
+                "the session it will be navigated with")
 
     def _build_normal_page(self):
         pass
@@ -219,28 +520,12 @@ class PrincipalListPage:
             PaginationEndedError: if the current page contains no more
             principals.
         """
-        if not self.partial_principals():
+        if not self.has_rows():
             raise PaginationEndedError(
                 "the current page {} contain no more data, the next wont"\
                 .format(self.get_page_context()["page"]))
 
-        form_data = copy.deepcopy(__default_next_page_form_data__)
-        page_context = self.get_page_context()
-
-        page_content_count = 15
-        min_rows = ((page_context["page"] - 1) * page_content_count) + 1
-        max_rows = min_rows + page_content_count -1
-        calculated_action = "pgR_min_row={}max_rows={}rows_fetched={}".format(
-            min_rows, max_rows, page_content_count)
-
-        form_data["p_instance"] = page_context["instance_id"]
-        form_data["p_flow_id"] = page_context["flow_id"]
-        form_data["p_flow_step_id"] = page_context["flow_step_id"]
-        form_data["p_widget_action_mod"] = calculated_action
-        form_data["x01"] = page_context["worksheet_id"]
-        form_data["x02"] = page_context["report_id"]
-
-        return form_data
+        return page_form_data(self.get_page_context(), self._page_size)
 
     def next_page_url(self):
         """
@@ -254,11 +539,89 @@ class PrincipalListPage:
             PaginationEndedError: if the current page contains no more
             principals.
         """
-        if not self.partial_principals():
+        if not self.has_rows():
             raise PaginationEndedError(
                 "the current page {} contain no more data, the next wont"\
                 .format(self.get_page_context()["page"]))
-        return "https://efile.fara.gov/pls/apex/wwv_flow.show"
+        return __next_page_url__
+
+    def page_size(self):
+        """
+        Returns:
+            int: number of principals requested per page by the form data
+            built from this page.
+        """
+        return self._page_size
+
+    def total_row_count(self):
+        """
+        Returns:
+            int: the total number of principals in the report as shown by 
+            the page's pagination text, or None if the page doesn't show it.
+        """
+        match = _PAGINATION_RE.search(
+            ''.join(_PAGINATION_XPATH(self._page_document())))
+        if not match:
+            return None
+        return int(match.group(3))
+
+    def offered_page_sizes(self):
+        """
+        Returns:
+            list: the rows per page values offered by the page's `Rows Per
+            Page` menu in ascending order.
+        """
+        page_sizes = set()
+        for href in _ROWS_PER_PAGE_XPATH(self._page_document()):
+            match = _ROWS_PER_PAGE_RE.search(href)
+            if match:
+                page_sizes.add(int(match.group(1)))
+
+        return sorted(page_sizes or __offered_page_sizes__)
+
+    def page_size_candidates(self, max_page_size=None):
+        """
+        Keyword Args:
+            max_page_size(int): (optional) largest page size to try.
+
+        Returns:
+            list: the page sizes worth probing for the report, largest 
+            first. Sizes smaller than the default are never tried and of the
+            sizes which would fit the whole report on one page, only the
+            smallest is kept.
+        """
+        total_rows = self.total_row_count()
+        candidates = []
+        for page_size in self.offered_page_sizes():
+            if page_size < __default_page_size__ or (max_page_size is not None
+            and page_size > max_page_size):
+                continue
+            candidates.append(page_size)
+            if total_rows is not None and page_size >= total_rows:
+                break
+
+        return list(reversed(candidates)) or [__default_page_size__]
+
+    def accepts_page_size(self, page_size, total_rows=None):
+        """
+        Checks the rows returned on a probe page, i.e the first page of 
+        principals requested with `page_size` rows per page, against the
+        number of rows which was requested.
+
+        Args:
+            page_size(int): number of principals the page was requested with.
+
+        Keyword Args:
+            total_rows(int): (optional) total number of principals in the
+                report, needed when it is smaller than `page_size`.
+
+        Returns:
+            bool: True if the server returned as many rows as requested.
+        """
+        expected_rows = page_size
+        if total_rows is not None:
+            expected_rows = min(page_size, total_rows)
+        return self.row_count() == expected_rows
 
     def main_page_cookie(self):
         """
@@ -276,58 +639,164 @@ class PrincipalListPage:
         Returns:
             list: a list of ForeignPrincipal instances that have been
             extracted from the current page.
+
+        Note: the principals are built once per page, so repeated calls
+        return a new list holding the same ForeignPrincipal instances.
+        """
+        if self._partial_principals is None:
+            self._partial_principals = [
+                ForeignPrincipal(partial_dict=principal_dict)
+                for principal_dict in self._country_principal_rows()]
+
+        return list(self._partial_principals)
+
+    def has_rows(self):
+        """
+        Returns:
+            bool: True if the current page contains at least one principal.
+        """
+        return self.row_count() > 0
+
+    def row_count(self):
+        """
+        Returns:
+            int: the number of principals on the current page, counted
+            without building any ForeignPrincipal instance.
+        """
+        if self._row_count is None:
+            self._row_count = len(self._country_principal_rows())
+        return self._row_count
+
+    def iter_partial_principals(self, chunk_size=__stream_chunk_size__):
+        """
+        Streaming counterpart of `self.partial_principals` which parses the
+        page incrementally and yields each principal as soon as its row and
+        it's country header have been parsed. Rows are discarded once they
+        have been read, so memory stays bounded however many rows the page
+        holds.
+
+        Keyword Args:
+            chunk_size(int): (optional) number of bytes of the page content
+                fed to the parser at a time.
+
+        Yields:
+            ForeignPrincipal: partial principals in the order their rows
+            are completed on the page.
+        """
+        if self._partial_principals is not None or \
+        self._principal_rows is not None:
+            #the page was already parsed whole, e.g to count a probe page's
+            #rows, so it's rows are not parsed a second time
+            for partial_principal in self.partial_principals():
+                yield partial_principal
+            return
+
+        row_count = 0
+        for principal_dict in self._iter_country_principal_rows(chunk_size):
+            row_count += 1
+            yield ForeignPrincipal(partial_dict=principal_dict)
+
+        self._row_count = row_count
+
+    def _iter_country_principal_rows(self, chunk_size):
         """
-        country_dicts = self._country_dicts()
-        partial_principal_dicts = self._partial_principal_dicts()
-        partial_principals = []
+        yields the partial principal dicts on this page with their country
+        attached, from an event based parse of the page content.
+        """
+        country_names = {}
+        #rows seen before their country header, keyed on country index
+        pending_rows = {}
+
+        parser = etree.HTMLPullParser(events=('end',), tag=('tr', 'th'),
+            encoding='utf-8', recover=True)
+        for chunk in _content_chunks(self._content, chunk_size):
+            parser.feed(chunk)
+            for principal_dict in self._read_principal_rows(parser, 
+            country_names, pending_rows):
+                yield principal_dict
+
+        parser.close()
+        for principal_dict in self._read_principal_rows(parser, 
+        country_names, pending_rows):
+            yield principal_dict
+
+    def _read_principal_rows(self, parser, country_names, pending_rows):
+        for _, element in parser.read_events():
+            if element.tag == 'th':
+                _country_id = element.get('id', '')
+                if _country_id.startswith("BREAK_COUNTRY_NAME"):
+                    country_index = int(_country_id.rsplit("_", 1)[1])
+                    country_names[country_index] = ''.join(
+                        _COUNTRY_NAME_XPATH(element))
+                    for principal_dict in pending_rows.pop(country_index, []):
+                        yield self._attach_country(principal_dict, 
+                            country_names[country_index])
+                continue
+
+            if _is_principal_row(element):
+                principal_dict = self._partial_principal_dict(element)
+                country_index = principal_dict["country_page_index"]
+                if country_index in country_names:
+                    yield self._attach_country(principal_dict, 
+                        country_names[country_index])
+                else:
+                    pending_rows.setdefault(country_index, []).append(
+                        principal_dict)
+
+            #drop rows which have been read so the tree stays small
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    def _country_principal_rows(self):
+        """
+        returns the partial principal dicts found on this page with their
+        country attached, extracting them from the page only once.
+        """
+        if self._principal_rows is not None:
+            return self._principal_rows
 
-        for country_dict in country_dicts:
-            for partial_principal_dict in partial_principal_dicts:
+        country_names = self._country_names()
+        principal_rows = []
 
-                if self._country_owns_principal(country_dict, 
-                partial_principal_dict):
+        for partial_principal_dict in self._partial_principal_dicts():
+            country_page_index = partial_principal_dict["country_page_index"]
+            if country_page_index not in country_names:
+                continue
 
-                    partial_principal_dict["country"] = country_dict["name"]
-                    #copy to prevent KeyError on the dict on next iteration
-                    p_dict = copy.deepcopy(partial_principal_dict)
-                    self._discard_unwanted_fields(p_dict)
-                    partial_principals.append(
-                        ForeignPrincipal(partial_dict=p_dict))
+            principal_rows.append(self._attach_country(
+                partial_principal_dict, country_names[country_page_index]))
 
-        return partial_principals
+        self._principal_rows = principal_rows
+        return self._principal_rows
 
-    def _country_owns_principal(self, country_dict, principal_dict):
-        return country_dict["country_page_index"] == \
-            principal_dict["country_page_index"]
+    def _attach_country(self, principal_dict, country_name):
+        principal_dict["country"] = country_name
+        return self._discard_unwanted_fields(principal_dict)
 
     def _discard_unwanted_fields(self, principal_dict):
         del principal_dict["country_page_index"]
         return principal_dict
 
-    def _country_dicts(self):
+    def _country_names(self):
         """
-        returns dict containing country names and thier position index
-        as they appear on the page
+        returns a dict mapping the position index of each country as it
+        appears on the page to the country's name
         """
-        country_table_headers = self._all_country_table_headers()
-        country_dicts = []
-        for country_table_header in country_table_headers:
-            _country_id = country_table_header.xpath('@id').extract()
-            country_index = int(_country_id[0].rsplit("_", 1)[1])
-            country_name = ''.join(country_table_header.xpath(
-                './/span[@class="apex_break_headers"]/text()').extract())
-            country_dicts.append(dict(name=country_name, 
-                country_page_index=country_index))
+        country_names = {}
+        for country_table_header in self._all_country_table_headers():
+            _country_id = country_table_header.get('id')
+            country_index = int(_country_id.rsplit("_", 1)[1])
+            country_names[country_index] = ''.join(
+                _COUNTRY_NAME_XPATH(country_table_header))
 
-        return country_dicts
+        return country_names
 
     def _all_country_table_headers(self):
         """
         returns all <th> containing county names
         """
-        page_selector = Selector(text=self._content)
-        return page_selector.xpath(
-            '//th[starts-with(@id, "BREAK_COUNTRY_NAME")]')
+        return _COUNTRY_TH_XPATH(self._page_document())
 
     def _partial_principal_dicts(self):
         """
@@ -338,60 +807,52 @@ class PrincipalListPage:
         To make a partial principal a complete principal, it's exhibition 
         info from the details page of a principal must be added it.
         """
-        principal_dicts = []
-        principal_table_datas = self._all_principal_td()
-        for principal_table_data in principal_table_datas:
-            country_page_index = int(principal_table_data.xpath('@headers').\
-                extract()[0].rsplit('_',1)[1])
-
-            link = ''.join(
-                principal_table_data.xpath('.//a/@href').extract())
-            link = 'https://efile.fara.gov/pls/apex/' + link
-
-            principal_name = ''.join(principal_table_data.xpath(
-                '..//td[starts-with(@headers, "FP_NAME")]/text()').\
-                    extract())
-
-            principal_reg_date = ''.join(principal_table_data.xpath(
-                '..//td[starts-with(@headers, "FP_REG_DATE")]/text()').\
-                    extract())
-
-            address = ''.join(principal_table_data.xpath(
-                '..//td[starts-with(@headers, "ADDRESS_1")]/text()').\
-                    extract())
-
-            state = ''.join(principal_table_data.xpath(
-                '..//td[starts-with(@headers, "STATE")]/text()').extract())
-
-            registrant = ''.join(principal_table_data.xpath(
-                '..//td[starts-with(@headers, "REGISTRANT_NAME")]/text()').\
-                    extract())
+        return [self._partial_principal_dict(principal_row) 
+            for principal_row in self._all_principal_rows()]
 
-            reg_number = ''.join(principal_table_data.xpath(
-                '..//td[starts-with(@headers, "REG_NUMBER")]/text()').\
-                    extract())
-
-            reg_date = ''.join(principal_table_data.xpath(
-                '..//td[starts-with(@headers, "REG_DATE")]/text()').\
-                    extract())
-
-            principal_dicts.append(dict(country_page_index=country_page_index,
-                url=link, principal_name=principal_name, 
-                principal_reg_date=principal_reg_date, address=address, 
-                state=state, registrant=registrant, reg_number=reg_number,
-                reg_date=reg_date, exhibit=[]))
+    def _partial_principal_dict(self, principal_row):
+        """
+        returns the partial principal dict held in a single <tr>, visiting
+        each of the row's cells once and mapping it to a field by the column
+        id its `headers` attribute starts with.
+        """
+        principal_dict = dict.fromkeys(__principal_columns__.values(), '')
+        principal_dict["exhibit"] = []
+
+        for cell in principal_row:
+            if cell.tag != 'td':
+                continue
+
+            column, _, country_header = cell.get('headers', '').\
+                partition(' ')
+            if column == "LINK":
+                principal_dict["country_page_index"] = int(
+                    country_header.rsplit('_', 1)[1])
+                principal_dict["url"] = 'https://efile.fara.gov/pls/apex/' + \
+                    ''.join(_LINK_HREF_XPATH(cell))
+            elif column in __principal_columns__:
+                principal_dict[__principal_columns__[column]] += \
+                    _cell_text(cell)
 
-        return principal_dicts
+        return principal_dict
 
-    def _all_principal_td(self):
-        page_selector = Selector(text=self._content)
-        return page_selector.xpath(
-            '//td[starts-with(@headers, "LINK BREAK_COUNTRY_NAME")]')
+    def _all_principal_rows(self):
+        return _PRINCIPAL_ROW_XPATH(self._page_document())
 
 class ExhibitPage:
 
     def __init__(self, content, *args, **kwargs):
         self._content = content
+        self._document = None
+
+    def _page_document(self):
+        """
+        returns the parsed document of this page, parsing the page content
+        the first time it is needed.
+        """
+        if self._document is None:
+            self._document = _parse_document(self._content)
+        return self._document
 
     def exhibits(self):
         exhibits = []
@@ -405,16 +866,11 @@ class ExhibitPage:
         exhibit_selectors = self._all_exhibit_rows()
         exhibit_dicts = []
         for selector in exhibit_selectors:
-            date_stamped = ''.join(selector.xpath(
-                './/td[@headers="DATE_STAMPED"]/text()').extract())
-            document_link = ''.join(selector.xpath(
-                './/td[@headers="DOCLINK"]/a/@href').extract())
-            reg_number = ''.join(selector.xpath(
-                './/td[@headers="REGISTRATION_NUMBER"]/text()').extract())
-            registrant = ''.join(selector.xpath(
-                './/td[@headers="REGISTRANT_NAME"]/text()').extract())
-            document_type = ''.join(selector.xpath(
-                './/td[@headers="DOCUMENT_TYPE"]/text()').extract())
+            date_stamped = ''.join(_EXHIBIT_DATE_STAMPED_XPATH(selector))
+            document_link = ''.join(_EXHIBIT_DOCLINK_XPATH(selector))
+            reg_number = ''.join(_EXHIBIT_REG_NUMBER_XPATH(selector))
+            registrant = ''.join(_EXHIBIT_REGISTRANT_XPATH(selector))
+            document_type = ''.join(_EXHIBIT_DOCUMENT_TYPE_XPATH(selector))
 
             exhibit_dicts.append(dict(date_stamped=date_stamped, 
                 document_link=document_link, reg_number=reg_number,
@@ -423,6 +879,4 @@ class ExhibitPage:
         return exhibit_dicts
 
     def _all_exhibit_rows(self):
-        return Selector(text=self._content).xpath(
-            '//table[@class="apexir_WORKSHEET_DATA"]/tr[@class="even"] | ' + \
-            '//table[@class="apexir_WORKSHEET_DATA"]/tr[@class="odd"]')
\ No newline at end of file
+        return _EXHIBIT_ROWS_XPATH(self._page_document())
\ No newline at end of file
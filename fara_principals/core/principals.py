@@ -1,33 +1,152 @@
 import json
-import copy
 
+from fara_principals.core.schema import (
+    EXHIBIT_SCHEMA, PARTIAL_PRINCIPAL_SCHEMA, PRINCIPAL_SCHEMA
+)
 from fara_principals.exceptions import (
     InvalidPrincipalError, InvalidExhibitError
 )
 
-class ForeignPrincipal:
+class _Missing(object):
+    """
+    Value of the fields of a record which were not given, as opposed to
+    fields given as None.
+    """
+    __slots__ = ()
+
+    def __repr__(self):
+        return "MISSING"
+
+    def __bool__(self):
+        return False
+    __nonzero__ = __bool__
+
+MISSING = _Missing()
+
+class _Record(object):
+    """
+    Base of the principal and exhibit records. The fields of a record are
+    kept in slots rather than in a dict of it's own, and are read either as
+    attributes or through the record's read-only mapping methods, e.g
+    `principal["reg_number"]` or `principal.get("exhibit")`, neither of which
+    copies anything. `to_dict` returns a mutable copy of the record.
+
+    Keys of the dict a record is built from which are not fields of the
+    record are kept aside, and read the same way.
+    """
+    __slots__ = ("_extra",)
+
+    #names of the fields of the record, each has a slot
+    _fields = ()
+    #fields holding lists, which are copied rather than shared with the dict
+    #the record is built from
+    _list_fields = ()
+
+    def _set_fields(self, fields_dict):
+        for field in self._fields:
+            value = fields_dict.get(field, MISSING)
+            if field in self._list_fields and isinstance(value, list):
+                value = list(value)
+            setattr(self, field, value)
+
+        self._extra = None
+        for key in fields_dict:
+            if key not in self._fields:
+                if self._extra is None:
+                    self._extra = {}
+                self._extra[key] = fields_dict[key]
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            value = getattr(self, key)
+            if value is not MISSING:
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self._fields:
+            value = getattr(self, key)
+            return default if value is MISSING else value
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def keys(self):
+        return [key for key, _ in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.items())
+
+    def items(self):
+        """
+        Returns:
+            list: the `(key, value)` pairs of the record's fields which were
+            given. The values are not copied.
+        """
+        items = [(field, getattr(self, field)) for field in self._fields
+            if getattr(self, field) is not MISSING]
+        if self._extra is not None:
+            items.extend(self._extra.items())
+        return items
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: a mutable copy of the record, lists of dicts (a principal's
+            exhibits) are copied too.
+        """
+        copied = {}
+        for key, value in self.items():
+            if isinstance(value, list):
+                value = [dict(item) if isinstance(item, dict) else item
+                    for item in value]
+            copied[key] = value
+        return copied
+
+    def to_json(self):
+        """
+        Returns:
+            str: a json string representation of the record
+        """
+        return json.dumps(dict(self.items()))
+
+class ForeignPrincipal(_Record):
+
+    __slots__ = ("url", "country", "state", "address", "reg_number",
+        "principal_name", "principal_reg_date", "reg_date", "registrant",
+        "exhibits", "exhibit")
+
+    _fields = __slots__
+    _list_fields = ("exhibits", "exhibit")
 
     def __init__(self, url=None, country=None, state=None, address=None, 
         reg_number=None, principal_name=None, principal_reg_date=None, 
         reg_date=None, registrant=None, exhibits=[], partial_dict=None, 
         *args, **kwargs):
 
-        self._dict_info = None
         if partial_dict:
-            self._dict_info = partial_dict
+            self._set_fields(partial_dict)
         else:
-            self._dict_info = {
+            self._set_fields({
                 "url": url, "country": country, "state": state, 
                 "address": address, "reg_number": reg_number, 
                 "principal_name": principal_name, 
                 "principal_reg_date": principal_reg_date, 
                 "reg_date": reg_date, "registrant": registrant,
                 "exhibits": exhibits
-            }
-
-
-        self._required_keys = ["url", "country", "state", "address", 
-        "reg_number", "principal_name", "principal_reg_date", "reg_date"]
+            })
 
     def validate_data(self):
         """
@@ -41,12 +160,9 @@ class ForeignPrincipal:
         Note: this method is to be called when it has been populated with 
         it's exhibit info.
         """
-        self.validate_partial()
-        key = "exhibit"
-        try:
-            self.to_dict()[key]
-        except KeyError:
-            raise InvalidPrincipalError("key `{}` not present".format(key))
+        violation = PRINCIPAL_SCHEMA.first_violation(self)
+        if violation is not None:
+            raise InvalidPrincipalError(violation.message)
 
     def validate_partial(self):
         """
@@ -57,26 +173,9 @@ class ForeignPrincipal:
             BadPrincipalSchemaError: raised when certain fields(keys) are 
             unavailable or when required contrains on the schema are not met.
         """
-        for key in self._required_keys:
-            try:
-                self.to_dict()[key]
-            except KeyError:
-                raise InvalidPrincipalError(
-                    "key `{}` not present".format(key))
-
-        #todo: create more flexible implementation for this
-        if not self.to_dict()["principal_name"]:
-            raise InvalidPrincipalError(
-                "required field `{}` is empty".format("principal_name"))
-        if not self.to_dict()["reg_number"]:
-            raise InvalidPrincipalError(
-                "required field `{}` is empty".format("reg_number"))
-        if not self.to_dict()["country"]:
-            raise InvalidPrincipalError(
-                "required field `{}` is empty".format("country"))
-        if not self.to_dict()["principal_reg_date"]:
-            raise InvalidPrincipalError(
-                "required field `{}` is empty".format("principal_reg_date"))
+        violation = PARTIAL_PRINCIPAL_SCHEMA.first_violation(self)
+        if violation is not None:
+            raise InvalidPrincipalError(violation.message)
 
     def is_partial(self):
         """
@@ -87,52 +186,33 @@ class ForeignPrincipal:
         Note: a principal is usually still partial when it has been 
         populate from the list page but not from its detail page.
         """
-        return self.to_dict().get("exhibit") == None
-
-    def to_dict(self):
-        """
-        Returns:
-            dict: a dict representation of the Principal instance
-        """
-        return copy.deepcopy(self._dict_info)
-
-    def to_json(self):
-        """
-        Returns:
-            str: a json string representation of the Principal instance
-        """
-        return json.dumps(self.to_dict())
+        return self.exhibit is MISSING or self.exhibit is None
 
     def add_exhibit_dict(self, exhibit):
         """
         Args:
             exhibit(dict): dict containing exhibit info
         """
-        if not self._dict_info.get("exhibit"):
-            self._dict_info["exhibit"] = [exhibit]
+        if not self.exhibit:
+            self.exhibit = [exhibit]
         else:
-            self._dict_info["exhibit"].append(exhibit)
+            self.exhibit.append(exhibit)
 
-class Exhibit:
+class Exhibit(_Record):
     """
     Exhibit class which provides validation utillities for exhibit data
     for a Principal
     """
-    def __init__(self, exhibit_dict, *args, **kwargs):
-        self._exhibit_dict = exhibit_dict
 
-    def to_dict(self):
-        return copy.deepcopy(self._exhibit_dict)
+    __slots__ = ("date_stamped", "document_link", "reg_number", "registrant",
+        "document_type")
+
+    _fields = __slots__
+
+    def __init__(self, exhibit_dict, *args, **kwargs):
+        self._set_fields(exhibit_dict)
 
     def validate(self):
-        required_exhibit_fields = [
-            "date_stamped", "document_link", "reg_number", "registrant",
-            "document_type"
-        ]
-
-        for key in required_exhibit_fields:
-            try:
-                self._exhibit_dict[key]
-            except KeyError:
-                raise InvalidExhibitError(
-                    "key `{}` not found in exhibit".format(key))
\ No newline at end of file
+        violation = EXHIBIT_SCHEMA.first_violation(self)
+        if violation is not None:
+            raise InvalidExhibitError(violation.message)
@@ -0,0 +1,288 @@
+"""
+This module contains an in-memory, indexed view of a crawl's exported
+principals.
+
+A `PrincipalIndex` groups the principals of a feed by country, reg number
+and registrant, and keeps their registration dates sorted, so filters and
+date ranges are answered from the indexes instead of a scan of every
+principal. Since building the indexes means reading the whole feed, they
+are cached next to it in a compact file which is memory mapped when the
+feed is queried again: only the indexes are decoded, a principal is only
+decoded when it is part of a result.
+
+Cache file layout:
+    magic, header length (8 bytes), json header holding the indexes,
+    offsets of the principals (8 bytes each, one more than principals),
+    the json encoded principals one after the other.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import struct
+
+from fara_principals.core.dates import principal_date_columns, to_ordinal
+from fara_principals.core.feeds import iter_principals
+from fara_principals.exceptions import QueryError
+
+__cache_magic__ = b"FARAIDX1\n"
+__cache_version__ = 2
+
+#fields principals can be filtered on, by equality
+__keyed_fields__ = ("country", "reg_number", "registrant")
+#fields principals can be filtered on, by date ranges, `date_stamped` is
+#the date of any of a principal's exhibits
+__date_fields__ = ("reg_date", "principal_reg_date", "date_stamped")
+
+def _ordinal_bound(date):
+    try:
+        return to_ordinal(date)
+    except ValueError as e:
+        raise QueryError(str(e))
+
+def build_indexes(principals):
+    """
+    Args:
+        principals(list): principal dicts.
+
+    Returns:
+        dict: the indexes of `principals`. Keyed fields map each value to
+        the positions of the principals having it, date fields hold
+        `[ordinals, positions]` sorted on the ordinals, see
+        `fara_principals.core.dates`.
+    """
+    indexes = dict((field, {}) for field in __keyed_fields__)
+    for position, principal_dict in enumerate(principals):
+        for field in __keyed_fields__:
+            value = principal_dict.get(field)
+            if value is not None:
+                indexes[field].setdefault(value, []).append(position)
+
+    date_columns = principal_date_columns(principals)
+    for field in __date_fields__:
+        column = date_columns[field]
+        indexes[field] = [list(column.sorted_ordinals()),
+            [column.owner(position) for position in column.argsort()]]
+    return indexes
+
+class PrincipalIndex:
+    """
+    Args:
+        principals: either a list of principal dicts, or an object with
+            `__len__` and `__getitem__` decoding them by position.
+        indexes(dict): (optional) indexes of the principals as built by
+            `build_indexes`, built from `principals` when not given.
+    """
+
+    def __init__(self, principals, indexes=None, *args, **kwargs):
+        self._principals = principals
+        self._indexes = indexes or build_indexes(principals)
+
+    @classmethod
+    def load(cls, path, cache_path=None):
+        """
+        Loads the principals of an exported feed, from it's cache file if
+        it is up to date, else from the feed, writing the cache file.
+
+        Args:
+            path(str): path of a json or json lines feed.
+            cache_path(str): (optional) path of the cache file, the feed's
+                path with an `.idx` suffix by default. Caching is disabled
+                when it is False.
+
+        Returns:
+            PrincipalIndex: the index of the feed's principals.
+        """
+        if cache_path is None:
+            cache_path = path + ".idx"
+
+        if cache_path:
+            cached = _CachedPrincipals.open(cache_path, path)
+            if cached is not None:
+                return cls(cached, cached.indexes())
+
+        principals = list(iter_principals(path))
+        index = cls(principals)
+        if cache_path:
+            _CachedPrincipals.write(cache_path, path, principals,
+                index._indexes)
+        return index
+
+    def __len__(self):
+        return len(self._principals)
+
+    def principal(self, position):
+        return self._principals[position]
+
+    def query(self, country=None, reg_number=None, registrant=None,
+        reg_date=None, principal_reg_date=None, date_stamped=None,
+        limit=None):
+        """
+        Finds the principals matching every criterion given.
+
+        Keyword Args:
+            country(str): (optional) country of the principals.
+            reg_number(str): (optional) reg number of the principals.
+            registrant(str): (optional) registrant of the principals.
+            reg_date(tuple): (optional) `(start, end)` dates, inclusive, the
+                principals' `reg_date` has to be between. Either bound can
+                be None, dates are `mm/dd/yyyy` strings or dates.
+            principal_reg_date(tuple): (optional) the same, for the
+                principals' `principal_reg_date`.
+            date_stamped(tuple): (optional) the same, for the `date_stamped`
+                of any of the principals' exhibits.
+            limit(int): (optional) most principals to return.
+
+        Returns:
+            list: the matching principal dicts, in feed order.
+
+        Raises:
+            QueryError: when a date bound is not a date.
+        """
+        candidates = []
+        for field, value in (("country", country),
+        ("reg_number", reg_number), ("registrant", registrant)):
+            if value is not None:
+                candidates.append(self._indexes[field].get(value, []))
+        for field, bounds in (("reg_date", reg_date),
+        ("principal_reg_date", principal_reg_date),
+        ("date_stamped", date_stamped)):
+            if bounds is not None:
+                candidates.append(self._date_range(field, *bounds))
+
+        if not candidates:
+            positions = range(len(self._principals))
+        else:
+            #intersect the smallest candidate lists first
+            candidates.sort(key=len)
+            positions = set(candidates[0])
+            for other in candidates[1:]:
+                if not positions:
+                    break
+                positions.intersection_update(other)
+            positions = sorted(positions)
+
+        if limit is not None:
+            positions = positions[:limit]
+        return [self._principals[position] for position in positions]
+
+    def _date_range(self, field, start=None, end=None):
+        ordinals, positions = self._indexes[field]
+        low = 0
+        high = len(ordinals)
+        if start is not None:
+            low = bisect.bisect_left(ordinals, _ordinal_bound(start))
+        if end is not None:
+            high = bisect.bisect_right(ordinals, _ordinal_bound(end))
+        return positions[low:high]
+
+    def values(self, field):
+        """
+        Returns:
+            list: the distinct values of a keyed field, e.g the countries.
+        """
+        if field not in __keyed_fields__:
+            raise QueryError("`{}` is not indexed by value".format(field))
+        return sorted(self._indexes[field])
+
+    def close(self):
+        """
+        Unmaps the cache file the principals are read from, if any.
+        """
+        if isinstance(self._principals, _CachedPrincipals):
+            self._principals.close()
+
+class _CachedPrincipals:
+    """
+    The principals of a memory mapped cache file, decoded by position.
+    """
+
+    def __init__(self, f, mapped, header, offsets_start, *args, **kwargs):
+        self._file = f
+        self._mapped = mapped
+        self._header = header
+        self._offsets_start = offsets_start
+        self._count = header["count"]
+        self._records_start = offsets_start + 8 * (self._count + 1)
+
+    @classmethod
+    def open(cls, cache_path, source_path):
+        """
+        returns the principals of the cache file, or None if it doesn't
+        exist, can't be read or is older than the feed.
+        """
+        if not os.path.exists(cache_path):
+            return None
+
+        f = open(cache_path, 'rb')
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, mmap.error):
+            f.close()
+            return None
+
+        header = None
+        magic_end = len(__cache_magic__)
+        if mapped[:magic_end] == __cache_magic__:
+            try:
+                length = struct.unpack_from('<Q', mapped, magic_end)[0]
+                header = json.loads(mapped[magic_end + 8:
+                    magic_end + 8 + length].decode('utf-8'))
+            except (struct.error, ValueError):
+                header = None
+
+        if header is None or not cls._is_fresh(header, source_path):
+            mapped.close()
+            f.close()
+            return None
+        return cls(f, mapped, header, magic_end + 8 + length)
+
+    @classmethod
+    def _is_fresh(cls, header, source_path):
+        stat = os.stat(source_path)
+        return header.get("version") == __cache_version__ and \
+            header.get("source_size") == stat.st_size and \
+            header.get("source_mtime") == stat.st_mtime
+
+    @classmethod
+    def write(cls, cache_path, source_path, principals, indexes):
+        stat = os.stat(source_path)
+        header = json.dumps({"version": __cache_version__,
+            "source_size": stat.st_size, "source_mtime": stat.st_mtime,
+            "count": len(principals), "indexes": indexes}).encode('utf-8')
+        records = [json.dumps(principal_dict).encode('utf-8')
+            for principal_dict in principals]
+
+        offsets = [0]
+        for record in records:
+            offsets.append(offsets[-1] + len(record))
+
+        temp_path = "{}.tmp".format(cache_path)
+        with open(temp_path, 'wb') as f:
+            f.write(__cache_magic__)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            f.write(struct.pack('<{}Q'.format(len(offsets)), *offsets))
+            for record in records:
+                f.write(record)
+        os.rename(temp_path, cache_path)
+
+    def indexes(self):
+        return self._header["indexes"]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, position):
+        if not 0 <= position < self._count:
+            raise IndexError(position)
+
+        start, end = struct.unpack_from('<QQ', self._mapped,
+            self._offsets_start + 8 * position)
+        return json.loads(self._mapped[self._records_start + start:
+            self._records_start + end].decode('utf-8'))
+
+    def close(self):
+        self._mapped.close()
+        self._file.close()
@@ -0,0 +1,238 @@
+"""
+This module contains the schemas principals and exhibits are validated
+against.
+
+A schema is declared as a list of fields and the rules each of them has to
+follow: being present, being non empty, and being in a given format. It is
+compiled once into a flat list of checks, so validating a record is a loop
+over those checks rather than over the declaration. Records, dicts or the
+records of `fara_principals.core.principals`, can be validated one at a
+time, stopping at the first violation, or a whole page of them at once,
+getting every violation back.
+"""
+
+import re
+from collections import namedtuple
+
+from fara_principals.core.dates import date_ordinal
+from fara_principals.exceptions import SchemaError
+
+#a violation of a schema, `index` is the position of the record in the batch
+#it was validated with, None when it was validated on it's own
+Violation = namedtuple("Violation", ["index", "field", "rule", "message"])
+
+try:
+    _string_types = basestring
+except NameError:
+    _string_types = str
+
+#an http(s) url with a host, or a relative url which has no scheme
+__url_re__ = re.compile(
+    r"^(?:https?://[^\s/?#]+\S*|(?![A-Za-z][A-Za-z0-9+.-]*:)\S+)$")
+
+def _is_date(value):
+    """
+    returns True if `value` is a valid `mm/dd/yyyy` date, the month and day
+    may have a single digit.
+    """
+    return isinstance(value, _string_types) and \
+        date_ordinal(value) is not None
+
+def _is_url(value):
+    """
+    returns True if `value` is an absolute http(s) url or a relative one,
+    like the urls of the list pages.
+    """
+    return isinstance(value, _string_types) and \
+        __url_re__.match(value) is not None
+
+#formats a field can be declared to be in
+__formats__ = {"date": _is_date, "url": _is_url}
+
+__default_messages__ = {
+    "required": "key `{field}` not present",
+    "non_empty": "required field `{field}` is empty",
+    "format": "field `{field}` is not a valid {format}: {value!r}",
+}
+
+#value of the fields records don't have
+_missing = object()
+
+class Schema:
+    """
+    Args:
+        fields(list): `(field, rules)` pairs, rules being a dict of:
+            required(bool): the field has to be present.
+            non_empty(bool): the field, when present, can't be empty.
+            format(str): the field, when present and non empty, has to be
+                in this format, either "date" or "url".
+
+    Keyword Args:
+        messages(dict): (optional) messages of the violations of each rule,
+            formatted with the field, format and value.
+
+    Raises:
+        SchemaError: when a rule or format is unknown.
+
+    Note: the checks run rule by rule, all the required fields are checked
+    before any of them is checked for emptiness, and so on.
+    """
+
+    def __init__(self, fields, messages=None, *args, **kwargs):
+        self._fields = list(fields)
+        self._messages = dict(__default_messages__, **(messages or {}))
+        self._checks = self._compile()
+        #`(field, required, non_empty, format test)` of each field, to tell
+        #whether a record is valid in a single pass over it's fields
+        self._field_checks = [(field, bool(rules.get("required")),
+            bool(rules.get("non_empty")),
+            __formats__.get(rules.get("format"))) for field, rules in
+            self._fields]
+
+    def _compile(self):
+        """
+        returns the `(field, rule, test, message)` checks of the schema, in
+        the order they are run. `test` takes the value of the field, or
+        `_missing`, and returns False if the rule is violated.
+        """
+        for field, rules in self._fields:
+            for rule in rules:
+                if rule not in __default_messages__:
+                    raise SchemaError("unknown rule `{}` for field `{}`"\
+                        .format(rule, field))
+            if rules.get("format") and rules["format"] not in __formats__:
+                raise SchemaError("unknown format `{}` for field `{}`"\
+                    .format(rules["format"], field))
+
+        checks = []
+        for field, rules in self._fields:
+            if rules.get("required"):
+                checks.append((field, "required",
+                    lambda value: value is not _missing,
+                    self._messages["required"]))
+        for field, rules in self._fields:
+            if rules.get("non_empty"):
+                checks.append((field, "non_empty",
+                    lambda value: value is _missing or bool(value),
+                    self._messages["non_empty"]))
+        for field, rules in self._fields:
+            if rules.get("format"):
+                checks.append((field, "format",
+                    self._format_test(__formats__[rules["format"]]),
+                    self._messages["format"].replace("{format}",
+                        rules["format"])))
+        return checks
+
+    def _format_test(self, is_valid):
+        def test(value):
+            return value is _missing or not value or is_valid(value)
+        return test
+
+    def fields(self):
+        return [field for field, _ in self._fields]
+
+    def violations(self, record, index=None, first_only=False):
+        """
+        Args:
+            record: a dict, or a record of `fara_principals.core.principals`.
+
+        Keyword Args:
+            index(int): (optional) index of the violations.
+            first_only(bool): (optional) stops at the first violation.
+
+        Returns:
+            list: the `Violation`s of the record, empty if it is valid.
+        """
+        violations = []
+        get = record.get
+        for field, rule, test, message in self._checks:
+            value = get(field, _missing)
+            if not test(value):
+                violations.append(Violation(index, field, rule,
+                    message.format(field=field, value=value)))
+                if first_only:
+                    break
+        return violations
+
+    def first_violation(self, record):
+        """
+        Returns:
+            Violation: the first violation of the record, or None if it is
+            valid.
+        """
+        if self.is_valid(record):
+            return None
+        return self.violations(record, first_only=True)[0]
+
+    def is_valid(self, record):
+        """
+        Returns:
+            bool: True if the record has no violation, checked field by field
+            without building any violation.
+        """
+        get = record.get
+        for field, required, non_empty, is_format in self._field_checks:
+            value = get(field, _missing)
+            if value is _missing:
+                if required:
+                    return False
+            elif not value:
+                if non_empty:
+                    return False
+            elif is_format is not None and not is_format(value):
+                return False
+        return True
+
+    def validate_batch(self, records):
+        """
+        Validates a page or batch of records at once.
+
+        Args:
+            records(list): dicts or records of
+                `fara_principals.core.principals`.
+
+        Returns:
+            list: the `Violation`s of every record, each with the index of
+            it's record in `records`, empty if they are all valid.
+        """
+        violations = []
+        for index, record in enumerate(records):
+            if not self.is_valid(record):
+                violations.extend(self.violations(record, index=index))
+        return violations
+
+    def valid_records(self, records):
+        """
+        Returns:
+            tuple: the records of `records` which are valid, and the
+            violations of the others, as returned by `validate_batch`.
+        """
+        violations = self.validate_batch(records)
+        invalid = set(violation.index for violation in violations)
+        return [record for index, record in enumerate(records)
+            if index not in invalid], violations
+
+__principal_fields__ = [
+    ("url", {"required": True, "format": "url"}),
+    ("country", {"required": True, "non_empty": True}),
+    ("state", {"required": True}),
+    ("address", {"required": True}),
+    ("reg_number", {"required": True, "non_empty": True}),
+    ("principal_name", {"required": True, "non_empty": True}),
+    ("principal_reg_date", {"required": True, "non_empty": True,
+        "format": "date"}),
+    ("reg_date", {"required": True, "format": "date"}),
+]
+
+#principals read off a list page, whose exhibits are not known yet
+PARTIAL_PRINCIPAL_SCHEMA = Schema(__principal_fields__)
+#principals with the exhibits of their exhibit page
+PRINCIPAL_SCHEMA = Schema(__principal_fields__ + [
+    ("exhibit", {"required": True})])
+EXHIBIT_SCHEMA = Schema([
+    ("date_stamped", {"required": True, "format": "date"}),
+    ("document_link", {"required": True, "format": "url"}),
+    ("reg_number", {"required": True}),
+    ("registrant", {"required": True}),
+    ("document_type", {"required": True}),
+], messages={"required": "key `{field}` not found in exhibit"})
@@ -0,0 +1,199 @@
+"""
+This module contains abstractions for crawling the site with several 
+sessions at once.
+
+The server tracks each user's session through the `Page Context` found on
+the main page and the cookies set when the main page is opened, and it
+throttles every session on it's own. A `Session` here is one such page 
+context and the cookie jar holding it's cookies, bootstrapped independently
+from it's own main page. Every request of a session, it's bootstrap
+included, reads and stores it's cookies in the session's jar. Spreading the list page and exhibit requests over a `SessionPool` of
+sessions lets the crawl go beyond what the server allows a single session.
+
+Sessions expire, either because the server drops the page instance or 
+because it decides the session is being used by a scraper. An expired 
+session gets no more work until it has been bootstrapped again, and the
+work it had is handed to the sessions that are still active.
+"""
+
+from scrapy.http.cookies import CookieJar
+
+from fara_principals.exceptions import NoActiveSessionError, SessionError
+
+#states a session goes through
+__bootstrapping__ = "bootstrapping"
+__active__ = "active"
+__expired__ = "expired"
+
+class Session:
+    """
+    A single server-tracked session.
+
+    Args:
+        session_id(int): id of the session within it's pool.
+    """
+
+    def __init__(self, session_id, *args, **kwargs):
+        self._session_id = session_id
+        self._state = __bootstrapping__
+        self._page_context = None
+        self._cookie_jar = CookieJar()
+        self._generation = 0
+        self._load = 0
+
+    def session_id(self):
+        return self._session_id
+
+    def page_context(self):
+        """
+        Returns:
+            dict: the page context the session was last bootstrapped with,
+            or None if it has never been bootstrapped.
+        """
+        return self._page_context
+
+    def cookies(self):
+        """
+        Returns:
+            dict: the cookies the server has set on the session since it was
+            last bootstrapped.
+        """
+        return dict((cookie.name, cookie.value)
+            for cookie in self._cookie_jar)
+
+    def cookie_jar(self):
+        """
+        Returns:
+            CookieJar: the scrapy jar holding the session's cookies. A new
+            jar is used each time the session is bootstrapped so it never
+            reuses the cookies of an expired session.
+        """
+        return self._cookie_jar
+
+    def cookiejar(self):
+        """
+        Returns:
+            str: the key of the session's current cookie jar, which tells
+            the requests made before the session was last bootstrapped
+            apart.
+        """
+        return "{}-{}".format(self._session_id, self._generation)
+
+    def load(self):
+        """
+        Returns:
+            int: number of requests made with the session which have not 
+            yet completed.
+        """
+        return self._load
+
+    def is_active(self):
+        return self._state == __active__
+
+    def is_bootstrapping(self):
+        return self._state == __bootstrapping__
+
+class SessionPool:
+    """
+    Pool of sessions which hands out the active session with the least 
+    outstanding requests.
+
+    Keyword Args:
+        size(int): (optional) number of sessions in the pool.
+    """
+
+    def __init__(self, size=1, *args, **kwargs):
+        if size < 1:
+            raise SessionError("a session pool needs at least one session")
+        self._sessions = [Session(session_id) for session_id in range(size)]
+
+    def sessions(self):
+        """
+        Returns:
+            list: all sessions of the pool, whatever their state.
+        """
+        return list(self._sessions)
+
+    def session(self, session_id):
+        try:
+            return self._sessions[session_id]
+        except (IndexError, TypeError):
+            raise SessionError("no session with id {}".format(session_id))
+
+    def active_sessions(self):
+        return [session for session in self._sessions if session.is_active()]
+
+    def bootstrapping_sessions(self):
+        return [session for session in self._sessions 
+            if session.is_bootstrapping()]
+
+    def activate(self, session_id, page_context):
+        """
+        Marks a session as bootstrapped with the page context read from it's
+        main page.
+
+        Returns:
+            Session: the activated session.
+        """
+        session = self.session(session_id)
+        session._page_context = page_context
+        session._state = __active__
+        return session
+
+    def expire(self, session_id):
+        """
+        Marks a session as expired so it gets no more work.
+
+        Returns:
+            bool: True if the session was active, False if it had already
+            been expired or was being bootstrapped.
+        """
+        session = self.session(session_id)
+        was_active = session.is_active()
+        session._state = __expired__
+        return was_active
+
+    def rebootstrap(self, session_id):
+        """
+        Marks a session as being bootstrapped again, with a new cookie jar.
+
+        Returns:
+            Session: the session being bootstrapped.
+        """
+        session = self.session(session_id)
+        session._state = __bootstrapping__
+        session._generation += 1
+        session._cookie_jar = CookieJar()
+        return session
+
+    def acquire(self, session_id=None):
+        """
+        Counts a new request against a session.
+
+        Keyword Args:
+            session_id(int): (optional) id of the session to use. When not
+                given, the active session with the least load is used.
+
+        Returns:
+            Session: the session the request should be made with.
+
+        Raises:
+            NoActiveSessionError: when no session of the pool is active.
+        """
+        if session_id is not None:
+            session = self.session(session_id)
+        else:
+            active_sessions = self.active_sessions()
+            if not active_sessions:
+                raise NoActiveSessionError("no active session in the pool")
+            session = min(active_sessions, key=lambda session: session.load())
+
+        session._load += 1
+        return session
+
+    def release(self, session_id):
+        """
+        Marks a request made with a session as completed.
+        """
+        session = self.session(session_id)
+        session._load = max(0, session._load - 1)
@@ -0,0 +1,164 @@
+"""
+This module contains the state store used to crawl the active principals
+incrementally.
+
+The store remembers every principal seen on a previous crawl, keyed on it's
+reg number, name and registration date, along with the exhibits found on
+it's exhibit page. A principal whose list page row has not changed since
+then doesn't need it's exhibit page fetched again, the stored exhibits are
+merged into it instead. Principals of the store which are not seen again
+on a complete crawl are marked as removed.
+"""
+
+import copy
+import datetime
+import json
+import os
+
+from fara_principals.core.pages import exhibit_url_key
+from fara_principals.exceptions import StateStoreError
+
+#version of the layout of the state file
+__state_version__ = 1
+
+def principal_key(principal_dict):
+    """
+    Args:
+        principal_dict(dict): a partial or full principal dict.
+
+    Returns:
+        str: the key a principal is stored under.
+    """
+    return u"\t".join([principal_dict.get(field) or u"" for field in
+        ("reg_number", "principal_name", "principal_reg_date")])
+
+def _list_page_fields(principal_dict):
+    """
+    returns the fields of a principal which are read off the list page,
+    without the session specific part of it's exhibit url.
+    """
+    fields = dict((key, value) for key, value in principal_dict.items()
+        if key not in ("exhibit", "exhibits"))
+    if fields.get("url"):
+        fields["url"] = exhibit_url_key(fields["url"])
+    return fields
+
+def write_json_atomically(path, data):
+    """
+    Writes `data` as json to `path` through a temporary file, so a crash
+    while writing never leaves a truncated file behind.
+    """
+    temp_path = "{}.tmp".format(path)
+    with open(temp_path, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.rename(temp_path, path)
+
+class PrincipalStateStore:
+    """
+    Persistent store of the principals seen on previous crawls.
+
+    Args:
+        path(str): path of the json file the store is kept in. It is
+            created on the first `save` if it doesn't exist.
+    """
+
+    def __init__(self, path, *args, **kwargs):
+        self._path = path
+        self._principals = {}
+        self._seen_keys = set()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self._path):
+            return
+
+        try:
+            with open(self._path, 'r') as f:
+                state = json.load(f)
+        except ValueError as e:
+            raise StateStoreError("state file {} is corrupt: {}".format(
+                self._path, e))
+
+        if state.get("version") != __state_version__:
+            raise StateStoreError("unsupported state file version {}".format(
+                state.get("version")))
+        self._principals = state["principals"]
+
+    def path(self):
+        return self._path
+
+    def __len__(self):
+        return len(self._principals)
+
+    def stored_principal(self, partial_principal_dict):
+        """
+        Marks a principal found on a list page as seen.
+
+        Args:
+            partial_principal_dict(dict): the principal's partial dict.
+
+        Returns:
+            dict: the principal's full dict, with the exhibits stored for
+            it, when it's list page fields have not changed since it was
+            stored. None otherwise.
+        """
+        key = principal_key(partial_principal_dict)
+        self._seen_keys.add(key)
+
+        record = self._principals.get(key)
+        if record is None or record["fields"] != \
+        _list_page_fields(partial_principal_dict):
+            return None
+
+        record.pop("removed_at", None)
+        full_principal_dict = dict(partial_principal_dict)
+        full_principal_dict["exhibit"] = copy.deepcopy(record["exhibit"])
+        return full_principal_dict
+
+    def update(self, full_principal_dict):
+        """
+        Stores the full dict of a principal which was crawled, replacing
+        what was stored for it.
+        """
+        key = principal_key(full_principal_dict)
+        self._seen_keys.add(key)
+        self._principals[key] = {
+            "fields": _list_page_fields(full_principal_dict),
+            "exhibit": copy.deepcopy(full_principal_dict.get("exhibit", [])),
+        }
+
+    def mark_removed(self, removed_at=None):
+        """
+        Marks the stored principals which were not seen since the store was
+        loaded as removed. It should only be called after a complete crawl.
+
+        Keyword Args:
+            removed_at(str): (optional) the date the principals are marked
+                removed on, today by default.
+
+        Returns:
+            list: the list page fields of the newly removed principals.
+        """
+        removed_at = removed_at or datetime.date.today().isoformat()
+        removed = []
+        for key, record in self._principals.items():
+            if key in self._seen_keys or "removed_at" in record:
+                continue
+            record["removed_at"] = removed_at
+            removed.append(dict(record["fields"]))
+        return removed
+
+    def removed_principals(self):
+        """
+        Returns:
+            list: the list page fields of every principal marked removed,
+            each with the date it was marked on as `removed_at`.
+        """
+        return [dict(record["fields"], removed_at=record["removed_at"])
+            for record in self._principals.values() if "removed_at" in record]
+
+    def save(self):
+        write_json_atomically(self._path, {"version": __state_version__,
+            "principals": self._principals})
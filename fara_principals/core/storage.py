@@ -0,0 +1,295 @@
+"""
+This module contains the SQLite storage of crawled principals.
+
+Principals and their exhibits are kept in two normalized tables, indexed on
+the columns principals are looked up by, so a consumer can find the
+principals of a country or registrant without loading a whole crawl's json
+output. Principals are upserted on their reg number, name and registration
+date, so every crawl, incremental ones included, can be written to the same
+database.
+
+The `mm/dd/yyyy` dates don't sort as strings, so each date is also stored as
+it's proleptic ordinal (see `fara_principals.core.dates`), which is what the
+date indexes are built on and date ranges are looked up by.
+"""
+
+import sqlite3
+
+from fara_principals.core.dates import date_ordinal, to_ordinal
+from fara_principals.exceptions import StorageError
+
+__principal_fields__ = ("reg_number", "principal_name", "principal_reg_date",
+    "reg_date", "registrant", "country", "state", "address", "url")
+__exhibit_fields__ = ("document_link", "document_type", "date_stamped",
+    "reg_number", "registrant")
+
+#principal fields which can be queried on, each has an index
+__indexed_fields__ = ("country", "reg_number", "registrant",
+    "principal_reg_date", "reg_date", "date_stamped")
+
+#date fields, stored along with their ordinal in a `<field>_ordinal` column
+__principal_date_fields__ = ("principal_reg_date", "reg_date")
+__exhibit_date_fields__ = ("date_stamped",)
+
+__schema__ = """
+CREATE TABLE IF NOT EXISTS principals (
+    id INTEGER PRIMARY KEY,
+    reg_number TEXT,
+    principal_name TEXT,
+    principal_reg_date TEXT,
+    reg_date TEXT,
+    principal_reg_date_ordinal INTEGER,
+    reg_date_ordinal INTEGER,
+    registrant TEXT,
+    country TEXT,
+    state TEXT,
+    address TEXT,
+    url TEXT,
+    UNIQUE (reg_number, principal_name, principal_reg_date)
+);
+CREATE TABLE IF NOT EXISTS exhibits (
+    id INTEGER PRIMARY KEY,
+    principal_id INTEGER NOT NULL REFERENCES principals (id),
+    document_link TEXT,
+    document_type TEXT,
+    date_stamped TEXT,
+    date_stamped_ordinal INTEGER,
+    reg_number TEXT,
+    registrant TEXT,
+    UNIQUE (principal_id, document_link)
+);
+"""
+
+#indexes are created once the tables have their ordinal columns, which
+#databases written before they were added lack
+__indexes__ = """
+DROP INDEX IF EXISTS principals_principal_reg_date;
+DROP INDEX IF EXISTS principals_reg_date;
+DROP INDEX IF EXISTS exhibits_date_stamped;
+CREATE INDEX IF NOT EXISTS principals_country ON principals (country);
+CREATE INDEX IF NOT EXISTS principals_reg_number ON principals (reg_number);
+CREATE INDEX IF NOT EXISTS principals_registrant ON principals (registrant);
+CREATE INDEX IF NOT EXISTS principals_principal_reg_date_ordinal
+    ON principals (principal_reg_date_ordinal);
+CREATE INDEX IF NOT EXISTS principals_reg_date_ordinal
+    ON principals (reg_date_ordinal);
+CREATE INDEX IF NOT EXISTS exhibits_principal_id ON exhibits (principal_id);
+CREATE INDEX IF NOT EXISTS exhibits_date_stamped_ordinal
+    ON exhibits (date_stamped_ordinal);
+"""
+
+class PrincipalStorage:
+    """
+    Args:
+        path(str): path of the SQLite database, created if it doesn't exist.
+
+    Keyword Args:
+        batch_size(int): (optional) number of principals written per
+            transaction.
+    """
+
+    def __init__(self, path, batch_size=500, *args, **kwargs):
+        self._path = path
+        self._batch_size = batch_size
+        self._batch = []
+        self._connection = sqlite3.connect(path)
+        self._connection.row_factory = sqlite3.Row
+        #readers don't block the writer, and the writer only syncs at
+        #checkpoints
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("PRAGMA foreign_keys=ON")
+        self._connection.executescript(__schema__)
+        self._add_ordinal_columns()
+        self._connection.executescript(__indexes__)
+
+    def _add_ordinal_columns(self):
+        """
+        adds the ordinal columns to the tables of a database written before
+        dates were stored along with their ordinals, and fills them in.
+        """
+        with self._connection:
+            for table, date_fields in (
+            ("principals", __principal_date_fields__),
+            ("exhibits", __exhibit_date_fields__)):
+                columns = set(row["name"] for row in self._connection.execute(
+                    "PRAGMA table_info({})".format(table)))
+                for field in date_fields:
+                    if field + "_ordinal" in columns:
+                        continue
+                    self._connection.execute(
+                        "ALTER TABLE {} ADD COLUMN {}_ordinal INTEGER"
+                        .format(table, field))
+                    self._connection.executemany(
+                        "UPDATE {0} SET {1}_ordinal = ? WHERE id = ?".format(
+                            table, field),
+                        [(date_ordinal(row[field]), row["id"])
+                            for row in self._connection.execute(
+                                "SELECT id, {} FROM {}".format(field, table))])
+
+    def path(self):
+        return self._path
+
+    def add_principal(self, principal_dict):
+        """
+        Queues a full principal dict to be upserted along with it's
+        exhibits. The queued principals are written once a batch is full.
+        """
+        self._batch.append(principal_dict)
+        if len(self._batch) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the queued principals in a single transaction.
+        """
+        if not self._batch:
+            return
+
+        batch, self._batch = self._batch, []
+        with self._connection:
+            for principal_dict in batch:
+                self._upsert_principal(principal_dict)
+
+    def _upsert_principal(self, principal_dict):
+        values = [principal_dict.get(field) for field in __principal_fields__]
+        ordinals = [date_ordinal(principal_dict.get(field))
+            for field in __principal_date_fields__]
+        self._connection.execute(
+            "INSERT OR IGNORE INTO principals ({}) VALUES ({})".format(
+                ", ".join(__principal_fields__),
+                ", ".join("?" * len(__principal_fields__))), values)
+        self._connection.execute(
+            "UPDATE principals SET {} WHERE reg_number = ? AND "
+            "principal_name = ? AND principal_reg_date = ?".format(
+                ", ".join("{} = ?".format(field)
+                    for field in __principal_fields__[3:] +
+                    _ordinal_columns(__principal_date_fields__))),
+            values[3:] + ordinals + values[:3])
+        principal_id = self._connection.execute(
+            "SELECT id FROM principals WHERE reg_number = ? AND "
+            "principal_name = ? AND principal_reg_date = ?",
+            values[:3]).fetchone()[0]
+
+        exhibit_columns = __exhibit_fields__ + \
+            _ordinal_columns(__exhibit_date_fields__)
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO exhibits (principal_id, {}) "
+            "VALUES (?, {})".format(", ".join(exhibit_columns),
+                ", ".join("?" * len(exhibit_columns))),
+            [[principal_id] + [exhibit.get(field) for field in
+                __exhibit_fields__] + [date_ordinal(exhibit.get(field))
+                for field in __exhibit_date_fields__]
+                for exhibit in principal_dict.get("exhibit") or []])
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+    def __len__(self):
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM principals").fetchone()[0]
+
+    def find(self, **criteria):
+        """
+        Looks principals up on indexed fields, e.g
+        `storage.find(country="AZERBAIJAN")` or
+        `storage.find(reg_date=("01/01/2010", "12/31/2015"))`.
+
+        Keyword Args:
+            country, reg_number, registrant: values the principals' fields
+                have to be equal to.
+            principal_reg_date, reg_date: dates the principals' fields have
+                to be on, or `(start, end)` dates, inclusive, they have to be
+                between. Either bound can be None, dates are `mm/dd/yyyy`
+                strings or dates.
+            date_stamped: the same, for the `date_stamped` of any of the
+                principals' exhibits.
+
+        Returns:
+            list: the full dicts of the matching principals, with their
+            exhibits.
+
+        Raises:
+            StorageError: when a criterion is not an indexed field, or a
+            date is not a date.
+        """
+        conditions = []
+        parameters = []
+        for field in sorted(criteria):
+            if field not in __indexed_fields__:
+                raise StorageError("principals can't be looked up by "
+                    "`{}`".format(field))
+
+            if field not in __principal_date_fields__ + \
+            __exhibit_date_fields__:
+                conditions.append("{} = ?".format(field))
+                parameters.append(criteria[field])
+                continue
+
+            condition, bounds = _date_range_condition(field + "_ordinal",
+                criteria[field])
+            if field in __exhibit_date_fields__:
+                condition = "id IN (SELECT principal_id FROM exhibits " \
+                    "WHERE {})".format(condition)
+            conditions.append(condition)
+            parameters.extend(bounds)
+
+        self.flush()
+        rows = self._connection.execute(
+            "SELECT * FROM principals{} ORDER BY id".format(
+                " WHERE " + " AND ".join(conditions) if conditions else ""),
+            parameters).fetchall()
+        return self._principal_dicts(rows)
+
+    def principals_by_country(self, country):
+        return self.find(country=country)
+
+    def principals_by_registrant(self, registrant):
+        return self.find(registrant=registrant)
+
+    def principals_by_reg_number(self, reg_number):
+        return self.find(reg_number=reg_number)
+
+    def _principal_dicts(self, rows):
+        if not rows:
+            return []
+
+        exhibits = {}
+        ids = [row["id"] for row in rows]
+        #sqlite limits the number of parameters of a statement
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            for exhibit in self._connection.execute(
+            "SELECT * FROM exhibits WHERE principal_id IN ({}) "
+            "ORDER BY id".format(", ".join("?" * len(chunk))), chunk):
+                exhibits.setdefault(exhibit["principal_id"], []).append(
+                    dict((field, exhibit[field])
+                        for field in __exhibit_fields__))
+
+        return [dict([(field, row[field]) for field in __principal_fields__],
+            exhibit=exhibits.get(row["id"], [])) for row in rows]
+
+def _ordinal_columns(date_fields):
+    return tuple(field + "_ordinal" for field in date_fields)
+
+def _date_range_condition(column, value):
+    """
+    returns the condition a date column is on a date, or between the
+    `(start, end)` bounds of `value`, along with it's parameters.
+    """
+    if isinstance(value, (tuple, list)):
+        start, end = value
+    else:
+        start = end = value
+
+    try:
+        bounds = [(operator, to_ordinal(bound)) for operator, bound in
+            ((">=", start), ("<=", end)) if bound is not None]
+    except ValueError as e:
+        raise StorageError(str(e))
+
+    if not bounds:
+        return "{} IS NOT NULL".format(column), []
+    return " AND ".join("{} {} ?".format(column, operator)
+        for operator, _ in bounds), [ordinal for _, ordinal in bounds]
@@ -0,0 +1,125 @@
+"""
+This module contains the logic used to pick how many requests can be sent
+to the server at the same time.
+
+The server serves decoy pages (404s, pages without a page context or empty
+pages while principals remain) when it believes it is being scraped, which
+usually happens when too many requests arrive at once. The safe number of
+concurrent requests changes with the server's mood, so rather than being
+fixed it is found while crawling: it starts low, is raised one step at a 
+time while responses stay healthy, and is halved as soon as a trap is 
+served. The concurrency a trap was served at is only tried again after a
+long run of healthy responses.
+
+The requests in flight when the server starts serving traps are usually all
+trapped. Requests are tagged with the controller's episode when they are
+sent, so the traps of requests sent before the concurrency was last lowered
+don't lower it again.
+"""
+
+class ConcurrencyController:
+    """
+    Additive increase, multiplicative decrease controller for the number of
+    concurrent requests.
+
+    Keyword Args:
+        start(int): (optional) concurrency to begin with, also the lowest
+            concurrency the controller backs off to.
+
+        maximum(int): (optional) highest concurrency the controller raises
+            the concurrency to.
+
+        increase_after(int): (optional) number of healthy responses in a row
+            needed before the concurrency is raised by one.
+
+        restore_ceiling_after(int): (optional) number of healthy responses
+            in a row needed before a ceiling lowered by a trap is raised by
+            one again.
+    """
+
+    def __init__(self, start=1, maximum=8, increase_after=10,
+        restore_ceiling_after=500, *args, **kwargs):
+        self._start = start
+        self._maximum = maximum
+        self._concurrency = start
+        self._ceiling = maximum
+        self._increase_after = increase_after
+        self._restore_ceiling_after = restore_ceiling_after
+        self._healthy_streak = 0
+        #healthy responses since the last trap
+        self._healthy_run = 0
+        self._episode = 0
+
+    def concurrency(self):
+        """
+        Returns:
+            int: the number of requests that can be in flight at once.
+        """
+        return self._concurrency
+
+    def ceiling(self):
+        """
+        Returns:
+            int: the highest concurrency the controller will still try.
+        """
+        return self._ceiling
+
+    def episode(self):
+        """
+        Returns:
+            int: the number of times traps were backed off from, which
+            requests are tagged with when they are sent.
+        """
+        return self._episode
+
+    def healthy_response(self):
+        """
+        Records a healthy response, raising the concurrency once enough
+        healthy responses have been seen in a row, and the ceiling after a
+        long run of them.
+
+        Returns:
+            bool: True if the concurrency was raised.
+        """
+        self._healthy_run += 1
+        if self._healthy_run >= self._restore_ceiling_after and \
+        self._ceiling < self._maximum:
+            self._healthy_run = 0
+            self._ceiling += 1
+
+        self._healthy_streak += 1
+        if self._healthy_streak < self._increase_after or \
+        self._concurrency >= self._ceiling:
+            return False
+
+        self._healthy_streak = 0
+        self._concurrency += 1
+        return True
+
+    def trap_response(self, episode=None):
+        """
+        Records a trap response, halving the concurrency and lowering the
+        ceiling below the concurrency the trap was served at, once per
+        episode of traps.
+
+        Keyword Args:
+            episode(int): (optional) episode the trapped request was sent
+                in. Traps of requests sent in an earlier episode were
+                already backed off from, and only end the healthy run.
+
+        Returns:
+            bool: True if the concurrency was lowered.
+        """
+        self._healthy_streak = 0
+        self._healthy_run = 0
+        if episode is not None and episode < self._episode:
+            return False
+
+        self._episode += 1
+        self._ceiling = max(self._start, 
+            min(self._ceiling, self._concurrency - 1))
+
+        concurrency = max(self._start, self._concurrency // 2)
+        lowered = concurrency < self._concurrency
+        self._concurrency = concurrency
+        return lowered
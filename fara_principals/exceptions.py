@@ -43,4 +43,48 @@ class PaginationEndedError(PageError):
     """
     Raised when there is no more data on a page
     """
-    pass
\ No newline at end of file
+    pass
+
+class SessionError(FaraException):
+    """
+    Raised when there is a problem with the sessions used to crawl the site
+    """
+    pass
+
+class NoActiveSessionError(SessionError):
+    """
+    Raised when a session is needed but none of the sessions in a pool has
+    a usable page context.
+    """
+    pass
+
+class StateStoreError(FaraException):
+    """
+    Raised when the state kept between crawls can't be read
+    """
+    pass
+
+class StorageError(FaraException):
+    """
+    Raised when crawled principals can't be stored or looked up
+    """
+    pass
+
+class QueryError(FaraException):
+    """
+    Raised when exported principals can't be queried as asked
+    """
+    pass
+
+class SchemaError(FaraException):
+    """
+    Raised when a validation schema is declared with an unknown rule or
+    format
+    """
+    pass
+
+class DocumentError(FaraException):
+    """
+    Raised when the document an exhibit links to can't be downloaded
+    """
+    pass
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+# Define your feed exporters here
+#
+# Don't forget to add your exporter to the FEED_EXPORTERS setting
+# See: http://doc.scrapy.org/en/latest/topics/feed-exports.html
+
+from scrapy.exporters import BaseItemExporter
+
+from fara_principals.core.encoding import get_encoder
+
+
+class PrincipalJsonLinesExporter(BaseItemExporter):
+    """
+    Exports principals as json lines, encoded with the fastest json backend
+    installed (see `fara_principals.core.encoding`). Encoded principals are
+    buffered and written to the feed `buffer_size` bytes at a time.
+
+    Keyword Args:
+        buffer_size(int): (optional) number of bytes buffered before they
+            are written.
+        backend(str): (optional) name of the json backend to encode with.
+    """
+
+    #written before the first principal, between two principals, after each
+    #principal and after the last one
+    _start = b""
+    _separator = b""
+    _terminator = b"\n"
+    _end = b""
+
+    def __init__(self, file, buffer_size=64 * 1024, backend=None, **kwargs):
+        self._configure(kwargs, dont_fail=True)
+        self.file = file
+        self.buffer_size = buffer_size
+        self._dumps = get_encoder(backend)
+        self._buffer = []
+        self._buffered = 0
+        self._first_item = True
+
+    def start_exporting(self):
+        self._write(self._start)
+
+    def finish_exporting(self):
+        self._write(self._end)
+        self.flush()
+
+    def export_item(self, item):
+        if self.fields_to_export is not None:
+            #made public in later Scrapy versions
+            serialized_fields = getattr(self, 'get_serialized_fields', None) \
+                or self._get_serialized_fields
+            item = dict(serialized_fields(item))
+        data = self._dumps(item)
+        if self.encoding and self.encoding.lower() not in ("utf-8", "utf8"):
+            data = data.decode('utf-8').encode(self.encoding)
+
+        if self._first_item:
+            self._first_item = False
+            self._write(data + self._terminator)
+        else:
+            self._write(self._separator + data + self._terminator)
+
+    def _write(self, data):
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered principals to the feed.
+        """
+        if self._buffer:
+            self.file.write(b"".join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+
+
+class PrincipalJsonExporter(PrincipalJsonLinesExporter):
+    """
+    Exports principals as a json array, a principal per line, buffered the
+    same way as `PrincipalJsonLinesExporter`.
+    """
+
+    _start = b"[\n"
+    _separator = b",\n"
+    _terminator = b""
+    _end = b"\n]\n"
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+# Define your http cache storages here
+#
+# See: http://doc.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-storage-backends
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+from time import time
+try:
+    from urllib.parse import parse_qsl
+except ImportError:
+    from urlparse import parse_qsl
+
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+
+from fara_principals.core.pages import exhibit_url_key, response_trap_reason
+from fara_principals.core.state import write_json_atomically
+
+logger = logging.getLogger(__name__)
+
+#form fields which only identify the session a list page was requested with
+__session_form_fields__ = ("p_instance", "x01", "x02")
+
+def cache_key(request):
+    """
+    Returns the key a request's response is cached under. Requests for the
+    same rows or the same exhibit page made with different sessions share
+    a key, since the session's page instance id is left out of it.
+    """
+    url = exhibit_url_key(request.url)
+    body = b""
+    if request.method == 'POST':
+        form_data = [(name, value) for name, value in
+            parse_qsl(request.body.decode('utf-8'), keep_blank_values=True)
+            if name not in __session_form_fields__]
+        body = json.dumps(sorted(form_data)).encode('utf-8')
+
+    key = hashlib.sha1(request.method.encode('utf-8'))
+    key.update(b"\n" + url.encode('utf-8') + b"\n")
+    key.update(body)
+    return key.hexdigest()
+
+class ContentAddressedCacheStorage(object):
+    """
+    Http cache storage which keeps each distinct response body once,
+    gzipped and named after it's sha256 digest, and a small json entry per
+    request pointing at the body. Many principals link to the same exhibit
+    page, and every session gets the same list pages, so most requests
+    share a body.
+
+    The cache can be replayed without any network access by running the
+    spider with the `HTTPCACHE_IGNORE_MISSING` setting, which drops the
+    requests missing from the cache instead of downloading them.
+
+    The main pages sessions are bootstrapped from are stored, but only
+    served when replaying: a cached main page holds a page instance the
+    server has expired, which every following request would fail with.
+    """
+
+    def __init__(self, settings):
+        self.cachedir = data_path(settings['HTTPCACHE_DIR'])
+        self.expiration_secs = settings.getint('HTTPCACHE_EXPIRATION_SECS')
+        self.replay = settings.getbool('HTTPCACHE_IGNORE_MISSING')
+
+    def open_spider(self, spider):
+        self._entries_dir = os.path.join(self.cachedir, spider.name,
+            'entries')
+        self._bodies_dir = os.path.join(self.cachedir, spider.name, 'bodies')
+        logger.debug("Using content addressed cache storage in {}".format(
+            self.cachedir), extra={'spider': spider})
+
+    def close_spider(self, spider):
+        pass
+
+    def retrieve_response(self, spider, request):
+        """Return response if present in cache, or None otherwise."""
+        if request.meta.get("bootstrap") and not self.replay:
+            return None
+
+        entry = self._read_entry(request)
+        if entry is None:
+            return None
+
+        body_path = self._body_path(entry["body_digest"])
+        if not os.path.exists(body_path):
+            return None
+        with gzip.open(body_path, 'rb') as f:
+            body = f.read()
+
+        #urls are ascii, but come out of json as unicode on python 2
+        url = str(entry["response_url"])
+        headers = Headers([(name.encode('latin-1'),
+            [value.encode('latin-1') for value in values])
+            for name, values in entry["headers"]])
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        return respcls(url=url, headers=headers, status=entry["status"],
+            body=body)
+
+    def store_response(self, spider, request, response):
+        """Store the given response in the cache."""
+        reason = response_trap_reason(request, response)
+        if reason is not None:
+            logger.debug("Not caching trap page {} ({})".format(request,
+                reason), extra={'spider': spider})
+            return
+
+        body_digest = hashlib.sha256(response.body).hexdigest()
+        body_path = self._body_path(body_digest)
+        if not os.path.exists(body_path):
+            self._make_dirs(os.path.dirname(body_path))
+            temp_path = "{}.tmp".format(body_path)
+            with gzip.open(temp_path, 'wb') as f:
+                f.write(response.body)
+            os.rename(temp_path, body_path)
+
+        entry_path = self._entry_path(request)
+        self._make_dirs(os.path.dirname(entry_path))
+        write_json_atomically(entry_path, {
+            "url": request.url,
+            "method": request.method,
+            "status": response.status,
+            "response_url": response.url,
+            "headers": [(name.decode('latin-1'),
+                [value.decode('latin-1') for value in values])
+                for name, values in response.headers.items()],
+            "body_digest": body_digest,
+            "timestamp": time(),
+        })
+
+    def _read_entry(self, request):
+        entry_path = self._entry_path(request)
+        if not os.path.exists(entry_path):
+            return None
+
+        mtime = os.stat(entry_path).st_mtime
+        if 0 < self.expiration_secs < time() - mtime:
+            return None
+        with open(entry_path, 'r') as f:
+            return json.load(f)
+
+    def _entry_path(self, request):
+        key = cache_key(request)
+        return os.path.join(self._entries_dir, key[0:2], key + '.json')
+
+    def _body_path(self, body_digest):
+        return os.path.join(self._bodies_dir, body_digest[0:2],
+            body_digest + '.gz')
+
+    def _make_dirs(self, path):
+        if not os.path.exists(path):
+            try:
+                os.makedirs(path)
+            except OSError:
+                #created in the meantime
+                if not os.path.isdir(path):
+                    raise
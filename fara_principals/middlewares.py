@@ -5,7 +5,17 @@
 # See documentation in:
 # http://doc.scrapy.org/en/latest/topics/spider-middleware.html
 
+import logging
+
+import scrapy
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http.cookies import CookieJar
+
+from fara_principals.core.pages import response_trap_reason
+from fara_principals.core.throttle import ConcurrencyController
+
+logger = logging.getLogger(__name__)
 
 
 class FaraPrincipalsSpiderMiddleware(object):
@@ -54,3 +64,206 @@ class FaraPrincipalsSpiderMiddleware(object):
 
     def spider_opened(self, spider):
         spider.logger.info('Spider opened: %s' % spider.name)
+
+
+class AdaptiveConcurrencyMiddleware(object):
+    """
+    Downloader middleware which finds the highest number of concurrent
+    requests the site tolerates. It starts at `ADAPTIVE_CONCURRENCY_START`,
+    raises the concurrency of the site's download slot while responses stay
+    healthy and backs off as soon as the site serves one of it's trap pages
+    (see `fara_principals.core.pages.trap_reason`).
+
+    The concurrency chosen is logged whenever it changes and kept in the
+    `adaptive_concurrency/*` stats.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_CONCURRENCY_ENABLED'):
+            raise NotConfigured
+
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.controller = ConcurrencyController(
+            start=settings.getint('ADAPTIVE_CONCURRENCY_START', 1),
+            maximum=settings.getint('ADAPTIVE_CONCURRENCY_MAX', 8),
+            increase_after=settings.getint(
+                'ADAPTIVE_CONCURRENCY_INCREASE_AFTER', 10),
+            restore_ceiling_after=settings.getint(
+                'ADAPTIVE_CONCURRENCY_RESTORE_CEILING_AFTER', 500))
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        m = cls(crawler)
+        crawler.signals.connect(m.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(m.spider_closed, signal=signals.spider_closed)
+        return m
+
+    def spider_opened(self, spider):
+        self._record_concurrency()
+
+    def spider_closed(self, spider):
+        spider.logger.info('Adaptive concurrency settled at %d (ceiling %d)',
+            self.controller.concurrency(), self.controller.ceiling())
+
+    def process_request(self, request, spider):
+        #traps of requests sent before the concurrency was last lowered
+        #don't lower it again
+        request.meta['adaptive_concurrency_episode'] = \
+            self.controller.episode()
+        self._apply_concurrency(request)
+
+    def process_response(self, request, response, spider):
+        reason = response_trap_reason(request, response)
+
+        if reason:
+            self.stats.inc_value('adaptive_concurrency/traps')
+            if self.controller.trap_response(
+            request.meta.get('adaptive_concurrency_episode')):
+                spider.logger.warning(
+                    'Backed off to %d concurrent requests after a %s on %s',
+                    self.controller.concurrency(), reason, request.url)
+                self._record_concurrency()
+        elif self.controller.healthy_response():
+            spider.logger.info('Raised to %d concurrent requests', 
+                self.controller.concurrency())
+            self._record_concurrency()
+
+        self._apply_concurrency(request)
+        return response
+
+    def _apply_concurrency(self, request):
+        slot_key = request.meta.get('download_slot')
+        slot = self.crawler.engine.downloader.slots.get(slot_key)
+        if slot is not None:
+            slot.concurrency = self.controller.concurrency()
+
+    def _record_concurrency(self):
+        self.stats.set_value('adaptive_concurrency/current',
+            self.controller.concurrency())
+        self.stats.max_value('adaptive_concurrency/max',
+            self.controller.concurrency())
+
+
+class SessionExpiryMiddleware(object):
+    """
+    Downloader middleware which recognizes the trap pages the site serves
+    once a session has expired (see `fara_principals.core.pages.trap_reason`)
+    instead of letting them reach the spider as a missing page context or
+    an early end of the pages. The spider's `session_expired` bootstraps
+    the session again and hands the request to another session, and only
+    that request is retried.
+
+    Trapped requests are counted in the `session_expiry/*` stats, as
+    retried, as dropped when the spider gave up on them, or as past the last
+    row when they were list pages past the real end of the report.
+    """
+
+    def __init__(self, crawler):
+        if not crawler.settings.getbool('SESSION_EXPIRY_ENABLED'):
+            raise NotConfigured
+
+        self.crawler = crawler
+        self.stats = crawler.stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def process_response(self, request, response, spider):
+        if "session_id" not in request.meta or \
+        not hasattr(spider, 'session_expired'):
+            return response
+
+        reason = response_trap_reason(request, response)
+        if reason is None:
+            return response
+
+        self.stats.inc_value('session_expiry/traps')
+        requests = spider.session_expired(request, reason)
+        if request.meta.get("session_dropped", False):
+            self.stats.inc_value('session_expiry/dropped')
+        elif request.meta.get("past_last_row", False):
+            self.stats.inc_value('session_expiry/past_last_row')
+        else:
+            self.stats.inc_value('session_expiry/retried')
+
+        if not requests:
+            raise IgnoreRequest("{} on {}".format(reason, request.url))
+        for extra_request in requests[1:]:
+            self._crawl(extra_request, spider)
+        return requests[0]
+
+    def _crawl(self, request, spider):
+        #the engine stopped taking the spider along with the request
+        if scrapy.version_info < (2, 6):
+            self.crawler.engine.crawl(request, spider)
+        else:
+            self.crawler.engine.crawl(request)
+
+
+class SessionCookiesMiddleware(object):
+    """
+    Downloader middleware which takes the place of scrapy's
+    `CookiesMiddleware`. The cookies of a request made with one of the
+    spider's sessions, it's bootstrap included, are read from and stored in
+    the cookie jar the session owns (see
+    `fara_principals.core.sessions.Session.cookie_jar`), so requests never
+    carry cookie dicts of their own. Other requests share a jar of their
+    own.
+
+    Responses to requests made before their session was bootstrapped again
+    are not allowed to store cookies in the session's new jar.
+    """
+
+    def __init__(self, debug=False):
+        self.debug = debug
+        self._default_jar = CookieJar()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('COOKIES_ENABLED'):
+            raise NotConfigured
+        return cls(crawler.settings.getbool('COOKIES_DEBUG'))
+
+    def process_request(self, request, spider):
+        if request.meta.get('dont_merge_cookies', False):
+            return
+
+        jar = self._jar(request, spider)
+        if jar is None:
+            return
+        jar.add_cookie_header(request)
+
+        if self.debug and 'Cookie' in request.headers:
+            logger.debug("Sending cookies to: %s\nCookie: %s", request,
+                request.headers['Cookie'], extra={'spider': spider})
+
+    def process_response(self, request, response, spider):
+        if request.meta.get('dont_merge_cookies', False):
+            return response
+
+        jar = self._jar(request, spider)
+        if jar is not None:
+            jar.extract_cookies(response, request)
+
+        if self.debug and 'Set-Cookie' in response.headers:
+            logger.debug("Received cookies from: %s\nSet-Cookie: %s",
+                response, response.headers.getlist('Set-Cookie'),
+                extra={'spider': spider})
+        return response
+
+    def _jar(self, request, spider):
+        """
+        returns the jar of the session `request` was made with, None when
+        the session has been bootstrapped again since.
+        """
+        sessions = getattr(spider, 'sessions', None)
+        if sessions is None or "session_id" not in request.meta:
+            return self._default_jar
+
+        session = sessions.session(request.meta["session_id"])
+        if session.cookiejar() != request.meta.get("cookiejar"):
+            return None
+        return session.cookie_jar()
@@ -5,7 +5,208 @@
 # Don't forget to add your pipeline to the ITEM_PIPELINES setting
 # See: http://doc.scrapy.org/en/latest/topics/item-pipeline.html
 
+import time
+from collections import OrderedDict
+
+from scrapy.exceptions import DropItem, NotConfigured
+from twisted.internet import defer, task, threads
+
+from fara_principals.core.dedup import KeyIndex, merge_exhibits
+from fara_principals.core.documents import DocumentDownloader, DocumentStore
+from fara_principals.core.state import principal_key
+from fara_principals.core.storage import PrincipalStorage
+
 
 class FaraPrincipalsPipeline(object):
+    """
+    Merges the duplicate principals of a crawl into a single item. A
+    principal is held back until no more duplicates of it are expected,
+    which is when it has been held for `PRINCIPALS_DEDUP_INTERVAL` seconds,
+    when more than `PRINCIPALS_DEDUP_WINDOW` principals are held, or when
+    the spider closes. It is then passed on with the exhibits of it's
+    duplicates merged in, and the duplicates are dropped.
+
+    The response a held principal was scraped from counts in the active
+    size of Scrapy's scraper slot until the principal is passed on, and the
+    engine stops downloading once that size goes over
+    `SCRAPER_SLOT_MAX_ACTIVE_SIZE`. Every held principal is passed on as
+    soon as the scraper slot holds more than
+    `PRINCIPALS_DEDUP_MAX_ACTIVE_SIZE` bytes of responses.
+
+    The keys of the principals passed on are kept in a `KeyIndex`. A
+    duplicate arriving after it's principal was passed on can't be merged
+    into it anymore, it is held and passed on again so it's exhibits are
+    not lost, and counted in the `dedup/late_duplicates` stat. The storage
+    pipelines merge it into the principal they stored already.
+    """
+
+    def __init__(self, window=1000, interval=10.0, max_active_size=None,
+        stats=None, crawler=None):
+        self.window = window
+        self.interval = interval
+        self.max_active_size = max_active_size
+        self.stats = stats
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(window=settings.getint('PRINCIPALS_DEDUP_WINDOW', 1000),
+            interval=settings.getfloat('PRINCIPALS_DEDUP_INTERVAL', 10.0),
+            max_active_size=settings.getint(
+                'PRINCIPALS_DEDUP_MAX_ACTIVE_SIZE', settings.getint(
+                    'SCRAPER_SLOT_MAX_ACTIVE_SIZE', 5000000) // 2),
+            stats=crawler.stats, crawler=crawler)
+
+    def open_spider(self, spider):
+        self._index = KeyIndex()
+        #key -> [merged item, deferreds of the item's duplicates, time the
+        #first of them was held]
+        self._held = OrderedDict()
+        self._flush_loop = task.LoopingCall(self._flush_expired)
+        self._flush_loop.start(max(self.interval / 2.0, 0.1), now=False)
+
+    def close_spider(self, spider):
+        if self._flush_loop.running:
+            self._flush_loop.stop()
+        while self._held:
+            self._flush_oldest()
+
+    def process_item(self, item, spider):
+        key = principal_key(item)
+        held = self._held.get(key)
+        if held is not None:
+            held[0]["exhibit"] = merge_exhibits(held[0].get("exhibit"),
+                item.get("exhibit"))
+            held[1].append(defer.Deferred())
+            self._inc_stats('dedup/merged')
+            return held[1][-1]
+
+        if key in self._index:
+            self._inc_stats('dedup/late_duplicates')
+
+        deferred = defer.Deferred()
+        self._held[key] = [dict(item), [deferred], time.time()]
+        while len(self._held) > self.window:
+            self._flush_oldest()
+        self._flush_if_scraper_full()
+        return deferred
+
+    def _flush_expired(self):
+        expired_before = time.time() - self.interval
+        while self._held and \
+        next(iter(self._held.values()))[2] <= expired_before:
+            self._flush_oldest()
+        self._flush_if_scraper_full()
+
+    def _flush_if_scraper_full(self):
+        """
+        passes every held principal on when the scraper slot's active size
+        is over `max_active_size`.
+        """
+        if not self._held or self.max_active_size is None:
+            return
+
+        engine = getattr(self.crawler, 'engine', None)
+        slot = getattr(getattr(engine, 'scraper', None), 'slot', None)
+        if slot is None or slot.active_size <= self.max_active_size:
+            return
+
+        self._inc_stats('dedup/scraper_full')
+        while self._held:
+            self._flush_oldest()
+
+    def _flush_oldest(self):
+        key, (item, deferreds, _) = self._held.popitem(last=False)
+        self._index.add(key)
+        self._inc_stats('dedup/unique')
+
+        deferreds[0].callback(item)
+        for deferred in deferreds[1:]:
+            deferred.errback(DropItem("duplicate of principal {}, merged "
+                "into it".format(key)))
+
+    def _inc_stats(self, key):
+        if self.stats is not None:
+            self.stats.inc_value(key)
+
+
+class SQLitePipeline(object):
+    """
+    Writes the crawled principals and their exhibits to the SQLite database
+    at `PRINCIPALS_SQLITE_PATH` (see `fara_principals.core.storage`), in
+    transactions of `PRINCIPALS_SQLITE_BATCH_SIZE` principals.
+    """
+
+    def __init__(self, path, batch_size=500):
+        self.path = path
+        self.batch_size = batch_size
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.get('PRINCIPALS_SQLITE_PATH'):
+            raise NotConfigured
+        return cls(settings.get('PRINCIPALS_SQLITE_PATH'),
+            batch_size=settings.getint('PRINCIPALS_SQLITE_BATCH_SIZE', 500))
+
+    def open_spider(self, spider):
+        self.storage = PrincipalStorage(self.path, batch_size=self.batch_size)
+
+    def close_spider(self, spider):
+        self.storage.close()
+
+    def process_item(self, item, spider):
+        self.storage.add_principal(item)
+        return item
+
+
+class DocumentsPipeline(object):
+    """
+    Downloads the documents the exhibits of the crawled principals link to,
+    to the `PRINCIPALS_DOCUMENTS_DIR` directory (see
+    `fara_principals.core.documents`). Documents are downloaded on threads
+    while the crawl goes on, the spider only closes once they all are.
+    """
+
+    def __init__(self, path, concurrency=8, per_host=2, user_agent=None,
+        stats=None):
+        self.path = path
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.user_agent = user_agent
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.get('PRINCIPALS_DOCUMENTS_DIR'):
+            raise NotConfigured
+        return cls(settings.get('PRINCIPALS_DOCUMENTS_DIR'),
+            concurrency=settings.getint('PRINCIPALS_DOCUMENTS_CONCURRENCY', 8),
+            per_host=settings.getint('PRINCIPALS_DOCUMENTS_PER_HOST', 2),
+            user_agent=settings.get('USER_AGENT'), stats=crawler.stats)
+
+    def open_spider(self, spider):
+        headers = {'User-Agent': self.user_agent} if self.user_agent else None
+        self.store = DocumentStore(self.path)
+        self.downloader = DocumentDownloader(self.store,
+            concurrency=self.concurrency, per_host=self.per_host,
+            headers=headers)
+        self.downloader.start()
+
+    def close_spider(self, spider):
+        deferred = threads.deferToThread(self.downloader.close)
+        deferred.addBoth(self._closed)
+        return deferred
+
+    def _closed(self, result):
+        self.store.close()
+        if self.stats is not None:
+            for key, value in self.downloader.stats.items():
+                self.stats.set_value('documents/{}'.format(key), value)
+        return result
+
     def process_item(self, item, spider):
+        self.downloader.add_principal(item)
         return item
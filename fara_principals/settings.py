@@ -13,6 +13,7 @@ BOT_NAME = 'fara_principals'
 
 SPIDER_MODULES = ['fara_principals.spiders']
 NEWSPIDER_MODULE = 'fara_principals.spiders'
+COMMANDS_MODULE = 'fara_principals.commands'
 
 
 # Crawl responsibly by identifying yourself (and your website) on the user-agent
@@ -22,14 +23,17 @@ NEWSPIDER_MODULE = 'fara_principals.spiders'
 ROBOTSTXT_OBEY = False
 
 # Configure maximum concurrent requests performed by Scrapy (default: 16)
-CONCURRENT_REQUESTS = 1
+# The site serves decoy pages when it believes it is being scraped, so only
+# one request is sent to it at a time unless AdaptiveConcurrencyMiddleware
+# finds that more are tolerated (see ADAPTIVE_CONCURRENCY_* below).
+CONCURRENT_REQUESTS = 16
+CONCURRENT_REQUESTS_PER_DOMAIN = 1
 
 # Configure a delay for requests for the same website (default: 0)
 # See http://scrapy.readthedocs.org/en/latest/topics/settings.html#download-delay
 # See also autothrottle settings and docs
 #DOWNLOAD_DELAY = 3
 # The download delay setting will honor only one of:
-#CONCURRENT_REQUESTS_PER_DOMAIN = 16
 #CONCURRENT_REQUESTS_PER_IP = 16
 
 # Disable cookies (enabled by default)
@@ -60,9 +64,13 @@ DEFAULT_REQUEST_HEADERS = {
 
 # Enable or disable downloader middlewares
 # See http://scrapy.readthedocs.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
-#    'fara_principals.middlewares.MyCustomDownloaderMiddleware': 543,
-#}
+DOWNLOADER_MIDDLEWARES = {
+    'fara_principals.middlewares.AdaptiveConcurrencyMiddleware': 543,
+    'fara_principals.middlewares.SessionExpiryMiddleware': 542,
+    #the cookies of each session are kept in the session's own jar
+    'scrapy.downloadermiddlewares.cookies.CookiesMiddleware': None,
+    'fara_principals.middlewares.SessionCookiesMiddleware': 700,
+}
 
 # Enable or disable extensions
 # See http://scrapy.readthedocs.org/en/latest/topics/extensions.html
@@ -70,11 +78,22 @@ DEFAULT_REQUEST_HEADERS = {
 #    'scrapy.extensions.telnet.TelnetConsole': None,
 #}
 
+# Export principals with buffered json writers using the fastest json library
+# installed
+# See http://doc.scrapy.org/en/latest/topics/feed-exports.html
+FEED_EXPORTERS = {
+    'json': 'fara_principals.exporters.PrincipalJsonExporter',
+    'jsonlines': 'fara_principals.exporters.PrincipalJsonLinesExporter',
+    'jl': 'fara_principals.exporters.PrincipalJsonLinesExporter',
+}
+
 # Configure item pipelines
 # See http://scrapy.readthedocs.org/en/latest/topics/item-pipeline.html
-#ITEM_PIPELINES = {
-#    'fara_principals.pipelines.FaraPrincipalsPipeline': 300,
-#}
+ITEM_PIPELINES = {
+    'fara_principals.pipelines.FaraPrincipalsPipeline': 300,
+    'fara_principals.pipelines.SQLitePipeline': 400,
+    'fara_principals.pipelines.DocumentsPipeline': 500,
+}
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See http://doc.scrapy.org/en/latest/topics/autothrottle.html
@@ -95,7 +114,85 @@ DEFAULT_REQUEST_HEADERS = {
 #HTTPCACHE_EXPIRATION_SECS = 0
 #HTTPCACHE_DIR = 'httpcache'
 #HTTPCACHE_IGNORE_HTTP_CODES = []
-#HTTPCACHE_STORAGE = 'scrapy.extensions.httpcache.FilesystemCacheStorage'
-
-
-#DEPTH_PRIORITY = 1
\ No newline at end of file
+# Cached responses are kept once per distinct body and shared by the sessions,
+# set HTTPCACHE_IGNORE_MISSING to replay a crawl from the cache only
+HTTPCACHE_STORAGE = 'fara_principals.httpcache.ContentAddressedCacheStorage'
+
+
+#DEPTH_PRIORITY = 1
+
+
+# Settings specific to the fara_principals spiders
+
+# Number of principals requested per list page. Set to 'auto' to probe for the
+# largest page size the report's worksheet accepts, falling back to smaller
+# sizes when the server returns fewer rows than requested. Never larger than
+# PRINCIPALS_MAX_PENDING_EXHIBITS.
+PRINCIPALS_PAGE_SIZE = 'auto'
+
+# Raise the number of concurrent requests to the site while it's responses
+# stay healthy, and back off when it serves a trap page.
+ADAPTIVE_CONCURRENCY_ENABLED = True
+# The concurrency to start with and the lowest it backs off to
+ADAPTIVE_CONCURRENCY_START = 1
+# The highest concurrency to try
+ADAPTIVE_CONCURRENCY_MAX = 8
+# Healthy responses in a row needed before the concurrency is raised by one
+ADAPTIVE_CONCURRENCY_INCREASE_AFTER = 10
+# Healthy responses in a row needed before a concurrency a trap was served at
+# is tried again
+ADAPTIVE_CONCURRENCY_RESTORE_CEILING_AFTER = 500
+
+# Number of sessions, each bootstrapped from it's own main page, the list
+# pages and exhibits are spread over.
+SESSION_POOL_SIZE = 2
+# Times a request is handed to another session after it's session expired
+SESSION_MAX_RETRIES = 3
+
+# Path of the file the principals seen on previous crawls are kept in. When
+# set, the exhibit pages of principals which have not changed since the last
+# crawl are not fetched again.
+PRINCIPALS_STATE_PATH = None
+
+# Path of the file the crawl's frontier is checkpointed to. An interrupted
+# crawl resumes from it when it is run again with the same path.
+PRINCIPALS_CHECKPOINT_PATH = None
+# Least number of seconds between two checkpoints
+PRINCIPALS_CHECKPOINT_INTERVAL = 30
+
+# Recognize the trap pages served to expired sessions, bootstrap the session
+# again and retry the trapped request with another session.
+SESSION_EXPIRY_ENABLED = True
+
+# Most exhibit pages waited on, or about to be handed out by the list pages in
+# flight, before no more list pages are requested. Keeps the crawl's memory
+# flat however large the report is.
+PRINCIPALS_MAX_PENDING_EXHIBITS = 200
+
+# Number of parsed exhibit pages kept for the principals of later list pages
+# linking to the same exhibit page, which then don't request it again.
+PRINCIPALS_EXHIBIT_CACHE_SIZE = 1000
+
+# Duplicate principals are merged into one item by FaraPrincipalsPipeline. A
+# principal is held for at most PRINCIPALS_DEDUP_INTERVAL seconds, and at most
+# PRINCIPALS_DEDUP_WINDOW principals are held, waiting for it's duplicates.
+PRINCIPALS_DEDUP_WINDOW = 1000
+PRINCIPALS_DEDUP_INTERVAL = 10.0
+# Every held principal is passed on once the responses Scrapy is processing,
+# those of the held principals included, take more than this many bytes. Kept
+# under SCRAPER_SLOT_MAX_ACTIVE_SIZE, over which downloads are paused.
+PRINCIPALS_DEDUP_MAX_ACTIVE_SIZE = 2500000
+
+# Path of the SQLite database principals are also written to, indexed on their
+# country, reg number, registrant and dates. Not written when not set.
+PRINCIPALS_SQLITE_PATH = None
+# Number of principals written per transaction
+PRINCIPALS_SQLITE_BATCH_SIZE = 500
+
+# Directory the documents of the exhibits are downloaded to, along with a
+# manifest linking them to their principals. Not downloaded when not set.
+PRINCIPALS_DOCUMENTS_DIR = None
+# Number of threads downloading documents
+PRINCIPALS_DOCUMENTS_CONCURRENCY = 8
+# Most documents downloaded from the same host at a time
+PRINCIPALS_DOCUMENTS_PER_HOST = 2
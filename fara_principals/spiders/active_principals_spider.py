@@ -1,84 +1,871 @@
 import copy
+import itertools
+import math
+from collections import OrderedDict
+try:
+    from urllib.parse import parse_qsl, urlencode
+except ImportError:
+    from urllib import urlencode
+    from urlparse import parse_qsl
 
 import scrapy
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest
+from scrapy.spidermiddlewares.httperror import HttpError
 
-from fara_principals.core.pages import PrincipalListPage, ExhibitPage
+from fara_principals.core.pages import (
+    PrincipalListPage, ExhibitPage, page_form_data, session_form_data,
+    session_exhibit_url, exhibit_url_key, response_text, __main_url__,
+    __next_page_url__, __default_page_size__, __init_headers__
+)
 from fara_principals.core.principals import ForeignPrincipal, Exhibit
-from fara_principals.exceptions import PaginationEndedError
+from fara_principals.core.checkpoint import CrawlCheckpoint
+from fara_principals.core.schema import EXHIBIT_SCHEMA
+from fara_principals.core.frontier import (
+    PageFrontier, __bootstrap_priority__, __page_priority__,
+    __exhibit_priority__
+)
+from fara_principals.core.sessions import SessionPool
+from fara_principals.core.state import PrincipalStateStore, principal_key
+from fara_principals.exceptions import (
+    PaginationEndedError, NoActiveSessionError, InvalidPrincipalError
+)
 
 class ActivePrincipalsSpider(scrapy.Spider):
     name = 'active_principals'
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super(ActivePrincipalsSpider, cls).from_crawler(crawler,
+            *args, **kwargs)
+        #a principal is only emitted once it has made it through the item
+        #pipelines, which may hold it for a while
+        for signal in (signals.item_scraped, signals.item_dropped,
+        signals.item_error):
+            crawler.signals.connect(spider.item_done, signal=signal)
+        return spider
+
     def start_requests(self):
-        begin_url = 'https://efile.fara.gov/pls/apex/' + \
-            'f?p=171:130:0::NO:RP,130:P130_DATERANGE:N'
+        self.sessions = SessionPool(
+            size=self.settings.getint('SESSION_POOL_SIZE', 1))
+        #requests waiting for a session to become active
+        self._held_requests = []
+        #partial principal dicts waiting for an exhibit page, and the
+        #exhibit dicts of the parsed pages whose principals have not all come
+        #out of the item pipelines yet, by exhibit url key
+        self._exhibit_waiters = {}
+        self._exhibits = {}
+        #(exhibit url key, partial principal dict) of the principals handed
+        #to the item pipelines which have not come out of them yet, by
+        #principal key, and the number of them by exhibit url key
+        self._unscraped = {}
+        self._unscraped_exhibits = {}
+        #exhibit dicts of the last exhibit pages parsed, by exhibit url key,
+        #so principals of later pages linking to them don't request them
+        #again
+        self._exhibit_cache = OrderedDict()
+        self._exhibit_cache_size = self.settings.getint(
+            'PRINCIPALS_EXHIBIT_CACHE_SIZE', 1000)
+        self.state_store = self._state_store()
+        self.checkpoint = self._checkpoint()
+        if self.checkpoint is not None and self.checkpoint.is_resumed():
+            self._exhibit_waiters = self.checkpoint.exhibit_waiters()
+            self._exhibits = self.checkpoint.exhibits()
+        #list pages waiting for the pending exhibit work to go down
+        self.frontier = PageFrontier(max_pending_exhibits=self.settings.getint(
+            'PRINCIPALS_MAX_PENDING_EXHIBITS', 200))
+        self._main_page = None
+        self._discovery_started = False
+        #position of the report's last principal, once a list page came
+        #back with fewer rows than it's page size
+        self._last_row = None
+        #list pages, exhibit pages and principals dropped after their retries
+        #ran out, whose principals were not seen by the crawl
+        self._dropped_pages = 0
+        self._dropped_exhibit_pages = 0
+        self._dropped_principals = 0
+
+        #the main page is fetched like any other page so the session 
+        #bootstrap doesn't block the engine
+        for session in self.sessions.sessions():
+            yield self._bootstrap_request(session)
+
+    def _bootstrap_request(self, session, retries=0):
+        return scrapy.Request(url=__main_url__,
+            headers=copy.deepcopy(__init_headers__),
+            callback=self.parse_main_page, errback=self.bootstrap_failed,
+            dont_filter=True, priority=__bootstrap_priority__,
+            meta={"session_id": session.session_id(), "bootstrap": True,
+                "cookiejar": session.cookiejar(), "session_retries": retries})
+
+    def parse_main_page(self, response):
+        """
+        Reads the page context of a session off it's main page, the cookies
+        it set are already in the session's jar.
+        Once no session of the pool is being bootstrapped, the report total
+        is read off the main page and the list pages are requested. The
+        main page's own rows are not scraped since they are the rows of the
+        first list page.
+        """
+        page = PrincipalListPage(__main_url__, content=response_text(response))
+        session = self.sessions.activate(response.meta["session_id"],
+            page.get_page_context())
+        self.logger.info("session {} bootstrapped with instance {}".format(
+            session.session_id(), session.page_context()["instance_id"]))
+
+        if self._main_page is None:
+            self._main_page = page
+
+        return self._held_session_requests() + self._discovery_requests()
+
+    def bootstrap_failed(self, failure):
+        if self._was_session_expired(failure):
+            return []
+        return self._retry_bootstrap(failure.request.meta, failure)
+
+    def _retry_bootstrap(self, meta, reason):
+        """
+        returns the request bootstrapping a session again, with a new cookie
+        jar, or the requests discovering the pages with the other sessions
+        once the session's bootstrap has been retried too many times.
+        """
+        session = self.sessions.session(meta["session_id"])
+        if meta["session_retries"] < self._session_max_retries():
+            self.logger.info("retrying bootstrap of session {}: {}".format(
+                session.session_id(), reason))
+            self.sessions.rebootstrap(session.session_id())
+            return [self._bootstrap_request(session,
+                meta["session_retries"] + 1)]
+
+        self.logger.error("session {} could not be bootstrapped: {}".format(
+            session.session_id(), reason))
+        meta["session_dropped"] = True
+        self.sessions.expire(session.session_id())
+        return self._discovery_requests()
+
+    def _discovery_requests(self):
+        """
+        returns the requests which start discovering the report's pages,
+        once no session is being bootstrapped any more.
+        """
+        if self._discovery_started or self._main_page is None or \
+        self.sessions.bootstrapping_sessions() or \
+        not self.sessions.active_sessions():
+            return []
+
+        self._discovery_started = True
+        if self.checkpoint is not None and self.checkpoint.is_resumed():
+            return self._resumed_requests()
+
+        #every principal of a page may hand out an exhibit request at once,
+        #so pages are never larger than the pending exhibit work allowed
+        page = self._main_page
+        page_size = self._page_size_setting()
+        max_page_size = self.frontier.max_pending_exhibits()
+        if page_size == 'auto':
+            return [self._page_size_probe_request(self.sessions.acquire(),
+                page.page_size_candidates(max_page_size=max_page_size),
+                page.total_row_count())]
 
-        page = PrincipalListPage(begin_url)
-        dict_cookies = page.main_page_cookie()
+        if page_size > max_page_size:
+            self.logger.warning("page size {} is over "
+                "PRINCIPALS_MAX_PENDING_EXHIBITS, using {}".format(page_size,
+                max_page_size))
+            page_size = max_page_size
+
+        self._set_pagination(page_size, page.total_row_count())
+        return list(self._page_requests(page_size, page.total_row_count()))
+
+    def _resumed_requests(self):
+        """
+        returns the requests for the work a checkpointed crawl had not
+        completed: the exhibit pages principals were waiting on and the
+        list pages which were not done, along with the principals whose
+        exhibit page was already parsed.
+        """
+        checkpoint = self.checkpoint
+        self.logger.info("resuming crawl from checkpoint {}, {} pages done"\
+            .format(checkpoint.path(), len(checkpoint.done_pages())))
+
+        requests = []
+        for key, waiters in list(self._exhibit_waiters.items()):
+            waiters = [partial_principal_dict for partial_principal_dict in
+                waiters if not checkpoint.was_emitted(partial_principal_dict)]
+            if not waiters:
+                del self._exhibit_waiters[key]
+                self._exhibits.pop(key, None)
+                continue
+            self._exhibit_waiters[key] = waiters
+            if key in self._exhibits:
+                #the principals lost in the item pipelines are emitted again
+                #without requesting their exhibit page
+                requests.extend(self._waiters_principal_dicts(key,
+                    self._exhibits[key]))
+                continue
+            requests.append(self._exhibit_request(self.sessions.acquire(),
+                waiters[0]["url"], key))
+
+        page_size, total_rows = checkpoint.page_size(), checkpoint.total_rows()
+        requests.extend(self._page_requests(page_size, total_rows))
+
+        #the page following the last done page is requested when the last
+        #page of the report, or the first page when it's total was not known
+        #and the pages were followed one by one, was done
+        last_page = max(1, self._last_page(page_size, total_rows))
+        if checkpoint.is_page_done(last_page):
+            self.frontier.add_page(page_size, checkpoint.last_done_page() + 1,
+                follow_next_page=True, total_rows=total_rows)
+            requests.extend(self._released_page_requests())
+        return requests
+
+    def _page_size_setting(self):
+        """
+        returns the number of principals to request per page, or 'auto' if
+        it has to be negotiated with the server. It can be set with the
+        `page_size` spider argument or the `PRINCIPALS_PAGE_SIZE` setting.
+        """
+        page_size = getattr(self, 'page_size', None) or \
+            self.settings.get('PRINCIPALS_PAGE_SIZE', __default_page_size__)
+        if page_size == 'auto':
+            return page_size
+        return int(page_size)
+
+    def _state_store(self):
+        """
+        returns the store of the principals seen on previous crawls when the
+        spider runs incrementally, None otherwise. The store's path can be
+        set with the `state_path` spider argument or the
+        `PRINCIPALS_STATE_PATH` setting.
+        """
+        state_path = getattr(self, 'state_path', None) or \
+            self.settings.get('PRINCIPALS_STATE_PATH')
+        if not state_path:
+            return None
+
+        state_store = PrincipalStateStore(state_path)
+        self.logger.info("crawling incrementally, {} principals stored".format(
+            len(state_store)))
+        return state_store
+
+    def _session_max_retries(self):
+        return self.settings.getint('SESSION_MAX_RETRIES', 3)
+
+    def _page_size_probe_request(self, session, page_sizes, total_rows):
+        """
+        requests the main page's next page with the largest of `page_sizes`,
+        the remaining sizes are tried in turn if the server doesn't return
+        as many rows as requested.
+        """
+        page_context = session.page_context()
+        next_page_context = copy.deepcopy(page_context)
+        next_page_context["page"] = page_context["page"] + 1
+        return scrapy.FormRequest(url=__next_page_url__, 
+            callback=self.parse_page_size_probe,
+            errback=self.page_size_probe_failed,
+            meta={"page_context": next_page_context, "page_sizes": page_sizes,
+                "total_rows": total_rows, "first_row": 1,
+                "session_id": session.session_id(),
+                "cookiejar": session.cookiejar()},
+            dont_filter=True, method='POST', 
+            formdata=page_form_data(page_context, page_sizes[0]))
 
-        return self._next_requests(page, dict_cookies)
+    def parse_page_size_probe(self, response):
+        self.sessions.release(response.meta["session_id"])
+        page_sizes = response.meta["page_sizes"]
+        page = PrincipalListPage(response.url, content=response_text(response), 
+            page_context=response.meta["page_context"],
+            page_size=page_sizes[0])
 
-    def _next_requests(self, page, cookies):
-        next_page_request = self._next_page_request(page, cookies)
+        if len(page_sizes) > 1 and not page.accepts_page_size(page_sizes[0],
+        response.meta["total_rows"]):
+            self.logger.info("page size {} not accepted, got {} rows".format(
+                page_sizes[0], page.row_count()))
+            return [self._next_page_size_probe_request(response.meta)]
 
-        partial_principals = page.partial_principals()
-        exhibit_requests = self._exhibit_requests(partial_principals,
-            cookies)
+        self.logger.info("using page size {}".format(page_sizes[0]))
+        total_rows = page.total_row_count() or response.meta["total_rows"]
+        self._set_pagination(page_sizes[0], total_rows)
+        return self._probe_page_requests(page, total_rows)
 
-        return [next_page_request] + exhibit_requests
+    def _probe_page_requests(self, page, total_rows):
+        """
+        yields the exhibit requests of the accepted probe page, which holds
+        the first page of principals, followed by the remaining pages.
+        """
+        for exhibit_request in self._page_exhibit_requests(page):
+            yield exhibit_request
 
-    def _next_page_request(self, page, cookies):
+        if total_rows is None or total_rows <= page.page_size():
+            for page_request in self._next_page_requests(page):
+                yield page_request
+            return
+
+        for page_request in self._page_requests(page.page_size(), total_rows,
+        first_page=2):
+            yield page_request
+
+    def page_size_probe_failed(self, failure):
+        meta = failure.request.meta
+        self.sessions.release(meta["session_id"])
+        if len(meta["page_sizes"]) == 1:
+            self.logger.error("no page size was accepted: {}".format(failure))
+            return []
+
+        self.logger.info("page size {} failed: {}".format(
+            meta["page_sizes"][0], failure))
+        return [self._next_page_size_probe_request(meta)]
+
+    def _next_page_size_probe_request(self, meta):
+        #the probe stays on it's session so the page sizes are all tried
+        #against the same page instance
+        return self._page_size_probe_request(
+            self.sessions.acquire(meta["session_id"]), meta["page_sizes"][1:],
+            meta["total_rows"])
+
+    def _next_requests(self, page):
+        #exhibit requests are yielded while the page is still being parsed,
+        #the next page is requested once the whole page has been read.
+        for exhibit_request in self._page_exhibit_requests(page):
+            yield exhibit_request
+
+        for page_request in self._next_page_requests(page):
+            yield page_request
+
+    def _page_exhibit_requests(self, page):
+        """
+        yields the exhibit requests of a list page's principals, marking
+        the page done in the checkpoint once they have all been handed out.
+        The checkpoint is saved right away since the page will not be
+        requested again when the crawl is resumed.
+        """
+        principal_keys = []
+        for exhibit_request in self._exhibit_requests(
+        page.iter_partial_principals(), principal_keys):
+            yield exhibit_request
+
+        #the page context of a list page is the one of the next page
+        page_number = page.get_page_context()["page"] - 1
+        if len(principal_keys) < page.page_size():
+            self._end_reached((page_number - 1) * page.page_size() +
+                len(principal_keys))
+
+        if self.checkpoint is not None:
+            self.checkpoint.page_done(page_number, principal_keys)
+            self._save_checkpoint(force=True)
+
+    def _end_reached(self, last_row):
+        """
+        records the position of the report's last principal, read off a
+        list page with fewer rows than it's page size. The report total can
+        be overstated, the pages after the last principal are not requested
+        and those in flight are not taken for traps when they come back
+        empty.
+        """
+        if self._last_row is not None and self._last_row <= last_row:
+            return
+
+        self._last_row = last_row
+        self.logger.info("the report ends at principal {}".format(last_row))
+        self.frontier.drop_pages_after(last_row)
+
+    def _page_requests(self, page_size, total_rows, first_page=1):
+        """
+        Since the form data of a page only depends on the page number and
+        the page context, every page from `first_page` to the last page of
+        the report is added to the frontier at once when the report's total
+        is known, and requested as soon as the pending exhibit work allows,
+        each with the least loaded session of the pool. The last page keeps
+        following the pages after it, in case the total was lower than the
+        real number of principals. When the total is not known, only
+        `first_page` is requested and each page then requests the page
+        after it. Pages already done by a checkpointed crawl are skipped.
+        """
+        last_page = max(first_page, self._last_page(page_size, total_rows))
+        for page_number in range(first_page, last_page + 1):
+            if self.checkpoint is not None and \
+            self.checkpoint.is_page_done(page_number):
+                continue
+            self.frontier.add_page(page_size, page_number,
+                follow_next_page=page_number == last_page,
+                total_rows=total_rows)
+
+        for page_request in self._released_page_requests():
+            yield page_request
+
+    def _released_page_requests(self):
+        """
+        yields the requests of the pages the frontier releases, given the
+        exhibit pages being waited on at the time.
+        """
+        for page_size, page_number, follow_next_page, total_rows in \
+        self.frontier.release(len(self._exhibit_waiters)):
+            yield self._page_request(self.sessions.acquire(), page_size,
+                page_number, follow_next_page, total_rows=total_rows)
+
+    def _last_page(self, page_size, total_rows):
+        """
+        returns the number of the report's last page, or 0 if the report's
+        total is not known.
+        """
+        if total_rows is None:
+            return 0
+        return int(math.ceil(total_rows / float(page_size)))
+
+    def _set_pagination(self, page_size, total_rows):
+        if self.checkpoint is not None:
+            self.checkpoint.set_pagination(page_size, total_rows)
+            self._save_checkpoint(force=True)
+
+    def _page_request(self, session, page_size, page_number,
+        follow_next_page, total_rows=None):
+        request_page_context = copy.deepcopy(session.page_context())
+        request_page_context["page"] = page_number
+        next_page_context = copy.deepcopy(request_page_context)
+        next_page_context["page"] = page_number + 1
+
+        return scrapy.FormRequest(url=__next_page_url__, 
+            callback=self.parse_principal_page,
+            errback=self.session_request_failed, priority=__page_priority__,
+            meta={"page_context": next_page_context, "page_size": page_size,
+                "follow_next_page": follow_next_page, "total_rows": total_rows,
+                "first_row": (page_number - 1) * page_size + 1,
+                "session_id": session.session_id(),
+                "cookiejar": session.cookiejar()},
+            dont_filter=True, method='POST', 
+            formdata=page_form_data(request_page_context, page_size))
+
+    def _next_page_requests(self, page):
         try:
-            next_page_url = page.next_page_url()
+            page.next_page_url()
         except PaginationEndedError as e:
             self.logger.info("Page Ended! {}".format(e))
             raise e
 
-        page_context = page.get_page_context()
+        self.frontier.add_page(page.page_size(),
+            page.get_page_context()["page"], follow_next_page=True)
+        return list(self._released_page_requests())
 
-        next_page_form_data = page.next_page_form_data()
-        next_page_context = copy.deepcopy(page_context)
-        next_page_context["page"] = page_context["page"] + 1
-        next_page_request = scrapy.FormRequest(url=next_page_url, 
-            callback=self.parse_principal_page, cookies=cookies,
-            meta={"page_context": next_page_context}, dont_filter=True,
-            method='POST', formdata=next_page_form_data)
-        return next_page_request
-
-    def _exhibit_requests(self, principals, cookies):
-        exhibit_requests = []
+    def _exhibit_requests(self, principals, principal_keys):
+        """
+        Several principals link to the same exhibit page, so exhibit pages
+        are only requested for the first principal linking to them. The
+        other principals wait for that page to be parsed, or get their full
+        dict at once if it already has been and the principals it was parsed
+        for are still in the item pipelines.
+
+        A list page requested again by a resumed crawl holds principals
+        which were already emitted, or are already waiting on their exhibit
+        page or in the item pipelines, those are skipped.
+
+        The key of each principal is appended to `principal_keys`.
+        """
         for partial_principal in principals:
-            exhibit_request = self._exhibit_request(
-                partial_principal, cookies)
-            exhibit_requests.append(exhibit_request)
+            partial_principal_dict = partial_principal.to_dict()
+            principal_keys.append(principal_key(partial_principal_dict))
+            key = exhibit_url_key(partial_principal_dict["url"])
+            if self._was_handed_out(partial_principal_dict, key):
+                continue
 
-        return exhibit_requests
+            stored_principal_dict = self._stored_principal_dict(
+                partial_principal_dict)
+            if stored_principal_dict is not None:
+                self._principal_handed_out(stored_principal_dict,
+                    partial_principal_dict, key)
+                yield stored_principal_dict
+            elif self._parsed_exhibits(key) is not None:
+                full_principal_dict = self._full_principal_dict(
+                    partial_principal_dict, self._parsed_exhibits(key), key)
+                if full_principal_dict is not None:
+                    yield full_principal_dict
+            elif key in self._exhibit_waiters:
+                self._exhibit_waiters[key].append(partial_principal_dict)
+            else:
+                self._exhibit_waiters[key] = [partial_principal_dict]
+                yield self._exhibit_request(self.sessions.acquire(),
+                    partial_principal_dict["url"], key)
 
-    def _exhibit_request(self, principal, cookies):
-        partial_principal_dict = principal.to_dict()
-        return scrapy.Request(url=partial_principal_dict["url"], 
-            meta=dict(partial_principal_dict=partial_principal_dict),
-            callback=self.parse_exhibit_page, cookies=cookies)
+    def _was_handed_out(self, partial_principal_dict, key):
+        """
+        returns True if a checkpointed crawl already emitted a principal,
+        or it is waiting on the exhibit page of `key` or in the item
+        pipelines.
+        """
+        if self.checkpoint is None:
+            return False
+
+        principal = principal_key(partial_principal_dict)
+        return self.checkpoint.was_emitted(partial_principal_dict) or \
+            principal in self._unscraped or \
+            any(principal_key(waiter) == principal
+                for waiter in self._exhibit_waiters.get(key, []))
+
+    def _exhibit_request(self, session, url, key):
+        exhibit_url = session_exhibit_url(url, session.page_context())
+        return scrapy.Request(url=exhibit_url,
+            meta=dict(exhibit_key=key, session_id=session.session_id(),
+                cookiejar=session.cookiejar()),
+            callback=self.parse_exhibit_page,
+            errback=self.session_request_failed, priority=__exhibit_priority__)
+
+    def session_request_failed(self, failure):
+        """
+        Handles a failed list page or exhibit request. The server answers
+        the requests of an expired session with decoy 404s, which are dealt
+        with like `session_expired` does when the `SessionExpiryMiddleware`
+        is not enabled.
+        """
+        if self._was_session_expired(failure):
+            return []
+
+        request = failure.request
+        self.sessions.release(request.meta["session_id"])
+        if not failure.check(HttpError) or \
+        failure.value.response.status != 404:
+            self.logger.error("request {} failed: {}".format(request, failure))
+            return self._drop_request(request)
+
+        return self._retry_with_active_session(request)
+
+    def session_expired(self, request, reason):
+        """
+        Called by the `SessionExpiryMiddleware` when the response to a
+        request shows it's session has expired. The session is bootstrapped
+        again with a new page context and cookies, and the request is handed
+        to another active session, with it's form data or url rewritten for
+        that session, or held until a session becomes active. A page size
+        probe is followed by the probe of the next page size, unless it was
+        the last one.
+
+        Args:
+            request(Request): the request whose response was a trap page.
+            reason(str): the kind of trap page the response was.
+
+        Returns:
+            list: the requests to schedule, the original request is dropped.
+        """
+        #the errback of the dropped request has nothing left to do
+        request.meta["session_expired"] = True
+        self.logger.info("session {} expired: {} on {}".format(
+            request.meta["session_id"], reason, request.url))
+
+        if request.meta.get("bootstrap", False):
+            return self._retry_bootstrap(request.meta, reason)
+
+        self.sessions.release(request.meta["session_id"])
+        if len(request.meta.get("page_sizes", ())) > 1:
+            #the server answers page sizes it doesn't accept like an expired
+            #session, the next page size is probed instead
+            self.logger.info("page size {} failed: {}".format(
+                request.meta["page_sizes"][0], reason))
+            return [self._next_page_size_probe_request(request.meta)]
+        return self._retry_with_active_session(request)
+
+    def _was_session_expired(self, failure):
+        return failure.check(IgnoreRequest) is not None and \
+            failure.request.meta.get("session_expired", False)
+
+    def _retry_with_active_session(self, request):
+        """
+        expires the session of a request and returns the requests
+        bootstrapping it again along with the request rewritten for another
+        active session. A list page past the end of the report is not a
+        trap, it is finished with instead.
+        """
+        if self._last_row is not None and \
+        request.meta.get("first_row", 0) > self._last_row and \
+        "page_size" in request.meta:
+            request.meta["past_last_row"] = True
+            self.logger.info("{} is past the end of the report".format(
+                request))
+            self.frontier.page_finished(request.meta["page_size"])
+            return list(self._released_page_requests())
+
+        requests = self._expire_session(request.meta["session_id"],
+            request.meta["cookiejar"])
+        retries = request.meta.get("session_retries", 0)
+        if retries >= self._session_max_retries():
+            self.logger.error("giving up on {} after {} retries".format(
+                request, retries))
+            return requests + self._drop_request(request)
+
+        meta = dict(request.meta, session_retries=retries + 1)
+        meta.pop("session_expired", None)
+        request = request.replace(meta=meta, dont_filter=True)
+        try:
+            session = self.sessions.acquire()
+        except NoActiveSessionError:
+            self._held_requests.append(request)
+            return requests
+
+        return requests + [self._session_request(request, session)]
+
+    def _drop_request(self, request):
+        """
+        drops a list page or exhibit request which will not be retried,
+        along with the principals waiting for it's exhibit page, and returns
+        the page requests the work it frees allows.
+        """
+        request.meta["session_dropped"] = True
+        if "page_size" in request.meta:
+            self.frontier.page_finished(request.meta["page_size"])
+            self._dropped_pages += 1
+        else:
+            self._dropped_exhibit_pages += 1
+
+        waiters = self._exhibit_waiters.pop(request.meta.get("exhibit_key"),
+            [])
+        if waiters:
+            self._dropped_principals += len(waiters)
+            self.logger.error("dropped {} principals waiting for {}".format(
+                len(waiters), request.url))
+        return list(self._released_page_requests())
+
+    def _expire_session(self, session_id, cookiejar):
+        """
+        expires a session, returning the request which bootstraps it again
+        if it was still active. Failures of requests made before the session
+        was last bootstrapped, with an older `cookiejar`, are ignored.
+        """
+        if self.sessions.session(session_id).cookiejar() != cookiejar or \
+        not self.sessions.expire(session_id):
+            return []
+
+        self.logger.info("session {} expired".format(session_id))
+        return [self._bootstrap_request(self.sessions.rebootstrap(session_id))]
+
+    def _session_request(self, request, session):
+        """
+        returns `request` rewritten to be made with `session`'s page context
+        and cookie jar.
+        """
+        page_context = session.page_context()
+        meta = dict(request.meta, session_id=session.session_id(),
+            cookiejar=session.cookiejar())
+        #the cookies of the expired session are not sent along
+        headers = request.headers.copy()
+        headers.pop('Cookie', None)
+
+        if request.method == 'POST':
+            form_data = session_form_data(
+                parse_qsl(request.body.decode('utf-8')), page_context)
+            meta["page_context"] = dict(page_context,
+                page=request.meta["page_context"]["page"])
+            return request.replace(body=urlencode(form_data), meta=meta,
+                headers=headers)
+
+        return request.replace(url=session_exhibit_url(request.url,
+            page_context), meta=meta, headers=headers)
+
+    def _held_session_requests(self):
+        """
+        returns the requests which were waiting for an active session,
+        rewritten for the active sessions.
+        """
+        held_requests, self._held_requests = self._held_requests, []
+        return [self._session_request(request, self.sessions.acquire())
+            for request in held_requests]
 
     def parse_principal_page(self, response):
-        page = PrincipalListPage(response.url, content=response.body, 
-            page_context=response.meta["page_context"])
-        cookies = response.headers.getlist('Cookie')
-        return self._next_requests(page, cookies)
+        self.sessions.release(response.meta["session_id"])
+        self.frontier.page_finished(response.meta["page_size"])
+        page = PrincipalListPage(response.url, content=response_text(response), 
+            page_context=response.meta["page_context"],
+            page_size=response.meta["page_size"])
+        if response.meta.get("follow_next_page", True):
+            requests = self._next_requests(page)
+        else:
+            requests = self._page_exhibit_requests(page)
+
+        #the frontier is asked for more pages once this page's exhibit
+        #requests have been handed out
+        return itertools.chain(requests, self._released_page_requests())
 
     def parse_exhibit_page(self, response):
-        partial_principal_dict = response.meta["partial_principal_dict"]
-        principal = ForeignPrincipal(partial_dict=partial_principal_dict)
-        principal.validate_data()
+        self.sessions.release(response.meta["session_id"])
+        key = response.meta["exhibit_key"]
+
+        exhibit_page = ExhibitPage(response_text(response))
+        exhibits, violations = EXHIBIT_SCHEMA.valid_records(
+            exhibit_page.exhibits())
+        for violation in violations:
+            self.logger.error("invalid exhibit on {}: {}".format(
+                response.url, violation.message))
+
+        exhibit_dicts = [exhibit.to_dict() for exhibit in exhibits]
+        for full_principal_dict in self._waiters_principal_dicts(key,
+        exhibit_dicts):
+            yield full_principal_dict
+        self._save_checkpoint()
+
+        for page_request in self._released_page_requests():
+            yield page_request
 
-        exhibit_page = ExhibitPage(response.body)
-        exhibits = exhibit_page.exhibits()
-        
+    def _waiters_principal_dicts(self, key, exhibit_dicts):
+        """
+        returns the full dicts of the principals waiting on the exhibit page
+        of `key`. The exhibits are kept until those principals have come out
+        of the item pipelines, and in the cache of the last exhibit pages
+        parsed for the principals of later pages linking to the page.
+        """
+        self._exhibits[key] = exhibit_dicts
+        self._cache_exhibits(key, exhibit_dicts)
+        full_principal_dicts = []
+        for partial_principal_dict in self._exhibit_waiters.pop(key, []):
+            full_principal_dict = self._full_principal_dict(
+                partial_principal_dict, exhibit_dicts, key)
+            if full_principal_dict is not None:
+                full_principal_dicts.append(full_principal_dict)
+
+        if key not in self._unscraped_exhibits:
+            del self._exhibits[key]
+        return full_principal_dicts
+
+    def _parsed_exhibits(self, key):
+        """
+        returns the exhibit dicts of the exhibit page of `key` if it was
+        parsed and they are still kept, None otherwise.
+        """
+        exhibit_dicts = self._exhibits.get(key)
+        if exhibit_dicts is None:
+            exhibit_dicts = self._exhibit_cache.get(key)
+        return exhibit_dicts
+
+    def _cache_exhibits(self, key, exhibit_dicts):
+        """
+        caches the exhibit dicts of an exhibit page, dropping those of the
+        least recently parsed page when the cache is full.
+        """
+        self._exhibit_cache.pop(key, None)
+        self._exhibit_cache[key] = exhibit_dicts
+        while len(self._exhibit_cache) > self._exhibit_cache_size:
+            self._exhibit_cache.popitem(last=False)
+
+    def _full_principal_dict(self, partial_principal_dict, exhibit_dicts,
+        key):
+        """
+        returns the dict of a principal with the exhibits of it's exhibit
+        page, or None if the principal's data is invalid.
+        """
+        principal = ForeignPrincipal(partial_dict=partial_principal_dict)
+        try:
+            principal.validate_data()
+        except InvalidPrincipalError as e:
+            self.logger.error("invalid principal {}: {}".format(
+                partial_principal_dict, e))
+            return None
 
-        for exhibit in exhibits:
-            print exhibit.to_dict()
-            exhibit.validate()
-            principal.add_exhibit_dict(exhibit.to_dict())
+        for exhibit_dict in exhibit_dicts:
+            principal.add_exhibit_dict(exhibit_dict)
 
         full_principal_dict = principal.to_dict()
-        yield full_principal_dict
\ No newline at end of file
+        if self.state_store is not None:
+            self.state_store.update(full_principal_dict)
+        self._principal_handed_out(full_principal_dict, partial_principal_dict,
+            key)
+        return full_principal_dict
+
+    def _principal_handed_out(self, full_principal_dict,
+        partial_principal_dict, key):
+        """
+        records a principal handed to the item pipelines, it is
+        checkpointed as waiting on it's exhibit page until it comes out of
+        them, so a resumed crawl emits it again if it was lost.
+        """
+        if self.checkpoint is not None:
+            self._unscraped.setdefault(principal_key(full_principal_dict),
+                []).append((key, partial_principal_dict))
+            self._unscraped_exhibits[key] = \
+                self._unscraped_exhibits.get(key, 0) + 1
+
+    def item_done(self, item, **kwargs):
+        """
+        Called when a principal came out of the item pipelines, scraped or
+        dropped, at which point it is emitted as far as the checkpoint is
+        concerned. The exhibits of it's exhibit page are dropped once no
+        other principal needs them.
+        """
+        handed_out = self._unscraped.get(principal_key(item))
+        if handed_out is None:
+            return
+
+        key, _ = handed_out.pop()
+        if not handed_out:
+            del self._unscraped[principal_key(item)]
+        self._unscraped_exhibits[key] -= 1
+        if not self._unscraped_exhibits[key]:
+            del self._unscraped_exhibits[key]
+            self._exhibits.pop(key, None)
+        self.checkpoint.principal_emitted(item)
+
+    def _stored_principal_dict(self, partial_principal_dict):
+        """
+        returns the full dict of a principal which has not changed since
+        the last crawl, with it's stored exhibits, when crawling
+        incrementally. None otherwise.
+        """
+        if self.state_store is None:
+            return None
+
+        full_principal_dict = self.state_store.stored_principal(
+            partial_principal_dict)
+        if full_principal_dict is not None:
+            self.crawler.stats.inc_value('incremental/unchanged')
+        return full_principal_dict
+
+    def _checkpoint(self):
+        """
+        returns the checkpoint of the crawl's frontier when the crawl is
+        checkpointed, None otherwise. The checkpoint's path can be set with
+        the `checkpoint_path` spider argument or the
+        `PRINCIPALS_CHECKPOINT_PATH` setting, the crawl resumes from it if it
+        exists.
+        """
+        checkpoint_path = getattr(self, 'checkpoint_path', None) or \
+            self.settings.get('PRINCIPALS_CHECKPOINT_PATH')
+        if not checkpoint_path:
+            return None
+
+        return CrawlCheckpoint(checkpoint_path,
+            interval=self.settings.getint('PRINCIPALS_CHECKPOINT_INTERVAL', 30))
+
+    def _save_checkpoint(self, force=False):
+        if self.checkpoint is None:
+            return
+
+        #principals still in the item pipelines are saved as waiting on
+        #their exhibit page
+        exhibit_waiters = dict((key, list(waiters))
+            for key, waiters in self._exhibit_waiters.items())
+        for handed_out in self._unscraped.values():
+            for key, partial_principal_dict in handed_out:
+                exhibit_waiters.setdefault(key, []).append(
+                    partial_principal_dict)
+        self.checkpoint.save(exhibit_waiters, self._exhibits, force=force)
+
+    def closed(self, reason):
+        if getattr(self, 'state_store', None) is not None:
+            #principals can only be known to be removed after a complete
+            #crawl, one which dropped principals may not have seen them
+            if reason == 'finished' and (self._dropped_pages or
+            self._dropped_principals):
+                self.logger.warning("{} list pages and {} principals were "
+                    "dropped, not marking unseen principals removed".format(
+                    self._dropped_pages, self._dropped_principals))
+            elif reason == 'finished':
+                removed = self.state_store.mark_removed()
+                self.crawler.stats.set_value('incremental/removed',
+                    len(removed))
+                for principal_dict in removed:
+                    self.logger.info("principal removed: {}".format(
+                        principal_dict))
+            self.state_store.save()
+
+        if getattr(self, 'checkpoint', None) is not None:
+            #a finished crawl has nothing left to resume, unless it dropped
+            #pages the next crawl can resume with
+            if reason == 'finished' and not self._exhibit_waiters and \
+            not self._unscraped and not self._dropped_pages and \
+            not self._dropped_exhibit_pages:
+                self.checkpoint.remove()
+            else:
+                self._save_checkpoint(force=True)
@@ -1,7 +1,8 @@
 from distutils.core import setup
 setup(
   name = 'fara_principals',
-  packages = ['fara_principals', 'fara_principals.core', 'fara_principals.spiders'], 
+  packages = ['fara_principals', 'fara_principals.core', 'fara_principals.spiders',
+    'fara_principals.commands'], 
   version = '0.0.7',
   description = 'A web scraper designed to collect Foreign Principal' +\
       ' information from fara.gov',
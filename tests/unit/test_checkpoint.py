@@ -0,0 +1,77 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from fara_principals.core.checkpoint import CrawlCheckpoint
+from fara_principals.core.state import principal_key
+
+class TestCrawlCheckpoint(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'checkpoint.json')
+        self.principal_dict = {"reg_number": "6065", 
+            "principal_name": "Embassy of Azerbaijan",
+            "principal_reg_date": "12/3/2018"}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_new_checkpoint_is_not_resumed(self):
+        checkpoint = CrawlCheckpoint(self.path)
+        self.assertEqual(False, checkpoint.is_resumed())
+        self.assertEqual(0, checkpoint.last_done_page())
+
+    def test_resume_saved_checkpoint(self):
+        checkpoint = CrawlCheckpoint(self.path)
+        checkpoint.set_pagination(100, 515)
+        checkpoint.page_done(1)
+        checkpoint.page_done(3)
+        checkpoint.principal_emitted(self.principal_dict)
+        waiters = {"key": [self.principal_dict]}
+        self.assertEqual(True, checkpoint.save(waiters, {}, force=True))
+
+        resumed = CrawlCheckpoint(self.path)
+        self.assertEqual(True, resumed.is_resumed())
+        self.assertEqual((100, 515), 
+            (resumed.page_size(), resumed.total_rows()))
+        self.assertEqual([1, 3], resumed.done_pages())
+        self.assertEqual(False, resumed.is_page_done(2))
+        self.assertEqual(3, resumed.last_done_page())
+        self.assertEqual(waiters, resumed.exhibit_waiters())
+        self.assertEqual(True, resumed.was_emitted(self.principal_dict))
+
+    def test_done_page_principals_are_not_recorded(self):
+        checkpoint = CrawlCheckpoint(self.path)
+        other_principal_dict = dict(self.principal_dict, reg_number="6066")
+        checkpoint.principal_emitted(self.principal_dict)
+        checkpoint.page_done(1, [principal_key(self.principal_dict),
+            principal_key(other_principal_dict)])
+        self.assertEqual(False, checkpoint.was_emitted(self.principal_dict))
+
+        #a principal of a done page emitted late is not recorded either
+        checkpoint.principal_emitted(other_principal_dict)
+        self.assertEqual(False, checkpoint.was_emitted(other_principal_dict))
+        checkpoint.save({}, {}, force=True)
+        with open(self.path) as f:
+            state = json.load(f)
+        self.assertEqual(([], []),
+            (state["emitted_keys"], state["done_page_keys"]))
+
+    def test_save_respects_interval(self):
+        checkpoint = CrawlCheckpoint(self.path, interval=3600)
+        self.assertEqual(False, checkpoint.save({}, {}))
+        self.assertEqual(False, os.path.exists(self.path))
+
+    def test_remove(self):
+        checkpoint = CrawlCheckpoint(self.path)
+        checkpoint.save({}, {}, force=True)
+        checkpoint.remove()
+        self.assertEqual(False, os.path.exists(self.path))
+
+    def test_unreadable_checkpoint_is_ignored(self):
+        with open(self.path, 'w') as f:
+            f.write("{not json")
+        self.assertEqual(False, CrawlCheckpoint(self.path).is_resumed())
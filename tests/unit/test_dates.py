@@ -0,0 +1,60 @@
+import datetime
+from unittest import TestCase
+
+from fara_principals.core.dates import (
+    DateColumn, date_ordinal, ordinal_date, principal_date_columns, to_ordinal
+)
+
+class TestDates(TestCase):
+
+    def test_date_ordinal(self):
+        self.assertEqual(datetime.date(2018, 12, 3).toordinal(),
+            date_ordinal("12/3/2018"))
+        self.assertEqual("12/03/2018", ordinal_date(date_ordinal("12/3/2018")))
+        for invalid in ("13/01/2018", "02/30/2018", "2018-12-03", "1/2/18",
+        "", None):
+            self.assertIsNone(date_ordinal(invalid))
+
+    def test_to_ordinal(self):
+        ordinal = datetime.date(2009, 3, 9).toordinal()
+        self.assertEqual(ordinal, to_ordinal("03/09/2009"))
+        self.assertEqual(ordinal, to_ordinal(datetime.date(2009, 3, 9)))
+        self.assertEqual(ordinal, to_ordinal(ordinal))
+        with self.assertRaises(ValueError):
+            to_ordinal("March 9, 2009")
+
+class TestDateColumn(TestCase):
+
+    def setUp(self):
+        self.column = DateColumn(["06/26/2009", "12/3/2018", "bad", None,
+            "03/09/2009", "12/03/2018"])
+
+    def test_normalizes_dates(self):
+        self.assertEqual(6, len(self.column))
+        self.assertEqual(date_ordinal("12/3/2018"), self.column.ordinals()[1])
+        self.assertEqual(0, self.column.ordinals()[2])
+        self.assertEqual([2], self.column.invalid())
+        self.assertEqual("bad", self.column.dates()[2])
+
+    def test_sorts_and_filters_valid_dates(self):
+        self.assertEqual([4, 0, 1, 5], self.column.argsort())
+        self.assertEqual([4, 0], self.column.between(end="12/31/2009"))
+        self.assertEqual([0, 1, 5], self.column.between("06/26/2009"))
+        self.assertEqual([], self.column.between("01/01/2010", "12/31/2017"))
+
+    def test_principal_date_columns(self):
+        principals = [
+            {"reg_date": "12/3/2018", "principal_reg_date": "01/02/2017",
+                "exhibit": [{"date_stamped": "12/03/2018"}]},
+            {"reg_date": "03/09/2009", "principal_reg_date": "",
+                "exhibit": [{"date_stamped": "03/09/2009"},
+                    {"date_stamped": "01/01/2019"}]},
+        ]
+        columns = principal_date_columns(principals)
+        self.assertEqual([1, 0], columns["reg_date"].argsort())
+        self.assertEqual([0], columns["principal_reg_date"].argsort())
+        stamped = columns["date_stamped"]
+        self.assertEqual([1, 0, 1], [stamped.owner(position)
+            for position in stamped.argsort()])
+        self.assertEqual([1], [stamped.owner(position)
+            for position in stamped.between("01/01/2019")])
@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+from fara_principals.core.dedup import KeyIndex, merge_exhibits
+
+class TestKeyIndex(TestCase):
+
+    def test_add_and_contains(self):
+        index = KeyIndex()
+        self.assertEqual(True, index.add(u"6065\tEmbassy\t12/3/2018"))
+        self.assertEqual(False, index.add(u"6065\tEmbassy\t12/3/2018"))
+        self.assertEqual(True, u"6065\tEmbassy\t12/3/2018" in index)
+        self.assertEqual(False, u"6066\tEmbassy\t12/3/2018" in index)
+        self.assertEqual(1, len(index))
+
+    def test_grows_past_capacity(self):
+        index = KeyIndex(capacity=4)
+        keys = ["principal-{}".format(number) for number in range(5000)]
+        for key in keys:
+            self.assertEqual(True, index.add(key))
+
+        self.assertEqual(5000, len(index))
+        for key in keys:
+            self.assertEqual(True, key in index)
+        self.assertEqual(False, "principal-5000" in index)
+
+
+class TestMergeExhibits(TestCase):
+
+    def test_merges_on_document_link(self):
+        exhibit_a = {"document_link": "http://www.fara.gov/docs/a.pdf"}
+        exhibit_b = {"document_link": "http://www.fara.gov/docs/b.pdf"}
+
+        self.assertEqual([exhibit_a, exhibit_b], 
+            merge_exhibits([exhibit_a], [dict(exhibit_a), exhibit_b]))
+        self.assertEqual([exhibit_b], merge_exhibits(None, [exhibit_b]))
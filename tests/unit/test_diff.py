@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from fara_principals.core.diff import diff_snapshots, principal_changes
+
+class TestDiffSnapshots(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.exhibit = {"reg_number": "6065", "document_type": "Exhibit AB",
+            "document_link": "http://www.fara.gov/docs/a.pdf",
+            "date_stamped": "12/03/2018", "registrant": "Some Registrant"}
+        self.principal_dict = {
+            "url": "f?p=171:200:111::NO:RP,200:P200_REG_NUMBER:6065",
+            "country": "AZERBAIJAN", "state": "DC", "address": "Washington",
+            "reg_number": "6065", "principal_name": "Embassy of Azerbaijan",
+            "principal_reg_date": "12/3/2018", "reg_date": "12/3/2018",
+            "registrant": "Some Registrant", "exhibit": [self.exhibit]
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_snapshot(self, name, principals, json_lines=False):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w') as f:
+            if json_lines:
+                f.write("\n".join(json.dumps(principal_dict)
+                    for principal_dict in principals))
+            else:
+                json.dump(principals, f)
+        return path
+
+    def principal(self, **fields):
+        principal_dict = dict(self.principal_dict)
+        principal_dict.update(fields)
+        return principal_dict
+
+    def test_identical_snapshots_have_no_changes(self):
+        #only the session instance id of the url differs
+        old = self.write_snapshot('old.json', [self.principal_dict])
+        new = self.write_snapshot('new.jl', [self.principal(
+            url="f?p=171:200:222::NO:RP,200:P200_REG_NUMBER:6065")],
+            json_lines=True)
+        self.assertEqual([], list(diff_snapshots(old, new)))
+
+    def test_reports_added_and_removed_principals(self):
+        removed = self.principal(principal_name="Removed")
+        added = self.principal(principal_name="Added")
+        old = self.write_snapshot('old.json', [self.principal_dict, removed])
+        new = self.write_snapshot('new.json', [added, self.principal_dict])
+
+        changes = list(diff_snapshots(old, new))
+        self.assertEqual(["added", "removed"],
+            [change["change"] for change in changes])
+        self.assertEqual(added, changes[0]["principal"])
+        self.assertEqual({"reg_number": "6065", "principal_name": "Removed",
+            "principal_reg_date": "12/3/2018"}, changes[1]["key"])
+
+    def test_reports_field_and_exhibit_changes(self):
+        other_exhibit = dict(self.exhibit, document_link="b.pdf")
+        old = self.write_snapshot('old.json', [self.principal_dict])
+        new = self.write_snapshot('new.json', [self.principal(
+            address="Baku", exhibit=[other_exhibit])])
+
+        change, = diff_snapshots(old, new)
+        self.assertEqual("changed", change["change"])
+        self.assertEqual({"address": {"old": "Washington", "new": "Baku"}},
+            change["fields"])
+        self.assertEqual([other_exhibit], change["added_exhibits"])
+        self.assertEqual([self.exhibit], change["removed_exhibits"])
+        self.assertEqual([], change["changed_exhibits"])
+
+    def test_merges_duplicate_principals(self):
+        other_exhibit = dict(self.exhibit, document_link="b.pdf")
+        old = self.write_snapshot('old.json', [self.principal_dict,
+            self.principal(exhibit=[other_exhibit])])
+        new = self.write_snapshot('new.json', [self.principal(
+            exhibit=[other_exhibit, self.exhibit])])
+        self.assertEqual([], list(diff_snapshots(old, new)))
+
+    def test_changed_exhibits(self):
+        stamped = dict(self.exhibit, date_stamped="12/04/2018")
+        change = principal_changes(self.principal_dict,
+            self.principal(exhibit=[stamped]))
+        self.assertEqual([{"old": self.exhibit, "new": stamped}],
+            change["changed_exhibits"])
+        self.assertEqual({}, change["fields"])
@@ -0,0 +1,261 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+import requests
+
+from fara_principals.core.documents import DocumentDownloader, DocumentStore
+
+class DocumentHandler(BaseHTTPRequestHandler):
+    """
+    Serves the documents of the server, honouring `Range: bytes=N-`.
+    """
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.headers.get("Range")))
+        #documents in `held` are only served once the server is released
+        if self.path in server.held:
+            server.released.wait(5)
+        content = server.documents.get(self.path)
+        if content is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        #documents in `gzipped` are compressed when the client accepts it,
+        #all of them when `force_gzip` is set
+        if server.force_gzip or (self.path in server.gzipped and
+        "gzip" in (self.headers.get("Accept-Encoding") or "")):
+            self.send_gzipped(content)
+            return
+
+        start = 0
+        if self.headers.get("Range"):
+            start = int(self.headers["Range"].split("=")[1].rstrip("-"))
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes {}-{}/{}".format(start,
+                len(content) - 1, len(content)))
+        else:
+            self.send_response(200)
+        body = content[start:]
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        #the first response of a document in `cut_short` is cut short
+        if self.path in server.cut_short:
+            server.cut_short.remove(self.path)
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def send_gzipped(self, content):
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb') as f:
+            f.write(content)
+        body = buffer.getvalue()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class RecordingSession(requests.Session):
+    """
+    Session recording the threads it sends requests from.
+    """
+
+    def __init__(self):
+        super(RecordingSession, self).__init__()
+        self.threads = set()
+
+    def get(self, *args, **kwargs):
+        self.threads.add(threading.current_thread().ident)
+        return super(RecordingSession, self).get(*args, **kwargs)
+
+class TestDocumentDownloader(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.servers = []
+        self.server = self.start_server()
+        self.server.documents = {"/docs/a.pdf": b"a" * 400000,
+            "/docs/b.pdf": b"b" * 1000, "/docs/copy-of-b.pdf": b"b" * 1000}
+        self.base_url = self.server_url(self.server)
+
+    def tearDown(self):
+        for server in self.servers:
+            server.released.set()
+            server.shutdown()
+            server.server_close()
+        shutil.rmtree(self.temp_dir)
+
+    def start_server(self):
+        server = HTTPServer(("127.0.0.1", 0), DocumentHandler)
+        server.documents = {}
+        server.requests = []
+        server.cut_short = set()
+        server.held = set()
+        server.gzipped = set()
+        server.force_gzip = False
+        server.released = threading.Event()
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.servers.append(server)
+        return server
+
+    def server_url(self, server):
+        return "http://127.0.0.1:{}".format(server.server_port)
+
+    def principal(self, name, *paths, **kwargs):
+        base_url = kwargs.get("base_url", self.base_url)
+        return {"reg_number": "6065", "principal_name": name,
+            "principal_reg_date": "12/3/2018", "registrant": "Registrant",
+            "exhibit": [{"document_link": base_url + path,
+                "document_type": "Exhibit AB", "date_stamped": "12/03/2018"}
+                for path in paths]}
+
+    def download(self, *principals, **kwargs):
+        store = DocumentStore(self.temp_dir)
+        downloader = DocumentDownloader(store, concurrency=4, per_host=2,
+            timeout=5, **kwargs)
+        downloader.start()
+        for principal_dict in principals:
+            downloader.add_principal(principal_dict)
+        downloader.close()
+        store.close()
+        return downloader
+
+    def manifest(self):
+        with open(os.path.join(self.temp_dir, "manifest.jl")) as f:
+            return [json.loads(line) for line in f]
+
+    def test_stores_documents_by_content(self):
+        downloader = self.download(
+            self.principal("A", "/docs/a.pdf", "/docs/b.pdf"),
+            self.principal("B", "/docs/b.pdf", "/docs/copy-of-b.pdf"))
+
+        #b.pdf is downloaded once for both principals
+        self.assertEqual(3, len(self.server.requests))
+        self.assertEqual(3, downloader.stats["downloaded"])
+        manifest = self.manifest()
+        self.assertEqual(4, len(manifest))
+        sha256 = hashlib.sha256(b"b" * 1000).hexdigest()
+        self.assertEqual(set([sha256]), set(entry["sha256"]
+            for entry in manifest if "b.pdf" in entry["document_link"]))
+        self.assertEqual(set(["A", "B"]), set(entry["principal_name"]
+            for entry in manifest))
+        with open(os.path.join(self.temp_dir, manifest[0]["path"]),
+        'rb') as f:
+            self.assertEqual(self.server.documents["/docs/a.pdf"]
+                if "a.pdf" in manifest[0]["document_link"]
+                else b"b" * 1000, f.read())
+
+    def test_skips_stored_documents(self):
+        self.download(self.principal("A", "/docs/a.pdf"))
+        downloader = self.download(self.principal("A", "/docs/a.pdf"),
+            self.principal("B", "/docs/a.pdf"))
+
+        self.assertEqual(1, len(self.server.requests))
+        self.assertEqual(2, downloader.stats["skipped"])
+        self.assertEqual(["A", "B"], [entry["principal_name"]
+            for entry in self.manifest()])
+
+    def test_resumes_interrupted_downloads(self):
+        self.server.cut_short.add("/docs/a.pdf")
+        downloader = self.download(self.principal("A", "/docs/a.pdf"))
+
+        self.assertEqual(1, downloader.stats["resumed"])
+        #the chunk being read when the connection was cut may be lost
+        (first_path, first_range), (second_path, second_range) = \
+            self.server.requests
+        self.assertEqual(None, first_range)
+        self.assertTrue(second_range.startswith("bytes="))
+        self.assertTrue(0 < int(second_range[6:-1]) <= 200000)
+        entry, = self.manifest()
+        self.assertEqual(hashlib.sha256(b"a" * 400000).hexdigest(),
+            entry["sha256"])
+        self.assertEqual(400000, entry["size"])
+
+    def test_failed_downloads_are_counted(self):
+        downloader = self.download(self.principal("A", "/docs/missing.pdf"),
+            max_retries=0)
+        self.assertEqual(1, downloader.stats["failed"])
+        self.assertEqual([], self.manifest())
+
+    def test_threads_have_their_own_session(self):
+        sessions = []
+        def session_factory():
+            sessions.append(RecordingSession())
+            return sessions[-1]
+
+        self.download(self.principal("A", "/docs/a.pdf", "/docs/b.pdf",
+            "/docs/copy-of-b.pdf"), session_factory=session_factory)
+        self.assertTrue(1 <= len(sessions) <= 4)
+        for session in sessions:
+            self.assertTrue(len(session.threads) <= 1)
+
+    def test_busy_host_does_not_hold_other_hosts(self):
+        other_server = self.start_server()
+        other_server.documents = {"/docs/c.pdf": b"c" * 1000}
+        self.server.held.update(["/docs/a.pdf", "/docs/b.pdf"])
+        store = DocumentStore(self.temp_dir)
+        downloader = DocumentDownloader(store, concurrency=2, per_host=1,
+            timeout=10)
+        downloader.start()
+        downloader.add_principal(self.principal("A", "/docs/a.pdf",
+            "/docs/b.pdf"))
+        downloader.add_principal(self.principal("B", "/docs/c.pdf",
+            base_url=self.server_url(other_server)))
+
+        #b.pdf waits for a.pdf's host while c.pdf is downloaded
+        other_link = self.server_url(other_server) + "/docs/c.pdf"
+        for _ in range(100):
+            if store.document(other_link) is not None:
+                break
+            other_server.released.wait(0.05)
+        self.assertNotEqual(None, store.document(other_link))
+        self.assertEqual(["/docs/a.pdf"], [path
+            for path, _ in self.server.requests])
+
+        self.server.released.set()
+        downloader.close()
+        store.close()
+        self.assertEqual(3, downloader.stats["downloaded"])
+
+    def test_documents_are_not_requested_compressed(self):
+        self.server.gzipped.add("/docs/a.pdf")
+        downloader = self.download(self.principal("A", "/docs/a.pdf"))
+
+        self.assertEqual(1, downloader.stats["downloaded"])
+        entry, = self.manifest()
+        self.assertEqual(400000, entry["size"])
+        self.assertEqual(hashlib.sha256(b"a" * 400000).hexdigest(),
+            entry["sha256"])
+
+    def test_documents_compressed_anyway_are_decoded(self):
+        self.server.force_gzip = True
+        downloader = self.download(self.principal("A", "/docs/a.pdf"))
+
+        self.assertEqual(0, downloader.stats["failed"])
+        entry, = self.manifest()
+        self.assertEqual(400000, entry["size"])
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+from unittest import TestCase
+
+from fara_principals.core.encoding import available_backends, get_encoder
+from fara_principals.core.principals import ForeignPrincipal
+from fara_principals.exporters import (
+    PrincipalJsonExporter, PrincipalJsonLinesExporter
+)
+
+principal_dict = {
+    "url": "https://efile.fara.gov/pls/apex/f?p=171:200", "country": u"CÔTE",
+    "state": "", "address": "Abidjan", "reg_number": "0419",
+    "principal_reg_date": "12/3/2018", "reg_date": "12/3/2018",
+    "registrant": "Mena360", "principal_name": "Fetchr",
+    "exhibit": [{"document_link": "http://www.fara.gov/docs/a.pdf"}]
+}
+
+class TestEncoding(TestCase):
+
+    def test_backends_encode_the_same_json(self):
+        self.assertIn("json", available_backends())
+        for backend in available_backends():
+            data = get_encoder(backend)(principal_dict)
+            self.assertEqual(principal_dict, json.loads(data.decode('utf-8')))
+            self.assertIn(u"CÔTE".encode('utf-8'), data)
+            self.assertIn(b'"url":"https://efile', data)
+
+    def test_encodes_records(self):
+        principal = ForeignPrincipal(partial_dict=principal_dict)
+        self.assertEqual(principal_dict, json.loads(
+            get_encoder()(principal).decode('utf-8')))
+
+    def test_unknown_backend_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            get_encoder("yaml")
+
+class TestExporters(TestCase):
+
+    def export(self, exporter_class, items, **kwargs):
+        f = io.BytesIO()
+        exporter = exporter_class(f, buffer_size=64, **kwargs)
+        exporter.start_exporting()
+        for item in items:
+            exporter.export_item(item)
+        exporter.finish_exporting()
+        return f.getvalue().decode('utf-8')
+
+    def test_json_lines(self):
+        other = dict(principal_dict, reg_number="1")
+        lines = self.export(PrincipalJsonLinesExporter,
+            [principal_dict, other]).splitlines()
+        self.assertEqual([principal_dict, other],
+            [json.loads(line) for line in lines])
+        self.assertEqual("", self.export(PrincipalJsonLinesExporter, []))
+
+    def test_json_array(self):
+        other = dict(principal_dict, reg_number="1")
+        self.assertEqual([principal_dict, other], json.loads(
+            self.export(PrincipalJsonExporter, [principal_dict, other])))
+        self.assertEqual([], json.loads(
+            self.export(PrincipalJsonExporter, [])))
+
+    def test_fields_to_export(self):
+        line = self.export(PrincipalJsonLinesExporter, [principal_dict],
+            fields_to_export=["reg_number"], backend="json")
+        self.assertEqual({"reg_number": "0419"}, json.loads(line))
@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from fara_principals.core.frontier import PageFrontier
+
+class TestPageFrontier(TestCase):
+
+    def setUp(self):
+        self.frontier = PageFrontier(max_pending_exhibits=40)
+        for page_number in range(1, 6):
+            self.frontier.add_page(15, page_number, 
+                follow_next_page=page_number == 5, total_rows=75)
+
+    def test_releases_pages_under_limit(self):
+        released = list(self.frontier.release(0))
+        self.assertEqual([(15, 1, False, 75), (15, 2, False, 75)], released)
+        self.assertEqual(2, self.frontier.pages_in_flight())
+        self.assertEqual(3, self.frontier.pending_pages())
+
+    def test_pending_exhibits_hold_pages_back(self):
+        list(self.frontier.release(0))
+        self.frontier.page_finished(15)
+        self.frontier.page_finished(15)
+
+        self.assertEqual([], list(self.frontier.release(30)))
+        self.assertEqual([3], [page[1] for page in self.frontier.release(25)])
+        self.assertEqual(1, self.frontier.pages_in_flight())
+
+    def test_always_releases_when_idle(self):
+        frontier = PageFrontier(max_pending_exhibits=10)
+        frontier.add_page(100, 1)
+        frontier.add_page(100, 2)
+
+        self.assertEqual([1], [page[1] for page in frontier.release(0)])
+        self.assertEqual([], list(frontier.release(0)))
+        frontier.page_finished(100)
+        self.assertEqual([], list(frontier.release(5)))
+        self.assertEqual([2], [page[1] for page in frontier.release(0)])
@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from scrapy import Spider
+from scrapy.http import FormRequest, HtmlResponse, Request
+from scrapy.settings import Settings
+
+from fara_principals.core.pages import __main_url__, page_form_data
+from fara_principals.httpcache import ContentAddressedCacheStorage, cache_key
+
+def get_data_dir():
+    return os.path.normpath(os.path.join(__file__, '../../'))
+
+def read_data_file(name):
+    with open(os.path.join(get_data_dir(), name), 'rb') as f:
+        return f.read()
+
+class TestContentAddressedCacheStorage(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.spider = Spider('active_principals')
+        self.storage = self.open_storage()
+        self.page_context = {"instance_id": "111", "flow_id": "171",
+            "flow_step_id": "130", "worksheet_id": "222", "report_id": "333",
+            "page": 2}
+        self.list_page = read_data_file('page2.html')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def open_storage(self, replay=False):
+        storage = ContentAddressedCacheStorage(Settings({
+            'HTTPCACHE_DIR': self.cache_dir, 'HTTPCACHE_EXPIRATION_SECS': 0,
+            'HTTPCACHE_IGNORE_MISSING': replay}))
+        storage.open_spider(self.spider)
+        return storage
+
+    def page_request(self, **page_context):
+        return FormRequest('https://efile.fara.gov/pls/apex/wwv_flow.show',
+            formdata=page_form_data(dict(self.page_context, **page_context)),
+            meta={"first_row": 16, "total_rows": 515})
+
+    def store(self, request, body, status=200, url=None):
+        self.storage.store_response(self.spider, request, HtmlResponse(
+            url=url or request.url, body=body, status=status, request=request,
+            headers={'Content-Type': 'text/html; charset=utf-8',
+                'Set-Cookie': 'ORA_WWV_APP_171=ORA_WWV-abc'}))
+
+    def stored_files(self):
+        return sum(len(files) for _, _, files in os.walk(self.cache_dir))
+
+    def test_cache_key_ignores_session(self):
+        self.assertEqual(cache_key(self.page_request()),
+            cache_key(self.page_request(instance_id="999")))
+        self.assertNotEqual(cache_key(self.page_request()),
+            cache_key(self.page_request(page=3)))
+
+    def test_round_trip(self):
+        request = self.page_request()
+        self.store(request, self.list_page)
+
+        response = self.storage.retrieve_response(self.spider,
+            self.page_request(instance_id="999"))
+        self.assertEqual(200, response.status)
+        self.assertEqual(self.list_page, response.body)
+        self.assertEqual(request.url, response.url)
+        self.assertEqual([b'ORA_WWV_APP_171=ORA_WWV-abc'],
+            response.headers.getlist('Set-Cookie'))
+        self.assertTrue(isinstance(response, HtmlResponse))
+
+        self.assertEqual(None, self.storage.retrieve_response(self.spider,
+            self.page_request(page=3)))
+
+    def test_bodies_are_stored_once(self):
+        self.store(self.page_request(), self.list_page)
+        self.store(self.page_request(page=3), self.list_page)
+        #two entries and a single body
+        self.assertEqual(3, self.stored_files())
+
+    def test_traps_are_not_stored(self):
+        request = self.page_request()
+        self.store(request, self.list_page, status=404)
+        self.store(request, b"<html></html>")
+        self.assertEqual(0, self.stored_files())
+
+        #a trap doesn't replace a healthy page already stored
+        self.store(request, self.list_page)
+        self.store(request, b"<html></html>")
+        self.assertEqual(self.list_page, self.storage.retrieve_response(
+            self.spider, request).body)
+
+    def test_bootstrap_is_only_served_when_replaying(self):
+        request = Request(__main_url__, meta={"bootstrap": True})
+        main_page = read_data_file('init.html')
+        self.store(request, main_page)
+
+        self.assertEqual(None, self.storage.retrieve_response(self.spider,
+            request))
+        replay_storage = self.open_storage(replay=True)
+        self.assertEqual(main_page, replay_storage.retrieve_response(
+            self.spider, request).body)
@@ -0,0 +1,258 @@
+import os
+from unittest import TestCase
+
+import mock
+from scrapy import Spider
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import HtmlResponse, Request, Response
+from scrapy.utils.test import get_crawler
+
+from fara_principals.middlewares import (
+    AdaptiveConcurrencyMiddleware, SessionCookiesMiddleware,
+    SessionExpiryMiddleware
+)
+from fara_principals.spiders.active_principals_spider import (
+    ActivePrincipalsSpider
+)
+
+def get_data_dir():
+    return os.path.normpath(os.path.join(__file__, '../../'))
+
+def read_data_file(name):
+    with open(os.path.join(get_data_dir(), name), 'rb') as f:
+        return f.read()
+
+__list_url__ = 'https://efile.fara.gov/pls/apex/wwv_flow.show'
+__redirected_main_url__ = \
+    'https://efile.fara.gov/pls/apex/f?p=171:130:9488617858409::NO'
+
+class TestAdaptiveConcurrencyMiddleware(TestCase):
+
+    def setUp(self):
+        self.crawler = get_crawler(Spider, {
+            'ADAPTIVE_CONCURRENCY_ENABLED': True,
+            'ADAPTIVE_CONCURRENCY_START': 1,
+            'ADAPTIVE_CONCURRENCY_MAX': 8,
+            'ADAPTIVE_CONCURRENCY_INCREASE_AFTER': 1,
+            'ADAPTIVE_CONCURRENCY_RESTORE_CEILING_AFTER': 100,
+        })
+        self.slot = mock.Mock(concurrency=1)
+        self.crawler.engine = mock.Mock()
+        self.crawler.engine.downloader.slots = {'efile.fara.gov': self.slot}
+        self.spider = Spider('test')
+        self.middleware = AdaptiveConcurrencyMiddleware.from_crawler(
+            self.crawler)
+        self.list_page = read_data_file('page2.html')
+
+    def request(self):
+        request = Request(__list_url__, meta={
+            'download_slot': 'efile.fara.gov', 'first_row': 16,
+            'total_rows': 515})
+        self.middleware.process_request(request, self.spider)
+        return request
+
+    def respond(self, request, body=None):
+        response = HtmlResponse(request.url, request=request,
+            body=self.list_page if body is None else body)
+        return self.middleware.process_response(request, response,
+            self.spider)
+
+    def trap(self, request):
+        return self.respond(request, body=b"<html></html>")
+
+    def test_not_configured(self):
+        crawler = get_crawler(Spider, {'ADAPTIVE_CONCURRENCY_ENABLED': False})
+        with self.assertRaises(NotConfigured):
+            AdaptiveConcurrencyMiddleware.from_crawler(crawler)
+
+    def test_raises_slot_concurrency(self):
+        for _ in range(7):
+            self.respond(self.request())
+
+        self.assertEqual(8, self.slot.concurrency)
+        self.assertEqual(8, self.crawler.stats.get_value(
+            'adaptive_concurrency/current'))
+
+    def test_in_flight_traps_back_off_once(self):
+        for _ in range(7):
+            self.respond(self.request())
+        in_flight = [self.request() for _ in range(4)]
+
+        for request in in_flight:
+            self.trap(request)
+        self.assertEqual(4, self.slot.concurrency)
+        self.assertEqual(7, self.middleware.controller.ceiling())
+        self.assertEqual(4, self.crawler.stats.get_value(
+            'adaptive_concurrency/traps'))
+
+        #requests sent after the back off lower it again
+        self.trap(self.request())
+        self.assertEqual(2, self.slot.concurrency)
+
+    def test_recovers_after_healthy_run(self):
+        for _ in range(7):
+            self.respond(self.request())
+        self.trap(self.request())
+        self.trap(self.request())
+        self.trap(self.request())
+        self.assertEqual(1, self.slot.concurrency)
+        self.assertEqual(1, self.middleware.controller.ceiling())
+
+        for _ in range(1000):
+            self.respond(self.request())
+        self.assertEqual(8, self.middleware.controller.ceiling())
+        self.assertEqual(8, self.slot.concurrency)
+
+
+class TestSessionExpiryMiddleware(TestCase):
+
+    def setUp(self):
+        self.crawler = get_crawler(ActivePrincipalsSpider, {
+            'SESSION_EXPIRY_ENABLED': True, 'SESSION_POOL_SIZE': 2,
+            'SESSION_MAX_RETRIES': 1})
+        self.crawler.engine = mock.Mock()
+        self.spider = ActivePrincipalsSpider.from_crawler(self.crawler)
+        self.spider.page_size = 15
+        self.middleware = SessionExpiryMiddleware.from_crawler(self.crawler)
+        self.bootstrap_requests = list(self.spider.start_requests())
+
+    def respond(self, request, body, status=200):
+        return self.middleware.process_response(request, HtmlResponse(
+            request.url, request=request, body=body, status=status),
+            self.spider)
+
+    def bootstrap(self):
+        requests = []
+        for request in self.bootstrap_requests:
+            requests.extend(self.spider.parse_main_page(HtmlResponse(
+                __redirected_main_url__, request=request,
+                body=read_data_file('init.html'))))
+        return requests
+
+    def stat(self, key):
+        return self.crawler.stats.get_value('session_expiry/' + key)
+
+    def test_not_configured(self):
+        crawler = get_crawler(ActivePrincipalsSpider,
+            {'SESSION_EXPIRY_ENABLED': False})
+        with self.assertRaises(NotConfigured):
+            SessionExpiryMiddleware.from_crawler(crawler)
+
+    def test_healthy_responses_pass(self):
+        request = self.bootstrap_requests[0].replace(
+            url=__redirected_main_url__)
+        response = self.respond(request, read_data_file('init.html'))
+        self.assertEqual(200, response.status)
+
+        page_request = self.bootstrap()[0]
+        response = self.respond(page_request, read_data_file('page2.html'))
+        self.assertEqual(200, response.status)
+        self.assertEqual(None, self.stat('traps'))
+
+    def test_redirected_bootstrap_trap(self):
+        #the main page redirects, the trap is still told to be a bootstrap
+        request = self.bootstrap_requests[0].replace(
+            url=__redirected_main_url__)
+        retry = self.respond(request, read_data_file('page2.html'))
+
+        self.assertEqual(True, retry.meta["bootstrap"])
+        self.assertEqual(request.meta["session_id"], retry.meta["session_id"])
+        self.assertEqual((1, 1, None), (self.stat('traps'),
+            self.stat('retried'), self.stat('dropped')))
+
+    def test_trapped_request_is_retried(self):
+        page_request = self.bootstrap()[0]
+        bootstrap_request = self.respond(page_request, b"<html></html>")
+        self.assertEqual(True, bootstrap_request.meta["bootstrap"])
+        self.assertEqual(page_request.meta["session_id"],
+            bootstrap_request.meta["session_id"])
+
+        #the retry with another session is scheduled along
+        retry = self.crawler.engine.crawl.call_args[0][0]
+        self.assertEqual(__list_url__, retry.url)
+        self.assertNotEqual(page_request.meta["session_id"],
+            retry.meta["session_id"])
+        self.assertEqual((1, None), (self.stat('retried'),
+            self.stat('dropped')))
+
+    def test_dropped_request_is_not_counted_as_retried(self):
+        page_request = self.bootstrap()[0]
+        page_request.meta["session_retries"] = 1
+        self.respond(page_request, b"", status=404)
+        self.assertEqual((None, 1), (self.stat('retried'),
+            self.stat('dropped')))
+
+    def test_request_without_new_work_is_ignored(self):
+        page_request = self.bootstrap()[0]
+        for session in self.spider.sessions.sessions():
+            self.spider.sessions.expire(session.session_id())
+
+        #the request is held until a session is active again
+        with self.assertRaises(IgnoreRequest):
+            self.respond(page_request, b"", status=404)
+        self.assertEqual((1, None), (self.stat('retried'),
+            self.stat('dropped')))
+
+    def test_decoy_probe_tries_next_page_size(self):
+        self.spider.page_size = 'auto'
+        probe_request = self.bootstrap()[0]
+        next_probe_request = self.respond(probe_request, b"", status=404)
+        self.assertEqual(probe_request.meta["page_sizes"][1:],
+            next_probe_request.meta["page_sizes"])
+        self.assertEqual(False, self.crawler.engine.crawl.called)
+
+
+class TestSessionCookiesMiddleware(TestCase):
+
+    def setUp(self):
+        self.crawler = get_crawler(ActivePrincipalsSpider,
+            {'SESSION_POOL_SIZE': 2})
+        self.spider = ActivePrincipalsSpider.from_crawler(self.crawler)
+        self.bootstrap_requests = list(self.spider.start_requests())
+        self.middleware = SessionCookiesMiddleware.from_crawler(self.crawler)
+
+    def set_cookie(self, request, cookie):
+        request = request.replace(url=__redirected_main_url__)
+        self.middleware.process_response(request, Response(request.url,
+            headers={'Set-Cookie': cookie}, request=request), self.spider)
+
+    def cookie_header(self, request):
+        request = request.replace(url=__list_url__)
+        self.middleware.process_request(request, self.spider)
+        return request.headers.get('Cookie')
+
+    def test_not_configured(self):
+        crawler = get_crawler(ActivePrincipalsSpider,
+            {'COOKIES_ENABLED': False})
+        with self.assertRaises(NotConfigured):
+            SessionCookiesMiddleware.from_crawler(crawler)
+
+    def test_sessions_have_their_own_cookies(self):
+        first_request, second_request = self.bootstrap_requests
+        self.set_cookie(first_request, 'ORA_WWV_APP_171=first; path=/')
+
+        self.assertEqual(b'ORA_WWV_APP_171=first',
+            self.cookie_header(first_request))
+        self.assertEqual(None, self.cookie_header(second_request))
+        self.assertEqual({'ORA_WWV_APP_171': 'first'},
+            self.spider.sessions.session(
+                first_request.meta["session_id"]).cookies())
+
+    def test_stale_responses_are_ignored(self):
+        stale_request = self.bootstrap_requests[0]
+        session = self.spider.sessions.rebootstrap(
+            stale_request.meta["session_id"])
+        self.set_cookie(stale_request, 'ORA_WWV_APP_171=stale; path=/')
+        self.assertEqual({}, session.cookies())
+        self.assertEqual(None, self.cookie_header(stale_request))
+
+        bootstrap_request = self.spider._bootstrap_request(session)
+        self.set_cookie(bootstrap_request, 'ORA_WWV_APP_171=new; path=/')
+        self.assertEqual(b'ORA_WWV_APP_171=new',
+            self.cookie_header(bootstrap_request))
+
+    def test_requests_without_session_share_default_jar(self):
+        request = Request(__redirected_main_url__)
+        self.set_cookie(request, 'other=1; path=/')
+        self.assertEqual(b'other=1', self.cookie_header(request))
+        self.assertEqual(None, self.cookie_header(self.bootstrap_requests[0]))
@@ -3,11 +3,17 @@ from unittest import TestCase
 
 import mock
 
+from fara_principals.core import pages
+from scrapy.http import HtmlResponse, Request, Response
+
 from fara_principals.core.pages import (
-    __main_url__, PrincipalListPage, ExhibitPage
+    __main_url__, PrincipalListPage, ExhibitPage, page_form_data, trap_reason,
+    session_form_data, session_exhibit_url, exhibit_url_key,
+    response_trap_reason
 )
 from fara_principals.exceptions import (
-    InvalidPrincipalError, PageInstanceInfoNotFoundError
+    InvalidPrincipalError, PageInstanceInfoNotFoundError, PaginationEndedError,
+    PageError
 )
 
 def get_data_dir():
@@ -90,6 +96,20 @@ class TestPrincipalListPage(TestCase):
         #todo: devise a way of testing if this is main page; this is more
         #more complicated.
 
+    def test_main_page_with_content(self):
+        with open(os.path.join(get_data_dir(), 'init.html'), 'r') as f:
+            content = f.read()
+        cookies = {"ORA_WWV_APP_171": "ORA_WWV-abc"}
+        page = PrincipalListPage(__main_url__, content=content, 
+            cookies=cookies)
+
+        self.assertEqual(self._main_page_context(), page.get_page_context())
+        self.assertEqual(cookies, page.main_page_cookie())
+
+    def test_main_page_is_not_fetched(self):
+        with self.assertRaises(PageError):
+            PrincipalListPage(__main_url__)
+
     def test_get_page_context(self):
         self.assertEqual(self.page_context_2, 
             self.list_page_2.get_page_context())
@@ -111,6 +131,37 @@ class TestPrincipalListPage(TestCase):
         self.assertEqual(next_page_form_data, 
             self.list_page_2.next_page_form_data())
 
+    def test_next_page_form_data_with_page_size(self):
+        page = PrincipalListPage(self.normal_page_url_2,
+            content=self.normal_page_content_2,
+            page_context=self.page_context_2, page_size=100)
+        form_data = page.next_page_form_data()
+        self.assertEqual("100", form_data["p_widget_num_return"])
+        self.assertEqual("pgR_min_row=101max_rows=200rows_fetched=100",
+            form_data["p_widget_action_mod"])
+
+        self.assertEqual(form_data, page_form_data(self.page_context_2, 100))
+
+    def test_total_row_count(self):
+        self.assertEqual(515, self.list_page_2.total_row_count())
+        self.assertEqual(515, self._get_main_page_mock().total_row_count())
+
+    def test_page_size_candidates(self):
+        main_page_mock = self._get_main_page_mock()
+        self.assertEqual([1, 5, 10, 15, 20, 25, 50, 100, 1000, 100000],
+            main_page_mock.offered_page_sizes())
+        self.assertEqual([1000, 100, 50, 25, 20, 15],
+            main_page_mock.page_size_candidates())
+        self.assertEqual([100, 50, 25, 20, 15],
+            main_page_mock.page_size_candidates(max_page_size=200))
+        self.assertEqual([15],
+            main_page_mock.page_size_candidates(max_page_size=10))
+
+    def test_accepts_page_size(self):
+        self.assertEqual(True, self.list_page_2.accepts_page_size(15))
+        self.assertEqual(True, self.list_page_2.accepts_page_size(100, 15))
+        self.assertEqual(False, self.list_page_2.accepts_page_size(100, 515))
+
     def test_next_page_url(self):
         self.assertEqual(self.next_page_url, self.list_page_2.next_page_url())
 
@@ -128,6 +179,177 @@ class TestPrincipalListPage(TestCase):
             self.assertIn(principal.to_dict()["principal_name"], 
                 self.page2_principal_names)
 
+    def test_row_count(self):
+        self.assertEqual(self.principals_count_2, self.list_page_2.row_count())
+        self.assertEqual(True, self.list_page_2.has_rows())
+
+        empty_page = PrincipalListPage(self.normal_page_url_2,
+            content="<html><body></body></html>", 
+            page_context=self.page_context_2)
+        self.assertEqual(0, empty_page.row_count())
+        self.assertEqual(False, empty_page.has_rows())
+        with self.assertRaises(PaginationEndedError):
+            empty_page.next_page_url()
+
+    def test_partial_principals_are_memoized(self):
+        with mock.patch('fara_principals.core.pages.ForeignPrincipal',
+        wraps=pages.ForeignPrincipal) as principal_mock:
+            self.list_page_2.next_page_url()
+            self.list_page_2.next_page_form_data()
+            self.assertEqual(0, principal_mock.call_count)
+
+            first = self.list_page_2.partial_principals()
+            second = self.list_page_2.partial_principals()
+            self.assertEqual(self.principals_count_2, 
+                principal_mock.call_count)
+            self.assertEqual(first, second)
+
+    def test_iter_partial_principals_matches_partial_principals(self):
+        streamed_page = PrincipalListPage(self.normal_page_url_2,
+            content=self.normal_page_content_2, 
+            page_context=self.page_context_2)
+        streamed = [principal.to_dict() for principal in 
+            streamed_page.iter_partial_principals(chunk_size=1024)]
+
+        self.assertEqual(
+            [principal.to_dict() for principal in 
+                self.list_page_2.partial_principals()],
+            streamed)
+
+    def test_iter_partial_principals_does_not_build_document(self):
+        with mock.patch('fara_principals.core.pages._parse_document') \
+        as parse_mock:
+            page = PrincipalListPage(self.normal_page_url_2,
+                content=self.normal_page_content_2,
+                page_context=self.page_context_2)
+            principals = page.iter_partial_principals()
+            self.assertEqual("6065", next(principals).to_dict()["reg_number"])
+            list(principals)
+
+            self.assertEqual(self.principals_count_2, page.row_count())
+            self.assertEqual(0, parse_mock.call_count)
+
+    def test_iter_partial_principals_reuses_counted_rows(self):
+        page = PrincipalListPage(self.normal_page_url_2,
+            content=self.normal_page_content_2,
+            page_context=self.page_context_2)
+        self.assertEqual(self.principals_count_2, page.row_count())
+
+        with mock.patch.object(page, '_iter_country_principal_rows') \
+        as stream_mock, \
+        mock.patch('fara_principals.core.pages._parse_document') as parse_mock:
+            streamed = [principal.to_dict() for principal in
+                page.iter_partial_principals()]
+            self.assertEqual(0, stream_mock.call_count)
+            self.assertEqual(0, parse_mock.call_count)
+
+        self.assertEqual(
+            [principal.to_dict() for principal in
+                self.list_page_2.partial_principals()],
+            streamed)
+
+    def test_page_content_is_parsed_once(self):
+        with mock.patch('fara_principals.core.pages._parse_document',
+        wraps=pages._parse_document) as parse_mock:
+            page = PrincipalListPage(self.normal_page_url_2,
+                content=self.normal_page_content_2,
+                page_context=self.page_context_2)
+            page.partial_principals()
+            page.next_page_form_data()
+            self.assertEqual(1, parse_mock.call_count)
+
+
+class TestTrapReason(TestCase):
+
+    def setUp(self):
+        with open(os.path.join(get_data_dir(), 'init.html'), 'r') as f:
+            self.main_page_content = f.read()
+        with open(os.path.join(get_data_dir(), 'page2.html'), 'r') as f:
+            self.list_page_content = f.read()
+
+    def test_healthy_pages(self):
+        self.assertEqual(None, trap_reason(200, self.main_page_content, 
+            main_page=True))
+        self.assertEqual(None, trap_reason(200, self.list_page_content,
+            first_row=16, total_rows=515))
+        self.assertEqual(None, trap_reason(200, "<html></html>", 
+            first_row=521, total_rows=515))
+
+    def test_trap_pages(self):
+        self.assertEqual("decoy 404", trap_reason(404, self.list_page_content))
+        self.assertEqual("missing page context", 
+            trap_reason(200, self.list_page_content, main_page=True))
+        self.assertEqual("empty page with rows remaining", 
+            trap_reason(200, "<html></html>", first_row=16, total_rows=515))
+
+    def test_response_trap_reason(self):
+        #the main page redirects to a url holding the page instance
+        redirected_url = 'https://efile.fara.gov/pls/apex/f?p=171:130:1::NO'
+        main_request = Request(redirected_url, meta={"bootstrap": True})
+        self.assertEqual(None, response_trap_reason(main_request,
+            HtmlResponse(redirected_url, body=self.main_page_content.encode(
+                'utf-8'))))
+        self.assertEqual("missing page context", response_trap_reason(
+            main_request, HtmlResponse(redirected_url,
+                body=self.list_page_content.encode('utf-8'))))
+
+        list_request = Request("https://efile.fara.gov/pls/apex/wwv_flow.show",
+            meta={"first_row": 16, "total_rows": 515})
+        self.assertEqual("empty page with rows remaining",
+            response_trap_reason(list_request, HtmlResponse(list_request.url,
+                body=b"<html></html>")))
+        self.assertEqual("decoy 404", response_trap_reason(list_request,
+            Response(list_request.url, status=404, body=b"not found")))
+
+    def test_empty_page_past_a_lower_total_is_not_a_trap(self):
+        #the page shows the report has fewer rows than first thought
+        content = '<html><body><table><tr><td class="pagination"><span ' \
+            'class="fielddata">1 - 15 of 500</span></td></tr></table>' \
+            '</body></html>'
+        self.assertEqual(None, trap_reason(200, content, first_row=501,
+            total_rows=515))
+        self.assertEqual("empty page with rows remaining", trap_reason(200,
+            content, first_row=496, total_rows=515))
+
+
+class TestSessionRewrite(TestCase):
+
+    def setUp(self):
+        self.page_context = {"instance_id": "111", "flow_id": "171",
+            "flow_step_id": "130", "worksheet_id": "222", "report_id": "333",
+            "page": 1}
+
+    def test_session_form_data(self):
+        form_data = page_form_data({"instance_id": "999", "flow_id": "171",
+            "flow_step_id": "130", "worksheet_id": "888", "report_id": "777",
+            "page": 3})
+        rewritten = session_form_data(form_data, self.page_context)
+
+        self.assertEqual("111", rewritten["p_instance"])
+        self.assertEqual("222", rewritten["x01"])
+        self.assertEqual("333", rewritten["x02"])
+        self.assertEqual(form_data["p_widget_num_return"],
+            rewritten["p_widget_num_return"])
+        self.assertEqual("999", form_data["p_instance"])
+
+    def test_session_exhibit_url(self):
+        url = "https://efile.fara.gov/pls/apex/f?p=171:200:999::NO:RP,200:"\
+            "P200_REG_NUMBER,P200_DOC_TYPE,P200_COUNTRY:6065,Exhibit%20AB,"\
+            "AZERBAIJAN"
+        self.assertEqual(url.replace(":999:", ":111:"),
+            session_exhibit_url(url, self.page_context))
+        self.assertEqual("f/?p=blah",
+            session_exhibit_url("f/?p=blah", self.page_context))
+
+    def test_exhibit_url_key_ignores_instance(self):
+        url = "https://efile.fara.gov/pls/apex/f?p=171:200:{}::NO:RP,200:"\
+            "P200_REG_NUMBER,P200_DOC_TYPE,P200_COUNTRY:6065,Exhibit%20AB,"\
+            "AZERBAIJAN"
+        self.assertEqual(exhibit_url_key(url.format("999")),
+            exhibit_url_key(url.format("111")))
+        self.assertNotEqual(exhibit_url_key(url.format("999")),
+            exhibit_url_key(url.format("999").replace("6065", "6066")))
+
 
 class TestExhibitPage(TestCase):
 
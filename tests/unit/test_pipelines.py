@@ -0,0 +1,105 @@
+from unittest import TestCase
+
+import mock
+from scrapy.exceptions import DropItem
+from scrapy.utils.test import get_crawler
+
+from fara_principals.pipelines import FaraPrincipalsPipeline
+
+class TestFaraPrincipalsPipeline(TestCase):
+
+    def setUp(self):
+        self.crawler = get_crawler(settings_dict={
+            'PRINCIPALS_DEDUP_WINDOW': 2,
+            'PRINCIPALS_DEDUP_MAX_ACTIVE_SIZE': 1000})
+        self.crawler.stats.open_spider(None)
+        self.crawler.engine = mock.Mock()
+        self.crawler.engine.scraper.slot.active_size = 0
+        self.pipeline = FaraPrincipalsPipeline.from_crawler(self.crawler)
+        self.pipeline.open_spider(None)
+        self.principal_dict = {"reg_number": "6065",
+            "principal_name": "Embassy of Azerbaijan",
+            "principal_reg_date": "12/3/2018",
+            "exhibit": [self.exhibit("a.pdf")]}
+        self.results = []
+
+    def tearDown(self):
+        self.pipeline.close_spider(None)
+
+    def exhibit(self, name):
+        return {"document_link": "http://www.fara.gov/docs/" + name}
+
+    def process(self, item):
+        deferred = self.pipeline.process_item(item, None)
+        deferred.addCallbacks(self.results.append,
+            lambda failure: self.results.append(failure.value))
+
+    def passed_items(self):
+        return [result for result in self.results
+            if not isinstance(result, Exception)]
+
+    def dropped_items(self):
+        return [result for result in self.results
+            if isinstance(result, DropItem)]
+
+    def other_principal_dict(self, reg_number):
+        return dict(self.principal_dict, reg_number=reg_number)
+
+    def test_duplicates_are_merged(self):
+        self.process(self.principal_dict)
+        self.process(dict(self.principal_dict,
+            exhibit=[self.exhibit("a.pdf"), self.exhibit("b.pdf")]))
+        self.assertEqual([], self.results)
+
+        self.pipeline.close_spider(None)
+        self.assertEqual(1, len(self.passed_items()))
+        self.assertEqual([self.exhibit("a.pdf"), self.exhibit("b.pdf")],
+            self.passed_items()[0]["exhibit"])
+        self.assertEqual(1, len(self.dropped_items()))
+        self.assertEqual(1, self.crawler.stats.get_value('dedup/merged'))
+
+    def test_oldest_principal_is_passed_on_past_the_window(self):
+        for reg_number in ("1", "2", "3"):
+            self.process(self.other_principal_dict(reg_number))
+        self.assertEqual(["1"], [item["reg_number"]
+            for item in self.passed_items()])
+
+    def test_late_duplicates_are_passed_on_again(self):
+        for reg_number in ("1", "2", "3"):
+            self.process(self.other_principal_dict(reg_number))
+        late_duplicate = dict(self.other_principal_dict("1"),
+            exhibit=[self.exhibit("b.pdf")])
+        self.process(late_duplicate)
+        self.process(dict(late_duplicate, exhibit=[self.exhibit("c.pdf")]))
+        self.assertEqual(1,
+            self.crawler.stats.get_value('dedup/late_duplicates'))
+
+        #the late duplicates' exhibits are not lost
+        self.pipeline.close_spider(None)
+        self.assertEqual([("1", [self.exhibit("b.pdf"),
+            self.exhibit("c.pdf")])], [(item["reg_number"], item["exhibit"])
+            for item in self.passed_items()][-1:])
+        self.assertEqual(4, len(self.passed_items()))
+
+    def test_expired_principals_are_passed_on(self):
+        with mock.patch('fara_principals.pipelines.time.time',
+        return_value=0):
+            self.process(self.principal_dict)
+        with mock.patch('fara_principals.pipelines.time.time',
+        return_value=5):
+            self.process(self.other_principal_dict("1"))
+        with mock.patch('fara_principals.pipelines.time.time',
+        return_value=11):
+            self.pipeline._flush_expired()
+        self.assertEqual(["6065"], [item["reg_number"]
+            for item in self.passed_items()])
+
+    def test_principals_are_passed_on_when_scraper_is_full(self):
+        self.process(self.principal_dict)
+        self.assertEqual([], self.results)
+
+        #the responses of the held principals pause the downloads
+        self.crawler.engine.scraper.slot.active_size = 1001
+        self.process(self.other_principal_dict("1"))
+        self.assertEqual(2, len(self.passed_items()))
+        self.assertEqual(1, self.crawler.stats.get_value('dedup/scraper_full'))
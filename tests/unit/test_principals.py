@@ -63,6 +63,38 @@ class TestPrincipal(TestCase):
                 "validate_partial() unexpectedly raised InvalidPrincipalError:{}"\
                 .format(e))
 
+    def test_reads_fields_without_copying(self):
+        self.assertEqual("0419", self.principal["reg_number"])
+        self.assertEqual("0419", self.principal.reg_number)
+        self.assertEqual(None, self.principal.get("exhibit"))
+        self.assertNotIn("exhibit", self.principal)
+        self.assertEqual(sorted(partial_principal), sorted(self.principal))
+        with self.assertRaises(AttributeError):
+            self.principal.other = "value"
+
+    def test_to_dict_returns_a_copy(self):
+        self.principal.add_exhibit_dict({"document_link": "a"})
+        principal_dict = self.principal.to_dict()
+        principal_dict["exhibit"][0]["document_link"] = "b"
+        principal_dict["country"] = "Ghana"
+        self.assertEqual("a", self.principal["exhibit"][0]["document_link"])
+        self.assertEqual("Nigeria", self.principal["country"])
+
+    def test_partial_dict_is_not_changed(self):
+        principal_dict = dict(partial_principal, exhibit=[], extra="value")
+        principal = ForeignPrincipal(partial_dict=principal_dict)
+        principal.add_exhibit_dict({})
+        self.assertEqual([], principal_dict["exhibit"])
+        self.assertEqual("value", principal["extra"])
+        self.assertEqual(dict(principal_dict, exhibit=[{}]),
+            principal.to_dict())
+
+    def test_missing_key_fails_validation(self):
+        principal_dict = dict(partial_principal)
+        del principal_dict["state"]
+        with self.assertRaises(InvalidPrincipalError):
+            ForeignPrincipal(partial_dict=principal_dict).validate_partial()
+
 class TestExhibit(TestCase):
 
     def setUp(self):
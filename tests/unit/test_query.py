@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from fara_principals.core import feeds
+from fara_principals.core.feeds import iter_feed
+from fara_principals.core.query import PrincipalIndex
+from fara_principals.exceptions import QueryError
+
+class TestIterFeed(TestCase):
+
+    def setUp(self):
+        self.values = [{"reg_number": "6065", "country": u"Côte"},
+            {"reg_number": "5916", "exhibit": [1.5, 2]}, {}]
+        self.read_size = feeds.__read_size__
+        #values have to span reads
+        feeds.__read_size__ = 7
+
+    def tearDown(self):
+        feeds.__read_size__ = self.read_size
+
+    def test_reads_json_array(self):
+        f = io.StringIO(u"\n [ " + u" ,\n".join(json.dumps(value)
+            for value in self.values) + u" ]\n")
+        self.assertEqual(self.values, list(iter_feed(f)))
+
+    def test_reads_json_lines(self):
+        f = io.StringIO(u"\n".join(json.dumps(value)
+            for value in self.values) + u"\n")
+        self.assertEqual(self.values, list(iter_feed(f)))
+
+    def test_reads_empty_feeds(self):
+        self.assertEqual([], list(iter_feed(io.StringIO(u" []"))))
+        self.assertEqual([], list(iter_feed(io.StringIO(u"\n"))))
+
+    def test_invalid_array_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            list(iter_feed(io.StringIO(u'[{"a": 1} {"a": 2}]')))
+
+class TestPrincipalIndex(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'principals.json')
+        self.principals = [
+            {"reg_number": "6065", "country": "AZERBAIJAN",
+                "registrant": "A", "reg_date": "12/3/2018",
+                "principal_reg_date": "01/02/2017",
+                "exhibit": [{"date_stamped": "12/03/2018"},
+                    {"date_stamped": "01/02/2017"}]},
+            {"reg_number": "5916", "country": "ALBANIA",
+                "registrant": "B", "reg_date": "03/09/2009",
+                "principal_reg_date": "03/09/2009"},
+            {"reg_number": "5926", "country": "AZERBAIJAN",
+                "registrant": "B", "reg_date": "06/26/2009",
+                "principal_reg_date": ""},
+        ]
+        with open(self.path, 'w') as f:
+            json.dump(self.principals, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_filters_on_keyed_fields(self):
+        index = PrincipalIndex(self.principals)
+        self.assertEqual([self.principals[0], self.principals[2]],
+            index.query(country="AZERBAIJAN"))
+        self.assertEqual([self.principals[2]],
+            index.query(country="AZERBAIJAN", registrant="B"))
+        self.assertEqual([], index.query(reg_number="1"))
+        self.assertEqual(self.principals, index.query())
+        self.assertEqual(["ALBANIA", "AZERBAIJAN"], index.values("country"))
+
+    def test_filters_on_date_ranges(self):
+        index = PrincipalIndex(self.principals)
+        self.assertEqual(self.principals[1:],
+            index.query(reg_date=("03/09/2009", "06/26/2009")))
+        self.assertEqual([self.principals[0]],
+            index.query(reg_date=("01/01/2010", None)))
+        self.assertEqual([self.principals[1]],
+            index.query(principal_reg_date=(None, "12/31/2016")))
+        self.assertEqual([self.principals[2]],
+            index.query(reg_date=(None, "12/31/2009"), registrant="B",
+                country="AZERBAIJAN"))
+
+    def test_filters_on_exhibit_dates(self):
+        index = PrincipalIndex(self.principals)
+        self.assertEqual([self.principals[0]],
+            index.query(date_stamped=("01/01/2017", None)))
+        self.assertEqual([], index.query(date_stamped=(None, "01/01/2017")))
+
+    def test_invalid_date_raises_query_error(self):
+        with self.assertRaises(QueryError):
+            PrincipalIndex(self.principals).query(reg_date=("2009", None))
+
+    def test_load_writes_and_maps_cache(self):
+        index = PrincipalIndex.load(self.path)
+        self.assertTrue(os.path.exists(self.path + ".idx"))
+        self.assertEqual([self.principals[1]], index.query(country="ALBANIA"))
+
+        cached = PrincipalIndex.load(self.path)
+        self.assertEqual(3, len(cached))
+        self.assertEqual([self.principals[1]],
+            cached.query(country="ALBANIA"))
+        self.assertEqual([self.principals[0]],
+            cached.query(reg_date=("01/01/2010", None)))
+        cached.close()
+
+    def test_stale_cache_is_rebuilt(self):
+        PrincipalIndex.load(self.path)
+        with open(self.path, 'w') as f:
+            f.write("\n".join(json.dumps(principal_dict)
+                for principal_dict in self.principals[:1]))
+
+        index = PrincipalIndex.load(self.path)
+        self.assertEqual([self.principals[0]], index.query())
@@ -0,0 +1,60 @@
+from unittest import TestCase
+
+from fara_principals.core.principals import ForeignPrincipal
+from fara_principals.core.schema import (
+    Schema, Violation, EXHIBIT_SCHEMA, PARTIAL_PRINCIPAL_SCHEMA,
+    PRINCIPAL_SCHEMA
+)
+from fara_principals.exceptions import SchemaError
+
+principal_dict = {
+    "url": "f/?p=blah", "country": "Nigeria", "state": "",
+    "address": "no. 11 banjul street", "reg_number": "0419",
+    "principal_reg_date": "12/3/2018", "reg_date": "12/3/2018",
+    "registrant": "Mena360", "principal_name": "Fetchr", "exhibit": []
+}
+exhibit_dict = {"date_stamped": "1/2/2013",
+    "document_link": "http://www.fara.gov/docs/a.pdf", "reg_number": "0419",
+    "registrant": "Mena vip", "document_type": "Exhibit AB"}
+
+class TestSchema(TestCase):
+
+    def test_valid_records_have_no_violations(self):
+        self.assertEqual([], PRINCIPAL_SCHEMA.violations(principal_dict))
+        self.assertTrue(PRINCIPAL_SCHEMA.is_valid(
+            ForeignPrincipal(partial_dict=principal_dict)))
+        self.assertIsNone(EXHIBIT_SCHEMA.first_violation(exhibit_dict))
+
+    def test_violations_lists_every_violation(self):
+        invalid = dict(principal_dict, country="", reg_date="2018-12-03",
+            url="javascript:void(0)")
+        del invalid["address"]
+        del invalid["exhibit"]
+        self.assertEqual([
+            Violation(None, "address", "required", "key `address` not present"),
+            Violation(None, "exhibit", "required", "key `exhibit` not present"),
+            Violation(None, "country", "non_empty",
+                "required field `country` is empty")
+        ], PRINCIPAL_SCHEMA.violations(invalid)[:3])
+        self.assertEqual(["url", "reg_date"], [violation.field for violation
+            in PRINCIPAL_SCHEMA.violations(invalid)[3:]])
+        self.assertEqual("address",
+            PARTIAL_PRINCIPAL_SCHEMA.first_violation(invalid).field)
+
+    def test_validate_batch(self):
+        exhibits = [exhibit_dict, dict(exhibit_dict, date_stamped="Jan 2"),
+            {"document_link": "a.pdf"}]
+        violations = EXHIBIT_SCHEMA.validate_batch(exhibits)
+        self.assertEqual([1, 2, 2, 2, 2], [violation.index
+            for violation in violations])
+        self.assertEqual("key `date_stamped` not found in exhibit",
+            violations[1].message)
+
+        valid, violations = EXHIBIT_SCHEMA.valid_records(exhibits)
+        self.assertEqual([exhibit_dict], valid)
+
+    def test_unknown_rules_raise_schema_error(self):
+        with self.assertRaises(SchemaError):
+            Schema([("url", {"requried": True})])
+        with self.assertRaises(SchemaError):
+            Schema([("url", {"format": "email"})])
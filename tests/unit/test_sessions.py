@@ -0,0 +1,62 @@
+from unittest import TestCase
+
+from fara_principals.core.sessions import SessionPool
+from fara_principals.exceptions import NoActiveSessionError, SessionError
+
+class TestSessionPool(TestCase):
+
+    def setUp(self):
+        self.pool = SessionPool(size=3)
+
+    def _page_context(self, instance_id):
+        return {"instance_id": instance_id, "page": 1}
+
+    def test_sessions_start_bootstrapping(self):
+        self.assertEqual(3, len(self.pool.bootstrapping_sessions()))
+        self.assertEqual([], self.pool.active_sessions())
+        with self.assertRaises(NoActiveSessionError):
+            self.pool.acquire()
+
+    def test_needs_a_session(self):
+        with self.assertRaises(SessionError):
+            SessionPool(size=0)
+
+    def test_acquire_least_loaded_active_session(self):
+        self.pool.activate(0, self._page_context("1"))
+        self.pool.activate(1, self._page_context("2"))
+
+        acquired = [self.pool.acquire().session_id() for _ in range(4)]
+        self.assertEqual([0, 1, 0, 1], acquired)
+
+        self.pool.release(0)
+        self.pool.release(0)
+        self.assertEqual(0, self.pool.acquire().session_id())
+        self.assertEqual(1, self.pool.session(0).load())
+
+    def test_expired_session_gets_no_work(self):
+        self.pool.activate(0, self._page_context("1"))
+        self.pool.activate(1, self._page_context("2"))
+
+        self.assertEqual(True, self.pool.expire(0))
+        self.assertEqual(False, self.pool.expire(0))
+        self.assertEqual(1, self.pool.acquire().session_id())
+        self.assertEqual(1, self.pool.acquire().session_id())
+
+    def test_rebootstrap_uses_new_cookiejar(self):
+        session = self.pool.activate(0, self._page_context("1"))
+        cookiejar = session.cookiejar()
+        cookie_jar = session.cookie_jar()
+
+        self.pool.expire(0)
+        self.pool.rebootstrap(0)
+        self.assertEqual(True, session.is_bootstrapping())
+        self.assertNotEqual(cookiejar, session.cookiejar())
+        self.assertIsNot(cookie_jar, session.cookie_jar())
+        self.assertEqual({}, session.cookies())
+
+        self.pool.activate(0, self._page_context("3"))
+        self.assertEqual("3", self.pool.acquire().page_context()["instance_id"])
+
+    def test_unknown_session(self):
+        with self.assertRaises(SessionError):
+            self.pool.session(5)
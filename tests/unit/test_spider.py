@@ -0,0 +1,435 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from fara_principals.core.pages import __next_page_url__
+from fara_principals.core.state import principal_key
+from fara_principals.spiders.active_principals_spider import (
+    ActivePrincipalsSpider
+)
+
+def get_data_dir():
+    return os.path.normpath(os.path.join(__file__, '../../'))
+
+def read_data_file(name):
+    with open(os.path.join(get_data_dir(), name), 'rb') as f:
+        return f.read()
+
+#url the main page redirects to, with the session's page instance id
+__redirected_main_url__ = \
+    'https://efile.fara.gov/pls/apex/f?p=171:130:9488617858409::NO'
+
+class SpiderTestCase(TestCase):
+
+    settings = {}
+
+    def setUp(self):
+        self.start_crawl()
+
+    def start_crawl(self):
+        self.spider = ActivePrincipalsSpider.from_crawler(get_crawler(
+            ActivePrincipalsSpider, dict(self.settings)))
+        self.spider.page_size = 15
+        self.bootstrap_requests = list(self.spider.start_requests())
+
+    def main_response(self, request, url=__redirected_main_url__):
+        return HtmlResponse(url=url, body=read_data_file('init.html'),
+            request=request)
+
+    def page_response(self, request, name='page2.html'):
+        return HtmlResponse(url=request.url, body=read_data_file(name),
+            request=request)
+
+    def bootstrap(self):
+        requests = []
+        for request in self.bootstrap_requests:
+            requests.extend(self.spider.parse_main_page(
+                self.main_response(request)))
+        return requests
+
+class TestActivePrincipalsSpider(SpiderTestCase):
+
+    def test_parse_main_page(self):
+        requests = self.bootstrap()
+
+        session = self.spider.sessions.session(
+            self.bootstrap_requests[0].meta["session_id"])
+        self.assertEqual('9488617858409',
+            session.page_context()["instance_id"])
+        #the 35 list pages are released 13 at a time by the frontier
+        self.assertEqual(13, len(requests))
+        self.assertEqual(22, self.spider.frontier.pending_pages())
+        self.assertEqual(__next_page_url__, requests[0].url)
+
+    def test_parse_pages(self):
+        page_request = self.bootstrap()[1]
+        requests = list(self.spider.parse_principal_page(
+            self.page_response(page_request)))
+        exhibit_request = [request for request in requests
+            if "exhibit_key" in request.meta][0]
+
+        principals = list(self.spider.parse_exhibit_page(
+            self.page_response(exhibit_request, 'exhibit_page1.html')))
+        self.assertEqual("6065", principals[0]["reg_number"])
+        self.assertEqual(2, len(principals[0]["exhibit"]))
+
+class TestPendingExhibitsCap(SpiderTestCase):
+
+    settings = {'PRINCIPALS_MAX_PENDING_EXHIBITS': 20}
+
+    def test_probed_page_sizes_are_capped(self):
+        self.spider.page_size = 'auto'
+        probe_request, = self.bootstrap()
+        self.assertEqual([20, 15], probe_request.meta["page_sizes"])
+
+    def test_single_page_is_capped(self):
+        #the whole report would fit a page of 1000 principals
+        self.spider.page_size = 1000
+        page_request, = self.bootstrap()
+        self.assertEqual(20, page_request.meta["page_size"])
+
+        #no more pages are released while the page's exhibits are pending
+        requests = list(self.spider.parse_principal_page(
+            self.page_response(page_request)))
+        self.assertTrue(0 < len(self.spider._exhibit_waiters) <= 20)
+        self.assertEqual([], [request for request in requests
+            if "page_size" in request.meta])
+
+class TestExhibitCoalescing(SpiderTestCase):
+
+    settings = {'PRINCIPALS_EXHIBIT_CACHE_SIZE': 1}
+
+    def exhibit_requests(self, requests):
+        return [request for request in requests
+            if not isinstance(request, dict) and "exhibit_key" in request.meta]
+
+    def test_parsed_exhibit_page_is_not_requested_again(self):
+        first_page_request, second_page_request = self.bootstrap()[:2]
+        exhibit_request = self.exhibit_requests(
+            self.spider.parse_principal_page(
+                self.page_response(first_page_request)))[0]
+        key = exhibit_request.meta["exhibit_key"]
+        list(self.spider.parse_exhibit_page(
+            self.page_response(exhibit_request, 'exhibit_page1.html')))
+        self.assertEqual({}, self.spider._exhibits)
+
+        #a principal of another page links to the same exhibit page
+        outputs = list(self.spider.parse_principal_page(
+            self.page_response(second_page_request)))
+        self.assertEqual([], [request for request in
+            self.exhibit_requests(outputs)
+            if request.meta["exhibit_key"] == key])
+        self.assertIn("6065", [output["reg_number"] for output in outputs
+            if isinstance(output, dict)])
+
+    def test_cache_is_bounded(self):
+        self.spider._cache_exhibits("a", [])
+        self.spider._cache_exhibits("b", [])
+        self.assertEqual(None, self.spider._parsed_exhibits("a"))
+        self.assertEqual([], self.spider._parsed_exhibits("b"))
+
+class TestCheckpointedSpider(SpiderTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.settings = {'PRINCIPALS_CHECKPOINT_PATH': os.path.join(
+            self.temp_dir, 'checkpoint.json')}
+        super(TestCheckpointedSpider, self).setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def resume(self):
+        """
+        starts a new crawl from the checkpoint, returning the requests it
+        resumes with.
+        """
+        self.start_crawl()
+        return self.bootstrap()
+
+    def waiting_principals(self):
+        return sorted(principal_key(waiter)
+            for waiters in self.spider._exhibit_waiters.values()
+            for waiter in waiters)
+
+    def test_resumed_page_skips_handed_out_principals(self):
+        page_request = self.bootstrap()[0]
+        #the crawl is interrupted half way through the page
+        outputs = self.spider.parse_principal_page(
+            self.page_response(page_request))
+        exhibit_requests = [next(outputs) for _ in range(4)]
+        principals = list(self.spider.parse_exhibit_page(self.page_response(
+            exhibit_requests[0], 'exhibit_page1.html')))
+        for principal_dict in principals:
+            if isinstance(principal_dict, dict):
+                self.spider.item_done(principal_dict)
+        self.spider._save_checkpoint(force=True)
+        emitted = [principal_key(principal_dict)
+            for principal_dict in principals if isinstance(principal_dict,
+            dict)]
+        waiting = self.waiting_principals()
+
+        resumed_requests = self.resume()
+        self.assertEqual(waiting, self.waiting_principals())
+        self.assertEqual(3, len([request for request in resumed_requests
+            if "exhibit_key" in request.meta]))
+
+        page_request = [request for request in resumed_requests
+            if request.meta.get("first_row") == 1][0]
+        outputs = list(self.spider.parse_principal_page(
+            self.page_response(page_request)))
+        self.assertEqual([], [output for output in outputs
+            if isinstance(output, dict)])
+        waiting = self.waiting_principals()
+        self.assertEqual(sorted(set(waiting)), waiting)
+        for key in emitted:
+            self.assertNotIn(key, waiting)
+
+    def test_principals_in_pipelines_are_checkpointed(self):
+        page_request = self.bootstrap()[0]
+        exhibit_request = [request for request in
+            self.spider.parse_principal_page(self.page_response(page_request))
+            if "exhibit_key" in request.meta][0]
+        principal_dict = list(self.spider.parse_exhibit_page(
+            self.page_response(exhibit_request, 'exhibit_page1.html')))[0]
+
+        #the principal was lost in the item pipelines, it is emitted again
+        #with the checkpointed exhibits of it's exhibit page
+        self.spider._save_checkpoint(force=True)
+        resumed_principals = [output for output in self.resume()
+            if isinstance(output, dict)]
+        self.assertEqual([principal_dict], resumed_principals)
+        self.assertNotIn(principal_key(principal_dict),
+            self.waiting_principals())
+
+    def test_exhibits_are_dropped_once_principals_are_emitted(self):
+        page_request = self.bootstrap()[0]
+        exhibit_request = [request for request in
+            self.spider.parse_principal_page(self.page_response(page_request))
+            if "exhibit_key" in request.meta][0]
+        key = exhibit_request.meta["exhibit_key"]
+        principals = [output for output in self.spider.parse_exhibit_page(
+            self.page_response(exhibit_request, 'exhibit_page1.html'))
+            if isinstance(output, dict)]
+        self.assertIn(key, self.spider._exhibits)
+
+        for principal_dict in principals:
+            self.spider.item_done(principal_dict)
+        self.assertNotIn(key, self.spider._exhibits)
+        self.spider._save_checkpoint(force=True)
+        self.assertEqual({}, self.spider.checkpoint.exhibits())
+        #the page is done, it's principals are no longer recorded
+        self.assertEqual(False,
+            self.spider.checkpoint.was_emitted(principals[0]))
+
+    def test_page_done_is_saved_at_once(self):
+        self.spider.checkpoint._interval = 3600
+        page_request = self.bootstrap()[0]
+        list(self.spider.parse_principal_page(
+            self.page_response(page_request)))
+
+        self.resume()
+        self.assertEqual(True, self.spider.checkpoint.is_page_done(1))
+
+    def test_finished_crawl_removes_checkpoint(self):
+        self.spider._save_checkpoint(force=True)
+        self.spider.closed('finished')
+        self.assertEqual(False, os.path.exists(self.spider.checkpoint.path()))
+
+    def test_dropped_list_page_keeps_checkpoint(self):
+        page_request = self.bootstrap()[0]
+        self.spider._drop_request(page_request)
+
+        self.spider.closed('finished')
+        self.assertEqual(True, os.path.exists(self.spider.checkpoint.path()))
+
+    def test_dropped_exhibit_page_keeps_checkpoint(self):
+        page_request = self.bootstrap()[0]
+        exhibit_request = [request for request in
+            self.spider.parse_principal_page(self.page_response(page_request))
+            if "exhibit_key" in request.meta][0]
+        self.spider._drop_request(exhibit_request)
+        #the other principals of the page came out of the pipelines
+        self.spider._exhibit_waiters.clear()
+
+        self.spider.closed('finished')
+        self.assertEqual(True, os.path.exists(self.spider.checkpoint.path()))
+
+class TestUncheckpointedSpider(SpiderTestCase):
+
+    def test_exhibits_are_not_kept(self):
+        page_request = self.bootstrap()[0]
+        exhibit_request = [request for request in
+            self.spider.parse_principal_page(self.page_response(page_request))
+            if "exhibit_key" in request.meta][0]
+        list(self.spider.parse_exhibit_page(
+            self.page_response(exhibit_request, 'exhibit_page1.html')))
+        self.assertEqual({}, self.spider._exhibits)
+
+class TestIncrementalSpider(SpiderTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.settings = {'PRINCIPALS_STATE_PATH': os.path.join(
+            self.temp_dir, 'state.json')}
+        super(TestIncrementalSpider, self).setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_finished_crawl_marks_unseen_principals_removed(self):
+        with mock.patch.object(self.spider.state_store, 'mark_removed',
+        return_value=[]) as mark_removed:
+            self.spider.closed('finished')
+        mark_removed.assert_called_once_with()
+
+    def test_dropped_list_page_keeps_unseen_principals(self):
+        page_request = self.bootstrap()[0]
+        self.spider._drop_request(page_request)
+
+        with mock.patch.object(self.spider.state_store,
+        'mark_removed') as mark_removed:
+            self.spider.closed('finished')
+        self.assertEqual(False, mark_removed.called)
+
+    def test_dropped_principals_keep_unseen_principals(self):
+        page_request = self.bootstrap()[0]
+        exhibit_request = [request for request in
+            self.spider.parse_principal_page(self.page_response(page_request))
+            if "exhibit_key" in request.meta][0]
+        self.spider._drop_request(exhibit_request)
+
+        with mock.patch.object(self.spider.state_store,
+        'mark_removed') as mark_removed:
+            self.spider.closed('finished')
+        self.assertEqual(False, mark_removed.called)
+
+class TestSessionExpiry(SpiderTestCase):
+
+    settings = {'SESSION_POOL_SIZE': 2, 'SESSION_MAX_RETRIES': 1}
+
+    def session(self, request):
+        return self.spider.sessions.session(request.meta["session_id"])
+
+    def test_expired_bootstrap_is_retried_on_its_session(self):
+        #the main page redirected before it's response was trapped
+        request = self.bootstrap_requests[0].replace(
+            url=__redirected_main_url__)
+        requests = self.spider.session_expired(request,
+            "missing page context")
+
+        retry, = requests
+        self.assertEqual(True, retry.meta["bootstrap"])
+        self.assertEqual(request.meta["session_id"], retry.meta["session_id"])
+        self.assertEqual(1, retry.meta["session_retries"])
+        self.assertEqual(True, self.session(request).is_bootstrapping())
+        self.assertEqual(True, request.meta["session_expired"])
+
+    def test_expired_bootstrap_gives_up_after_retries(self):
+        request = self.bootstrap_requests[0].replace(
+            meta=dict(self.bootstrap_requests[0].meta, session_retries=1))
+        self.spider.parse_main_page(self.main_response(
+            self.bootstrap_requests[1]))
+
+        requests = self.spider.session_expired(request, "decoy 404")
+        self.assertEqual(True, request.meta["session_dropped"])
+        self.assertEqual(False, self.session(request).is_bootstrapping())
+        #the other session discovers the pages
+        self.assertEqual(13, len(requests))
+
+    def test_expired_request_is_retried_with_active_session(self):
+        page_request = self.bootstrap()[0]
+        expired_session = self.session(page_request)
+
+        bootstrap_request, retry = self.spider.session_expired(page_request,
+            "empty page with rows remaining")
+        self.assertEqual(expired_session.session_id(),
+            bootstrap_request.meta["session_id"])
+        self.assertEqual(True, bootstrap_request.meta["bootstrap"])
+        self.assertEqual(True, expired_session.is_bootstrapping())
+
+        self.assertNotEqual(expired_session.session_id(),
+            retry.meta["session_id"])
+        self.assertEqual(1, retry.meta["session_retries"])
+        self.assertEqual(page_request.meta["first_row"],
+            retry.meta["first_row"])
+        self.assertEqual(False, "session_expired" in retry.meta)
+        self.assertEqual(False, "session_dropped" in page_request.meta)
+
+    def test_trapped_probe_requests_next_page_size(self):
+        self.spider.page_size = 'auto'
+        probe_request, = self.bootstrap()
+        page_sizes = probe_request.meta["page_sizes"]
+        self.assertTrue(len(page_sizes) > 1)
+
+        next_probe_request, = self.spider.session_expired(probe_request,
+            "decoy 404")
+        self.assertEqual(page_sizes[1:], next_probe_request.meta["page_sizes"])
+        self.assertEqual(probe_request.meta["session_id"],
+            next_probe_request.meta["session_id"])
+        self.assertEqual(False, self.session(probe_request).is_bootstrapping())
+
+    def test_pages_past_an_overstated_total_are_not_traps(self):
+        #the main page reports 515 principals but the second of 26 pages of
+        #20 comes back with 15 rows, the report ends at the 35th
+        self.spider.page_size = 20
+        page_requests = self.bootstrap()
+        self.assertEqual(10, len(page_requests))
+        list(self.spider.parse_principal_page(
+            self.page_response(page_requests[1])))
+        self.assertEqual(0, self.spider.frontier.pending_pages())
+
+        #a page in flight past the end comes back empty
+        page_request = page_requests[4]
+        self.assertEqual([], self.spider.session_expired(page_request,
+            "empty page with rows remaining"))
+        self.assertEqual(True, page_request.meta["past_last_row"])
+        self.assertEqual(False, self.session(page_request).is_bootstrapping())
+        self.assertEqual(False, "session_dropped" in page_request.meta)
+
+    def test_expired_request_is_held_until_a_session_is_active(self):
+        page_request = self.bootstrap()[0]
+        for session in self.spider.sessions.sessions():
+            self.spider.sessions.expire(session.session_id())
+
+        self.assertEqual([], self.spider.session_expired(page_request,
+            "decoy 404"))
+        self.assertEqual(1, len(self.spider._held_requests))
+
+        session = self.spider.sessions.rebootstrap(0)
+        requests = self.spider.parse_main_page(self.main_response(
+            self.spider._bootstrap_request(session)))
+        self.assertEqual([], self.spider._held_requests)
+        self.assertEqual(0, requests[0].meta["session_id"])
+        self.assertEqual(page_request.meta["first_row"],
+            requests[0].meta["first_row"])
+
+    def test_request_is_dropped_after_retries(self):
+        page_request = self.bootstrap()[0]
+        exhibit_request = [request for request in
+            self.spider.parse_principal_page(self.page_response(page_request))
+            if "exhibit_key" in request.meta][0]
+        exhibit_request.meta["session_retries"] = 1
+        key = exhibit_request.meta["exhibit_key"]
+        self.assertIn(key, self.spider._exhibit_waiters)
+
+        requests = self.spider.session_expired(exhibit_request, "decoy 404")
+        self.assertEqual(True, exhibit_request.meta["session_dropped"])
+        self.assertNotIn(key, self.spider._exhibit_waiters)
+        self.assertEqual([], [request for request in requests
+            if request.meta.get("exhibit_key") == key])
+
+    def test_drop_request_frees_frontier(self):
+        page_request = self.bootstrap()[0]
+        in_flight = self.spider.frontier.pages_in_flight()
+
+        requests = self.spider._drop_request(page_request)
+        self.assertEqual(True, page_request.meta["session_dropped"])
+        #the page's place in flight is handed to the next page
+        self.assertEqual(1, len(requests))
+        self.assertEqual(in_flight, self.spider.frontier.pages_in_flight())
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from fara_principals.core.state import PrincipalStateStore, principal_key
+from fara_principals.exceptions import StateStoreError
+
+class TestPrincipalStateStore(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'state.json')
+        self.partial_principal_dict = {
+            "url": "https://efile.fara.gov/pls/apex/f?p=171:200:999::NO:"\
+                "RP,200:P200_REG_NUMBER,P200_DOC_TYPE,P200_COUNTRY:6065,"\
+                "Exhibit%20AB,AZERBAIJAN",
+            "country": "AZERBAIJAN", "state": "DC", "address": "Washington",
+            "reg_number": "6065", "principal_name": "Embassy of Azerbaijan",
+            "principal_reg_date": "12/3/2018", "reg_date": "12/3/2018",
+            "registrant": "Some Registrant"
+        }
+        self.exhibit_dict = {"reg_number": "6065", "document_type":
+            "Exhibit AB", "document_link": "http://www.fara.gov/docs/a.pdf",
+            "date_stamped": "12/03/2018", "registrant": "Some Registrant"}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _full_principal_dict(self):
+        return dict(self.partial_principal_dict, exhibit=[self.exhibit_dict])
+
+    def _stored_store(self):
+        store = PrincipalStateStore(self.path)
+        store.update(self._full_principal_dict())
+        store.save()
+        return PrincipalStateStore(self.path)
+
+    def test_unknown_principal_is_not_stored(self):
+        store = PrincipalStateStore(self.path)
+        self.assertEqual(0, len(store))
+        self.assertEqual(None, 
+            store.stored_principal(self.partial_principal_dict))
+
+    def test_unchanged_principal_gets_stored_exhibits(self):
+        store = self._stored_store()
+
+        #a new session only changes the instance id of the exhibit url
+        partial_principal_dict = dict(self.partial_principal_dict, 
+            url=self.partial_principal_dict["url"].replace(":999:", ":111:"))
+        full_principal_dict = store.stored_principal(partial_principal_dict)
+
+        self.assertEqual([self.exhibit_dict], full_principal_dict["exhibit"])
+        self.assertEqual(partial_principal_dict["url"], 
+            full_principal_dict["url"])
+
+    def test_changed_principal_is_not_stored(self):
+        store = self._stored_store()
+        partial_principal_dict = dict(self.partial_principal_dict, 
+            address="Baku")
+        self.assertEqual(None, store.stored_principal(partial_principal_dict))
+
+    def test_mark_removed(self):
+        store = self._stored_store()
+        removed = store.mark_removed(removed_at="2018-12-04")
+        self.assertEqual([principal_key(self.partial_principal_dict)], 
+            [principal_key(principal) for principal in removed])
+        self.assertEqual("2018-12-04", 
+            store.removed_principals()[0]["removed_at"])
+
+        #seen principals are not removed and lose their removed mark
+        store.stored_principal(self.partial_principal_dict)
+        self.assertEqual([], store.mark_removed())
+        self.assertEqual([], store.removed_principals())
+
+    def test_corrupt_state_file(self):
+        with open(self.path, 'w') as f:
+            f.write("{not json")
+        with self.assertRaises(StateStoreError):
+            PrincipalStateStore(self.path)
@@ -0,0 +1,117 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import TestCase
+
+from fara_principals.core.storage import PrincipalStorage
+from fara_principals.exceptions import StorageError
+
+class TestPrincipalStorage(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'principals.db')
+        self.storage = PrincipalStorage(self.path, batch_size=2)
+        self.principal_dict = {
+            "url": "f/?p=blah", "country": "AZERBAIJAN", "state": "DC",
+            "address": "Washington", "reg_number": "6065",
+            "principal_name": "Embassy of Azerbaijan",
+            "principal_reg_date": "12/3/2018", "reg_date": "12/3/2018",
+            "registrant": "Some Registrant",
+            "exhibit": [{"reg_number": "6065", "document_type": "Exhibit AB",
+                "document_link": "http://www.fara.gov/docs/a.pdf",
+                "date_stamped": "12/03/2018", "registrant": "Some Registrant"}]
+        }
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_find_returns_principal_dicts(self):
+        self.storage.add_principal(self.principal_dict)
+        self.assertEqual([self.principal_dict], 
+            self.storage.principals_by_country("AZERBAIJAN"))
+        self.assertEqual([self.principal_dict], 
+            self.storage.principals_by_registrant("Some Registrant"))
+        self.assertEqual([], self.storage.principals_by_reg_number("1"))
+
+    def test_upsert_merges_exhibits(self):
+        self.storage.add_principal(self.principal_dict)
+        exhibit = dict(self.principal_dict["exhibit"][0], 
+            document_link="http://www.fara.gov/docs/b.pdf")
+        self.storage.add_principal(dict(self.principal_dict, 
+            address="Baku", exhibit=[exhibit]))
+
+        principals = self.storage.find(reg_number="6065")
+        self.assertEqual(1, len(self.storage))
+        self.assertEqual("Baku", principals[0]["address"])
+        self.assertEqual(2, len(principals[0]["exhibit"]))
+
+    def test_writes_survive_reopening(self):
+        self.storage.add_principal(self.principal_dict)
+        self.storage.close()
+        self.storage = PrincipalStorage(self.path)
+        self.assertEqual(1, len(self.storage))
+
+    def test_only_indexed_fields_can_be_queried(self):
+        with self.assertRaises(StorageError):
+            self.storage.find(address="Washington")
+
+    def test_find_on_date_ranges(self):
+        #01/05/2019 sorts before 12/3/2018 as a string
+        later_principal_dict = dict(self.principal_dict, reg_number="6066",
+            reg_date="01/05/2019", exhibit=[])
+        self.storage.add_principal(self.principal_dict)
+        self.storage.add_principal(later_principal_dict)
+
+        self.assertEqual([later_principal_dict], self.storage.find(
+            reg_date=("12/04/2018", None)))
+        self.assertEqual([self.principal_dict], self.storage.find(
+            reg_date=(None, "12/31/2018")))
+        self.assertEqual([self.principal_dict, later_principal_dict],
+            self.storage.find(reg_date=("01/01/2018", "01/05/2019")))
+        #dates are compared as dates, whatever their zero padding
+        self.assertEqual([self.principal_dict], self.storage.find(
+            reg_date="12/03/2018"))
+
+    def test_find_on_exhibit_dates(self):
+        self.storage.add_principal(self.principal_dict)
+        self.assertEqual([self.principal_dict], self.storage.find(
+            date_stamped=("12/01/2018", "12/31/2018"), country="AZERBAIJAN"))
+        self.assertEqual([], self.storage.find(
+            date_stamped=("01/01/2019", None)))
+
+    def test_invalid_dates_are_not_found(self):
+        self.storage.add_principal(dict(self.principal_dict,
+            reg_date="not a date"))
+        self.assertEqual([], self.storage.find(reg_date=(None, None)))
+        with self.assertRaises(StorageError):
+            self.storage.find(reg_date=("13/45/2018", None))
+
+    def test_ordinals_are_added_to_older_databases(self):
+        self.storage.close()
+        os.remove(self.path)
+        connection = sqlite3.connect(self.path)
+        connection.executescript("""
+            CREATE TABLE principals (id INTEGER PRIMARY KEY,
+                reg_number TEXT, principal_name TEXT,
+                principal_reg_date TEXT, reg_date TEXT, registrant TEXT,
+                country TEXT, state TEXT, address TEXT, url TEXT,
+                UNIQUE (reg_number, principal_name, principal_reg_date));
+            CREATE TABLE exhibits (id INTEGER PRIMARY KEY,
+                principal_id INTEGER NOT NULL REFERENCES principals (id),
+                document_link TEXT, document_type TEXT, date_stamped TEXT,
+                reg_number TEXT, registrant TEXT,
+                UNIQUE (principal_id, document_link));
+            INSERT INTO principals (reg_number, principal_name,
+                principal_reg_date, reg_date)
+                VALUES ('6065', 'Embassy of Azerbaijan', '12/3/2018',
+                '12/3/2018');
+        """)
+        connection.close()
+
+        self.storage = PrincipalStorage(self.path)
+        principals = self.storage.find(reg_date=("12/01/2018", "12/31/2018"))
+        self.assertEqual(["6065"], [principal_dict["reg_number"]
+            for principal_dict in principals])
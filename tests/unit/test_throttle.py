@@ -0,0 +1,88 @@
+from unittest import TestCase
+
+from fara_principals.core.throttle import ConcurrencyController
+
+class TestConcurrencyController(TestCase):
+
+    def setUp(self):
+        self.controller = ConcurrencyController(start=1, maximum=4, 
+            increase_after=2)
+
+    def _healthy_responses(self, count):
+        for _ in range(count):
+            self.controller.healthy_response()
+
+    def test_starts_at_start_concurrency(self):
+        self.assertEqual(1, self.controller.concurrency())
+
+    def test_raises_concurrency_while_healthy(self):
+        self._healthy_responses(1)
+        self.assertEqual(1, self.controller.concurrency())
+
+        self._healthy_responses(1)
+        self.assertEqual(2, self.controller.concurrency())
+
+        self._healthy_responses(100)
+        self.assertEqual(4, self.controller.concurrency())
+
+    def test_backs_off_on_trap(self):
+        self._healthy_responses(6)
+        self.assertEqual(4, self.controller.concurrency())
+
+        self.assertEqual(True, self.controller.trap_response())
+        self.assertEqual(2, self.controller.concurrency())
+        self.assertEqual(3, self.controller.ceiling())
+
+        #never goes back to the concurrency the trap was served at
+        self._healthy_responses(100)
+        self.assertEqual(3, self.controller.concurrency())
+
+    def test_never_backs_off_below_start(self):
+        self.assertEqual(False, self.controller.trap_response())
+        self.assertEqual(1, self.controller.concurrency())
+        self.assertEqual(1, self.controller.ceiling())
+
+    def test_backs_off_once_per_episode(self):
+        controller = ConcurrencyController(start=1, maximum=8,
+            increase_after=1)
+        for _ in range(7):
+            controller.healthy_response()
+        self.assertEqual(8, controller.concurrency())
+
+        #four requests in flight, sent at the same episode, are trapped
+        episode = controller.episode()
+        self.assertEqual(True, controller.trap_response(episode))
+        for _ in range(3):
+            self.assertEqual(False, controller.trap_response(episode))
+        self.assertEqual(4, controller.concurrency())
+        self.assertEqual(7, controller.ceiling())
+
+        #a request sent after the back off lowers it again
+        self.assertEqual(True, controller.trap_response(controller.episode()))
+        self.assertEqual(2, controller.concurrency())
+        self.assertEqual(3, controller.ceiling())
+
+    def test_restores_ceiling_after_healthy_run(self):
+        controller = ConcurrencyController(start=1, maximum=4,
+            increase_after=1, restore_ceiling_after=50)
+        for _ in range(3):
+            controller.healthy_response()
+        controller.trap_response()
+        self.assertEqual((2, 3), (controller.concurrency(),
+            controller.ceiling()))
+
+        for _ in range(49):
+            controller.healthy_response()
+        self.assertEqual((3, 3), (controller.concurrency(),
+            controller.ceiling()))
+
+        #a trap ends the healthy run
+        controller.trap_response(controller.episode() - 1)
+        for _ in range(49):
+            controller.healthy_response()
+        self.assertEqual(3, controller.ceiling())
+
+        controller.healthy_response()
+        self.assertEqual(4, controller.ceiling())
+        controller.healthy_response()
+        self.assertEqual(4, controller.concurrency())